@@ -1,13 +1,36 @@
+import time
+
+# Measured before any other import so the startup report covers the whole module
+_import_started = time.perf_counter()
+
 import os
 import json
-from flask import Flask, request, jsonify
+import threading
+from functools import wraps
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from twilio.twiml.messaging_response import MessagingResponse
-from google.oauth2.credentials import Credentials
 
 from utils.command_parser import CommandParser
 from utils.google_drive_client import GoogleDriveClient
 from utils.document_summarizer import DocumentSummarizer
+from utils.config import Config
+from utils.service_cache import service_cache
+from utils.path_cache import path_cache
+from utils.folder_index import folder_indexes
+from utils.metadata_mirror import metadata_mirrors
+from utils.document_extraction import extraction_pool
+from utils.summary_cache import summary_cache
+from utils.text_cache import text_cache
+from utils.download_buffer import download_stats
+from utils.http_pool import http_pool
+from utils.warm_start import warm_start
+from utils.startup import record_startup, startup_stats
+from utils.storage import storage
+from utils.token_refresher import token_refresher
+from utils.message_sender import message_sender
+from utils.job_queue import job_queue
+from utils.session import session_manager
 
 from dotenv import load_dotenv
 
@@ -18,9 +41,24 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 command_parser = CommandParser()
-drive_client = GoogleDriveClient()
 
-summarizer = DocumentSummarizer()
+# Built on first use: the Gemini client is only needed for summaries, not for HELP or /api/auth/status
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+
+def _get_summarizer() -> DocumentSummarizer:
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = DocumentSummarizer()
+        return _summarizer
+
+# Commands that can outlast Twilio's webhook timeout; they run on the job queue and their results are sent out of band
+ASYNC_COMMANDS = {"FOLDERSUMMARY", "FILESUMMARY"}
+
+# Structured /api/jobs payloads ({"type": ..., "path": ...}), run without the WhatsApp command parser
+JOB_TYPES = {"file_summary": "FILESUMMARY", "folder_summary": "FOLDERSUMMARY"}
 
 
 
@@ -39,7 +77,7 @@ def auth():
         return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
     
     try:
-        drive_client._authenticate(code, whatsapp_number)
+        GoogleDriveClient()._authenticate(code, whatsapp_number)
 
         return jsonify({"success": True, "message": "Connected to Google Drive"})
     except Exception as e:
@@ -62,9 +100,6 @@ def api_incoming_message():
         if not message_body:
             return _create_twilio_response("No message provided")
         
-        # Set the WhatsApp number in the command parser for authentication
-        command_parser.current_whatsapp_number = from_number
-        
         # Parse the command
         parsed_command = command_parser.parse_message(message_body)
         
@@ -73,7 +108,12 @@ def api_incoming_message():
         
         command = parsed_command.get("command")
 
-        response_text = _execute_command(command, parsed_command)
+        if _is_async_command(command, parsed_command):
+            # Keyed by MessageSid, so a Twilio retry of this webhook does not enqueue the work twice
+            job_queue.enqueue(from_number, command, {"parsed_command": parsed_command, "notify": True}, message_sid)
+            return _create_twilio_response("⏳ Working on it, you will receive the result in a moment.")
+
+        response_text = _execute_command(command, parsed_command, from_number)
         print("response_text" , response_text)
 
         
@@ -85,6 +125,27 @@ def api_incoming_message():
         return _create_twilio_response(str(e))
 
 
+def _is_async_command(command: str, parsed_command: dict) -> bool:
+    """Slow commands (summaries and wildcard operations) run outside the webhook"""
+    if command in ASYNC_COMMANDS:
+        return True
+    return bool(parsed_command.get("is_pattern")) and not parsed_command.get("dry_run")
+
+
+def _run_job(job: dict) -> str:
+    return _execute_command(job["command"], job["payload"]["parsed_command"], job["whatsapp_number"], raise_errors=True)
+
+
+def _on_job_finished(job: dict, succeeded: bool) -> None:
+    if not job["payload"].get("notify"):
+        return
+
+    if succeeded:
+        message_sender.send(job["whatsapp_number"], job["result"])
+    else:
+        message_sender.send(job["whatsapp_number"], f"❌ Error executing command: {job['error']}")
+
+
 
 
 
@@ -113,7 +174,7 @@ def api_execute():
         
         command = parsed_command.get("command")
 
-        response_text = _execute_command(command, parsed_command)
+        response_text = _execute_command(command, parsed_command, _request_whatsapp_number())
 
         
         print("response_text" , response_text)
@@ -134,12 +195,41 @@ def api_execute():
 
 
 
+def _request_whatsapp_number() -> str:
+    """WhatsApp number of the caller: X-WhatsApp-Number header, query parameter or JSON body"""
+    whatsapp_number = request.headers.get('X-WhatsApp-Number') or request.args.get('whatsapp_number')
+    if not whatsapp_number and request.is_json:
+        whatsapp_number = (request.get_json(silent=True) or {}).get('whatsapp_number')
+    return whatsapp_number
+
+
+def requires_session(view):
+    """Open a per-request session for the calling user and expose it as g.session"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        whatsapp_number = _request_whatsapp_number()
+        if not whatsapp_number:
+            return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
+
+        session = session_manager.open(whatsapp_number)
+        if not session:
+            return jsonify({"success": False, "error": "Please sign in to your Google Drive account first"}), 401
+
+        g.session = session
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @app.route('/api/files', methods=['GET'])
+@requires_session
 def get_files():
-    """Get list of files in a folder"""
+    """Get one page of files in a folder"""
     try:
         folder_path = request.args.get('folder', '/')
-        result = drive_client.list_files(folder_path)
+        page_token = request.args.get('pageToken')
+        limit = request.args.get('limit', type=int)
+
+        result = g.session.drive_client.list_files_page(folder_path, page_token, limit)
         
         if "error" in result:
             return jsonify({
@@ -149,7 +239,8 @@ def get_files():
         
         return jsonify({
             "success": True,
-            "files": result.get("files", [])
+            "files": result.get("files", []),
+            "nextPageToken": result.get("nextPageToken")
         })
         
     except Exception as e:
@@ -160,10 +251,11 @@ def get_files():
         }), 500
 
 @app.route('/api/files/<path:file_path>', methods=['DELETE'])
+@requires_session
 def delete_file_api(file_path):
     """Delete a file by path"""
     try:
-        result = drive_client.delete_file(f"/{file_path}")
+        result = g.session.drive_client.delete_file(f"/{file_path}")
         
         if "error" in result:
             return jsonify({
@@ -184,6 +276,7 @@ def delete_file_api(file_path):
         }), 500
 
 @app.route('/api/files/move', methods=['POST'])
+@requires_session
 def move_file_api():
     """Move a file to a different folder"""
     try:
@@ -197,7 +290,7 @@ def move_file_api():
                 "error": "Source and destination paths are required"
             }), 400
         
-        result = drive_client.move_file(source_path, destination_path)
+        result = g.session.drive_client.move_file(source_path, destination_path)
         
         if "error" in result:
             return jsonify({
@@ -218,6 +311,7 @@ def move_file_api():
         }), 500
 
 @app.route('/api/files/copy', methods=['POST'])
+@requires_session
 def copy_file_api():
     """Copy a file to a different folder"""
     try:
@@ -231,7 +325,7 @@ def copy_file_api():
                 "error": "Source and destination paths are required"
             }), 400
         
-        result = drive_client.copy_file(source_path, destination_path)
+        result = g.session.drive_client.copy_file(source_path, destination_path)
         
         if "error" in result:
             return jsonify({
@@ -251,11 +345,58 @@ def copy_file_api():
             "error": str(e)
         }), 500
 
+@app.route('/api/batch', methods=['POST'])
+@requires_session
+def batch_api():
+    """Run many file operations in a single round trip"""
+    try:
+        data = request.get_json()
+        operations = (data or {}).get('operations')
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                "success": False,
+                "error": "A non-empty list of operations is required"
+            }), 400
+
+        if len(operations) > Config.BATCH_MAX_OPERATIONS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {Config.BATCH_MAX_OPERATIONS} operations are allowed per batch"
+            }), 400
+        
+        result = g.session.drive_client.batch_execute(operations)
+        
+        if "error" in result:
+            return jsonify({
+                "success": False,
+                "error": result["error"]
+            }), 400
+        
+        return jsonify({
+            "success": True,
+            "results": result["results"]
+        })
+        
+    except Exception as e:
+        print(f"Error executing batch: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/summary/file/<path:file_path>', methods=['GET'])
+@requires_session
 def get_file_summary_api(file_path):
     """Get summary of a file"""
     try:
-        result = summarizer.summarize_single_document(drive_client  , f"/{file_path}")
+        summarizer = _get_summarizer()
+        result = summarizer.summarize_single_document(
+            g.session.drive_client,
+            f"/{file_path}",
+            concurrency=request.args.get('concurrency', type=int),
+            token_budget=request.args.get('token_budget', type=int)
+        )
         formatted_summary = summarizer.format_summary_response(result)
         
         return jsonify({
@@ -271,10 +412,17 @@ def get_file_summary_api(file_path):
         }), 500
 
 @app.route('/api/summary/folder/<path:folder_path>', methods=['GET'])
+@requires_session
 def get_folder_summary_api(folder_path):
     """Get summary of a folder"""
     try:
-        result = summarizer.summarize_folder(drive_client ,f"/{folder_path}")
+        summarizer = _get_summarizer()
+        result = summarizer.summarize_folder(
+            g.session.drive_client,
+            f"/{folder_path}",
+            concurrency=request.args.get('concurrency', type=int),
+            token_budget=request.args.get('token_budget', type=int)
+        )
         formatted_summary = summarizer.format_summary_response(result)
         
         return jsonify({
@@ -291,107 +439,131 @@ def get_folder_summary_api(folder_path):
 
 
 
-def _execute_command(command: str, parsed_command: dict) -> str:
+def _execute_command(command: str, parsed_command: dict, whatsapp_number: str, raise_errors: bool = False) -> str:
     try:
         # print('command' , command)
         # print('parsed_command' , parsed_command)
-        # print(GoogleDriveClient.serv  ice)
 
-     
-        whatsapp_number = getattr(command_parser, 'current_whatsapp_number', None)
-        
-        if not drive_client.service:
-            res = drive_client.is_authenticated(whatsapp_number)
-            if not res:
-                return 'Please first sign in to your google drive account to use this command. Visit http://localhost:3000/ to sign in.'
+        # Each call gets its own session, so concurrent commands of different users never share a Drive client
+        session = session_manager.open(whatsapp_number)
+        if not session:
+            return 'Please first sign in to your google drive account to use this command. Visit http://localhost:3000/ to sign in.'
 
+        return _dispatch_command(command, parsed_command, session.drive_client)
 
+    except Exception as e:
+        print(f"Error executing command {command}: {e}")
+        if raise_errors:
+            raise
+        return f"❌ Error executing command: {str(e)}"
 
-        if command == "LIST":
-            folder_path = parsed_command.get("folder_path")
 
-            result = drive_client.list_files(folder_path)
+def _dispatch_command(command: str, parsed_command: dict, drive_client: GoogleDriveClient) -> str:
+    if command == "LIST":
+        folder_path = parsed_command.get("folder_path")
 
-            # print("list result" , result)
-            return _format_list_response(result)
-        
-        elif command == "DELETE":
-            file_path = parsed_command.get("file_path")
-            result = drive_client.delete_file(file_path)
-            # print("delete result" , result)
-            return _format_delete_response(result)
-        
-        elif command == "MOVE":
-            source_path = parsed_command.get("source_path")
-            destination_path = parsed_command.get("destination_path")
+        result = drive_client.list_files(folder_path, Config.LIST_MESSAGE_MAX_FILES)
 
-            print("source_path" , source_path)
-            print("destination_path" , destination_path)
+        # print("list result" , result)
+        return _format_list_response(result)
+    
+    elif command in ("DELETE", "MOVE", "COPY") and parsed_command.get("is_pattern"):
+        result = drive_client.bulk_operation(
+            command.lower(),
+            parsed_command.get("file_path") or parsed_command.get("source_path"),
+            parsed_command.get("destination_path"),
+            parsed_command.get("dry_run", False)
+        )
+        return _format_bulk_response(result)
+
+    elif command in ("DELETE", "MOVE", "COPY") and parsed_command.get("dry_run"):
+        # PREVIEW of a single path: report what would change without touching the file
+        result = drive_client.preview_operation(
+            command.lower(),
+            parsed_command.get("file_path") or parsed_command.get("source_path"),
+            parsed_command.get("destination_path")
+        )
+        return _format_bulk_response(result)
+
+    elif command == "DELETE":
+        file_path = parsed_command.get("file_path")
+        result = drive_client.delete_file(file_path)
+        # print("delete result" , result)
+        return _format_delete_response(result)
+    
+    elif command == "MOVE":
+        source_path = parsed_command.get("source_path")
+        destination_path = parsed_command.get("destination_path")
 
-            result = drive_client.move_file(source_path, destination_path)
-            # print("move result" , result)
-            return _format_move_response(result)
-        
-        elif command == "COPY":
-            source_path = parsed_command.get("source_path")
-            destination_path = parsed_command.get("destination_path")
+        print("source_path" , source_path)
+        print("destination_path" , destination_path)
 
-            print("source_path" , source_path)
-            print("destination_path" , destination_path)
+        result = drive_client.move_file(source_path, destination_path)
+        # print("move result" , result)
+        return _format_move_response(result)
+    
+    elif command == "COPY":
+        source_path = parsed_command.get("source_path")
+        destination_path = parsed_command.get("destination_path")
 
+        print("source_path" , source_path)
+        print("destination_path" , destination_path)
 
-            result = drive_client.copy_file(source_path, destination_path)
 
+        result = drive_client.copy_file(source_path, destination_path)
 
-            # print("copy result" , result)
 
-            return _format_copy_response(result)
-        
+        # print("copy result" , result)
 
+        return _format_copy_response(result)
+    
 
 
 
-        elif command == "FOLDERSUMMARY":
-            print('folder summary')
 
-            folder_path = parsed_command.get("folder_path")
+    elif command == "FOLDERSUMMARY":
+        print('folder summary')
 
+        folder_path = parsed_command.get("folder_path")
 
-            result = summarizer.summarize_folder(drive_client , folder_path)
 
-            formatted_summary = summarizer.format_summary_response(result)
+        summarizer = _get_summarizer()
+        result = summarizer.summarize_folder(drive_client , folder_path,
+                                             concurrency=parsed_command.get("concurrency"),
+                                             token_budget=parsed_command.get("token_budget"))
 
-            print("formatted_summary" , formatted_summary)
-            
-            return formatted_summary
+        formatted_summary = summarizer.format_summary_response(result)
 
-            
+        print("formatted_summary" , formatted_summary)
         
-        elif command == "FILESUMMARY":
-            print('file summary')
+        return formatted_summary
 
-            file_path = parsed_command.get("file_path")
+        
+    
+    elif command == "FILESUMMARY":
+        print('file summary')
 
-            result = summarizer.summarize_single_document(drive_client , file_path)
+        file_path = parsed_command.get("file_path")
 
-            formatted_summary = summarizer.format_summary_response(result)
+        summarizer = _get_summarizer()
+        result = summarizer.summarize_single_document(drive_client , file_path,
+                                                      concurrency=parsed_command.get("concurrency"),
+                                                      token_budget=parsed_command.get("token_budget"))
 
-            # print("formatted_summary" , formatted_summary)
+        formatted_summary = summarizer.format_summary_response(result)
 
-            return formatted_summary
-        
-        
-        elif command == "HELP":
-            text = parsed_command.get("help_text")
-            # print("help text" , text)
-            return text
-        
-        else:
-            return f"❌ Unsupported command: {command}"
-            
-    except Exception as e:
-        print(f"Error executing command {command}: {e}")
-        return f"❌ Error executing command: {str(e)}"
+        # print("formatted_summary" , formatted_summary)
+
+        return formatted_summary
+    
+    
+    elif command == "HELP":
+        text = parsed_command.get("help_text")
+        # print("help text" , text)
+        return text
+    
+    else:
+        return f"❌ Unsupported command: {command}"
 
 
 
@@ -417,6 +589,9 @@ def _format_list_response(result: dict) -> str:
         response += f"   📏 Size: {file_info['size']}\n"
         response += f"   📅 Modified: {file_info['modified']}\n\n"
     
+    if result.get("has_more"):
+        response += f"ℹ️ Showing the first {len(files)} files; open the folder in Google Drive to see the rest\n"
+    
     return response
 
 
@@ -458,6 +633,35 @@ def _format_copy_response(result: dict) -> str:
 
 
 
+def _format_bulk_response(result: dict) -> str:
+    if "error" in result:
+        return f"❌ {result['error']}"
+
+    verbs = {"delete": "deleted", "move": "moved", "copy": "copied"}
+    verb = verbs.get(result.get("op"), "processed")
+    destination = f" to {result['destination_path']}" if result.get("destination_path") else ""
+
+    if result.get("dry_run"):
+        response = f"👀 *Preview:* {len(result['paths'])} file(s) would be {verb}{destination}\n\n"
+        for i, path in enumerate(result["paths"], 1):
+            response += f"{i}. {path}\n"
+        return response
+
+    outcomes = list(zip(result["paths"], result["results"]))
+    succeeded = [path for path, outcome in outcomes if outcome.get("success")]
+    response = f"✅ {len(succeeded)} of {len(outcomes)} file(s) {verb}{destination}\n"
+
+    for path, outcome in outcomes:
+        if not outcome.get("success"):
+            response += f"\n❌ {path}: {outcome.get('error')}"
+
+    return response
+
+
+
+
+
+
 def _create_twilio_response(message: str) -> str:
     resp = MessagingResponse()
     resp.message(message)
@@ -483,12 +687,107 @@ def is_authenticated():
     if not whatsapp_number:
         return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
     
-    is_authenticated = drive_client.is_authenticated(whatsapp_number)
+    is_authenticated = GoogleDriveClient().is_authenticated(whatsapp_number)
 
     print("is_authenticated" , is_authenticated)
 
     return jsonify({"success": True, "authenticated": is_authenticated})
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose cache counters for monitoring"""
+    return jsonify({
+        "success": True,
+        "service_cache": service_cache.stats(),
+        "token_cache": storage.cache_stats(),
+        "token_refresh": token_refresher.stats(),
+        "path_cache": path_cache.stats(),
+        "folder_index": folder_indexes.stats(),
+        "metadata_mirror": metadata_mirrors.stats(),
+        "extraction_pool": extraction_pool.stats(),
+        "summary_cache": summary_cache.stats(),
+        "text_cache": text_cache.stats(),
+        "downloads": download_stats.stats(),
+        "jobs": job_queue.stats(),
+        "http_pool": http_pool.stats(),
+        "warm_start": warm_start.stats(),
+        "startup": startup_stats
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a command and return its job id; poll /api/jobs/<id> for the result.
+    Takes either a structured job ({"type": "file_summary", "path": "/My Report.pdf"}),
+    whose path is used as given, or a WhatsApp-style command in "message".
+    """
+    data = request.get_json() or {}
+    job_type = data.get('type')
+    message_body = data.get('message', '')
+    whatsapp_number = data.get('whatsapp_number')
+
+    if not job_type and not message_body:
+        return jsonify({"success": False, "error": "No message provided"}), 400
+
+    if not whatsapp_number:
+        return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
+
+    if job_type:
+        command = JOB_TYPES.get(job_type)
+        path = data.get('path')
+        if not command:
+            return jsonify({"success": False, "error": f"Unknown job type: {job_type}"}), 400
+        if not isinstance(path, str) or not path:
+            return jsonify({"success": False, "error": "A path is required"}), 400
+        parsed_command = {"success": True, "command": command, "file_path": path, "folder_path": path}
+    else:
+        parsed_command = command_parser.parse_message(message_body)
+        if not parsed_command.get("success", False):
+            return jsonify({
+                "success": False,
+                "error": parsed_command.get("error", "Unknown error"),
+                "response": command_parser.format_response(parsed_command)
+            }), 400
+
+    # Summary limits for this job only (see DocumentSummarizer.summarize_single_document)
+    for option in ("concurrency", "token_budget"):
+        if isinstance(data.get(option), int):
+            parsed_command[option] = data[option]
+
+    job_id = job_queue.enqueue(whatsapp_number, parsed_command.get("command"), {"parsed_command": parsed_command})
+    return jsonify({"success": True, "job_id": job_id, "status": job_queue.QUEUED}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    return jsonify({"success": True, "job": _format_job(job)})
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    whatsapp_number = request.args.get('whatsapp_number')
+
+    if not whatsapp_number:
+        return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
+
+    jobs = job_queue.list_for(whatsapp_number)
+    return jsonify({"success": True, "jobs": [_format_job(job) for job in jobs]})
+
+def _format_job(job: dict) -> dict:
+    """Public view of a job (omits the stored payload and lease bookkeeping)"""
+    return {
+        "id": job["id"],
+        "command": job["command"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect():
     data = request.get_json()
@@ -501,16 +800,52 @@ def disconnect():
     if not whatsapp_number:
         return jsonify({"success": False, "error": "WhatsApp number is required"}), 400
     
-    status = drive_client.disconnect(whatsapp_number)
+    status = GoogleDriveClient().disconnect(whatsapp_number)
 
 
     return jsonify({"success": status})
 
 
+_background_workers_lock = threading.Lock()
+_background_workers_started = False
+
+
+def start_background_workers() -> None:
+    """
+    Start the job workers and the token refresher in this process.
+    Not done at import time: anything that merely imports this module (utils.startup,
+    tests, a gunicorn master before it forks) would otherwise claim real jobs.
+    Called from __main__, from gunicorn's post_fork hook (gunicorn.conf.py) and,
+    for other WSGI hosts, on the first request. Safe to call more than once.
+    """
+    global _background_workers_started
+    with _background_workers_lock:
+        if _background_workers_started:
+            return
+        _background_workers_started = True
+
+        job_queue.start(_run_job, Config.JOB_WORKERS, _on_job_finished)
+
+        if Config.TOKEN_REFRESH_ENABLED:
+            token_refresher.start()
+
+
+@app.before_request
+def _ensure_background_workers():
+    if not _background_workers_started:
+        start_background_workers()
+
+
+record_startup(_import_started)
+
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'DEV'
     
+    # With the debug reloader only the child process serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
+    
     # print(f"Starting WhatsApp Drive Assistant API on port {port}")
     app.run(host='0.0.0.0', port=port, debug=debug)
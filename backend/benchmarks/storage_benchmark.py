@@ -0,0 +1,77 @@
+"""
+Token storage backends at many users.
+
+Run from the backend directory:
+
+    python -m benchmarks.storage_benchmark [--users 10000]
+
+which saves and loads one token per user and queries the tokens due for
+refresh, for the file and SQLite backends, in a temporary directory.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+from utils.storage import FileStorageBackend, SqliteStorageBackend
+
+
+def storage_benchmark(users: int = 10000) -> Dict[str, Dict[str, float]]:
+    """
+    Seconds to save and then load one token per user, and milliseconds for one
+    query of the tokens due for refresh, per backend. The token cache is not used.
+    """
+    now = time.time()
+    numbers = [f"whatsapp:+1555{index:07d}" for index in range(users)]
+    # Expiries spread over the next hour; the query asks for the first five minutes
+    tokens = {
+        number: {"token": "access", "refresh_token": "refresh",
+                 "expiry": datetime.fromtimestamp(now + index % 3600, timezone.utc).isoformat()}
+        for index, number in enumerate(numbers)
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            "file": FileStorageBackend(os.path.join(directory, 'files')),
+            "sqlite": SqliteStorageBackend(os.path.join(directory, 'sqlite', 'tokens.db'))
+        }
+        return {name: _time_backend(backend, numbers, tokens, now) for name, backend in backends.items()}
+
+
+def _time_backend(backend, numbers: List[str], tokens: Dict[str, Dict[str, Any]], now: float) -> Dict[str, float]:
+    # The file backend logs every call; keep the terminal out of the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        for number in numbers:
+            backend.save_token(tokens[number], number)
+        saved = time.perf_counter()
+        for number in numbers:
+            backend.load_token(number)
+        loaded = time.perf_counter()
+        backend.tokens_expiring_before(now + 300, limit=len(numbers))
+        queried = time.perf_counter()
+
+    return {
+        "save_s": round(saved - started, 2),
+        "load_s": round(loaded - saved, 2),
+        "expiring_query_ms": round((queried - loaded) * 1000, 1)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Token storage backends at many users")
+    parser.add_argument('--users', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'save s':>7}  {'load s':>7}  {'expiring query ms':>18}  backend ({args.users} users)")
+    for name, result in storage_benchmark(args.users).items():
+        print(f"{result['save_s']:>7.2f}  {result['load_s']:>7.2f}  {result['expiring_query_ms']:>18.1f}  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# gunicorn -c gunicorn.conf.py api_server:app
+
+
+def post_fork(server, worker):
+    # Each worker runs its own job workers and token refresher; threads started in the master would not survive the fork
+    import api_server
+    api_server.start_background_workers()
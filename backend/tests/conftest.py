@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Config reads the environment once, at import; point every on-disk store at a scratch directory
+# and keep background workers off before any utils module is imported
+_scratch_dir = tempfile.mkdtemp(prefix='whatsapp-drive-tests-')
+os.environ['STORAGE_DIR'] = _scratch_dir
+os.environ.setdefault('STORAGE_BACKEND', 'file')
+os.environ.setdefault('TOKEN_REFRESH_ENABLED', 'false')
+os.environ.setdefault('WARM_START_ENABLED', 'false')
+os.environ.setdefault('MESSAGE_SENDER', 'fake')
+os.environ.setdefault('EXTRACTION_WORKERS', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
@@ -0,0 +1,293 @@
+"""
+In-memory stand-in for the Drive v3 service object returned by googleapiclient.
+
+Covers the calls this app makes: files().list/get/update/copy/delete/
+get_media/export_media, changes().getStartPageToken/list and batch requests.
+Every round trip (execute(), a media chunk or a whole batch) is counted in
+FakeDrive.calls, keyed by method name, so tests can assert how many API calls
+an operation makes. Mutations are appended to a changes feed like Drive's.
+"""
+import re
+import copy
+import itertools
+import threading
+from collections import Counter
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+MODIFIED_TIME = '2024-01-01T00:00:00.000Z'
+
+# Shared by every FakeDrive so ids never repeat within a test run (the text cache is keyed by file id)
+_ids = itertools.count(1)
+
+
+class FakeDriveError(Exception):
+    """Raised for unknown file ids, like a 404 from the API"""
+
+
+class FakeRequest:
+    def __init__(self, drive, method, handler):
+        self.drive = drive
+        self.method = method
+        self.handler = handler
+
+    def execute(self):
+        self.drive.record(self.method)
+        return self.handler()
+
+
+class FakeMediaResponse(dict):
+    """httplib2.Response look-alike: a header dict with a status attribute"""
+
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+        self.reason = 'OK'
+
+
+class FakeMediaHttp:
+    """Serves HTTP Range requests the way MediaIoBaseDownload issues them"""
+
+    def __init__(self, drive, method, content):
+        self.drive = drive
+        self.method = method
+        self.content = content
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.drive.record(self.method)
+        start, end = 0, len(self.content) - 1
+        match = re.match(r"bytes=(\d+)-(\d+)", (headers or {}).get('range', ''))
+        if match:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(self.content) - 1)
+        chunk = self.content[start:end + 1]
+        response = FakeMediaResponse(206, {'content-range': f"bytes {start}-{end}/{len(self.content)}"})
+        return response, chunk
+
+
+class FakeMediaRequest(FakeRequest):
+    def __init__(self, drive, method, content):
+        super().__init__(drive, method, lambda: content)
+        self.uri = f"https://fake.drive/{method}"
+        self.headers = {}
+        self.http = FakeMediaHttp(drive, method, content)
+
+
+class FakeBatch:
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request, request_id))
+
+    def execute(self):
+        # One multipart round trip, however many calls it carries
+        self.drive.record('batch')
+        for request, request_id in self.requests:
+            try:
+                response = request.handler()
+            except Exception as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
+
+
+class _Files:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q=None, pageSize=100, pageToken=None, fields=None, **kwargs):
+        def handler():
+            matches = sorted(
+                (file for file in self.drive.items.values() if self.drive.matches(file, q)),
+                key=lambda file: (file['name'].casefold(), file['id'])
+            )
+            start = int(pageToken or 0)
+            page = matches[start:start + pageSize]
+            result = {"files": [self.drive.public(file) for file in page]}
+            if start + pageSize < len(matches):
+                result["nextPageToken"] = str(start + pageSize)
+            return result
+        return FakeRequest(self.drive, 'files.list', handler)
+
+    def get(self, fileId, fields=None, **kwargs):
+        return FakeRequest(self.drive, 'files.get', lambda: self.drive.public(self.drive.lookup(fileId)))
+
+    def update(self, fileId, addParents=None, removeParents=None, body=None, fields=None, **kwargs):
+        def handler():
+            file = self.drive.lookup(fileId)
+            parents = [parent for parent in file['parents'] if parent not in (removeParents or '').split(',')]
+            parents += [parent for parent in (addParents or '').split(',') if parent]
+            file['parents'] = parents
+            file.update(body or {})
+            self.drive.log_change(file['id'])
+            return self.drive.public(file)
+        return FakeRequest(self.drive, 'files.update', handler)
+
+    def copy(self, fileId, body=None, fields=None, **kwargs):
+        def handler():
+            source = self.drive.lookup(fileId)
+            body_ = body or {}
+            file_id = self.drive.add_file(
+                body_.get('name', source['name']),
+                body_.get('parents', source['parents']),
+                source['mimeType'],
+                source['content']
+            )
+            return self.drive.public(self.drive.items[file_id])
+        return FakeRequest(self.drive, 'files.copy', handler)
+
+    def delete(self, fileId, **kwargs):
+        def handler():
+            self.drive.lookup(fileId)
+            self.drive.remove(fileId)
+            return ""
+        return FakeRequest(self.drive, 'files.delete', handler)
+
+    def get_media(self, fileId, **kwargs):
+        return FakeMediaRequest(self.drive, 'files.get_media', self.drive.lookup(fileId)['content'])
+
+    def export_media(self, fileId, mimeType=None, **kwargs):
+        return FakeMediaRequest(self.drive, 'files.export_media', self.drive.lookup(fileId)['content'])
+
+
+class _Changes:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.drive, 'changes.getStartPageToken',
+                           lambda: {"startPageToken": str(len(self.drive.change_log))})
+
+    def list(self, pageToken, pageSize=100, includeRemoved=True, fields=None, **kwargs):
+        def handler():
+            start = int(pageToken)
+            page = self.drive.change_log[start:start + pageSize]
+            result = {"changes": copy.deepcopy(page)}
+            if start + pageSize < len(self.drive.change_log):
+                result["nextPageToken"] = str(start + pageSize)
+            else:
+                result["newStartPageToken"] = str(len(self.drive.change_log))
+            return result
+        return FakeRequest(self.drive, 'changes.list', handler)
+
+
+class FakeDrive:
+    """A small in-memory Drive with a root folder; build it up with add_folder/add_file"""
+
+    ROOT_ID = 'root-id'
+
+    def __init__(self):
+        self.items = {}  # file id -> resource (plus its content)
+        self.change_log = []
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    # -- Service interface ----------------------------------------------
+
+    def files(self):
+        return _Files(self)
+
+    def changes(self):
+        return _Changes(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    # -- Building and changing the Drive -------------------------------
+
+    def add_folder(self, name, parent=None):
+        return self.add_file(name, [parent or self.ROOT_ID], FOLDER_MIME_TYPE)
+
+    def add_file(self, name, parents=None, mime_type='text/plain', content=b''):
+        file_id = f"id{next(_ids)}"
+        self.items[file_id] = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "parents": list(parents or [self.ROOT_ID]),
+            "size": str(len(content)),
+            "modifiedTime": MODIFIED_TIME,
+            "md5Checksum": f"md5-{file_id}",
+            "trashed": False,
+            "content": content
+        }
+        self.log_change(file_id)
+        return file_id
+
+    def rename(self, file_id, name):
+        self.items[file_id]['name'] = name
+        self.log_change(file_id)
+
+    def trash(self, file_id):
+        self.items[file_id]['trashed'] = True
+        self.log_change(file_id)
+
+    def remove(self, file_id):
+        del self.items[file_id]
+        self.change_log.append({"fileId": file_id, "removed": True})
+
+    def log_change(self, file_id):
+        self.change_log.append({"fileId": file_id, "removed": False, "file": self.public(self.items[file_id])})
+
+    # -- Helpers ----------------------------------------------------------
+
+    def record(self, method):
+        with self._lock:
+            self.calls[method] += 1
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def lookup(self, file_id):
+        if file_id == 'root':
+            return {"id": self.ROOT_ID, "name": "My Drive", "mimeType": FOLDER_MIME_TYPE, "parents": []}
+        if file_id not in self.items:
+            raise FakeDriveError(f"File not found: {file_id}")
+        return self.items[file_id]
+
+    def public(self, file):
+        return {key: value for key, value in file.items() if key != 'content'}
+
+    def matches(self, file, query):
+        """Evaluate the subset of the Drive query language the app uses: clauses joined by 'and', '(... or ...)' groups"""
+        for clause in (query or '').split(' and '):
+            clause = clause.strip()
+            if not clause:
+                continue
+            if clause.startswith('(') and clause.endswith(')'):
+                if not any(self._matches_clause(file, alternative.strip()) for alternative in clause[1:-1].split(' or ')):
+                    return False
+            elif not self._matches_clause(file, clause):
+                return False
+        return True
+
+    def _matches_clause(self, file, clause):
+        match = re.fullmatch(r"trashed\s*=\s*(true|false)", clause)
+        if match:
+            return file['trashed'] == (match.group(1) == 'true')
+
+        match = re.fullmatch(r"'(.+)' in parents", clause)
+        if match:
+            parent = self.ROOT_ID if match.group(1) == 'root' else match.group(1)
+            return parent in file['parents']
+
+        match = re.fullmatch(r"(name|mimeType)\s*(!=|=)\s*'(.*)'", clause)
+        if match:
+            field, operator, value = match.groups()
+            value = re.sub(r"\\(.)", r"\1", value)
+            # Drive compares names case-insensitively (WhatsApp commands arrive upper-cased)
+            equal = file[field].casefold() == value.casefold() if field == 'name' else file[field] == value
+            return equal == (operator == '=')
+
+        match = re.fullmatch(r"modifiedTime\s*>\s*'(.*)'", clause)
+        if match:
+            # RFC 3339 timestamps in one format compare correctly as strings
+            return file['modifiedTime'] > match.group(1)
+
+        raise ValueError(f"Unsupported query clause: {clause}")
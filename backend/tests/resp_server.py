@@ -0,0 +1,175 @@
+"""
+Minimal in-process server speaking RESP2, the Redis wire protocol.
+
+Implements just the commands RedisStorageBackend sends (hashes, sorted sets,
+EXISTS/DEL, MULTI/EXEC for transactional pipelines), so the real redis-py
+client can be tested without a Redis server. Start it with RespServer().start()
+and point the client at its url.
+"""
+import threading
+import socketserver
+
+
+class RespError(Exception):
+    """Sent back to the client as a -ERR reply"""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        queued = None  # commands collected between MULTI and EXEC
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+
+            name = command[0].upper()
+            if name == 'MULTI':
+                queued = []
+                self._write(b'+OK\r\n')
+            elif name == 'EXEC':
+                replies = [self._run(queued_command) for queued_command in queued or []]
+                queued = None
+                self._write(b'*%d\r\n' % len(replies) + b''.join(replies))
+            elif queued is not None:
+                queued.append(command)
+                self._write(b'+QUEUED\r\n')
+            else:
+                self._write(self._run(command))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            raise ValueError(f"Expected a RESP array, got {line!r}")
+
+        arguments = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            arguments.append(self.rfile.read(length + 2)[:-2].decode())
+        return arguments
+
+    def _run(self, command):
+        try:
+            return _encode(self.server.store.execute(command[0].upper(), command[1:]))
+        except RespError as e:
+            return b'-ERR %s\r\n' % str(e).encode()
+
+    def _write(self, data):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+
+class _Status(str):
+    """A +simple string reply, as opposed to a bulk string"""
+
+
+def _encode(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, _Status):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(_encode(item) for item in value)
+    data = str(value).encode()
+    return b'$%d\r\n%s\r\n' % (len(data), data)
+
+
+def _score_bound(bound):
+    """ZRANGEBYSCORE bound -> (value, exclusive)"""
+    exclusive = bound.startswith('(')
+    return float(bound[1:] if exclusive else bound), exclusive
+
+
+class _Store:
+    def __init__(self):
+        self.data = {}  # key -> dict (hash) or dict of member -> score (sorted set)
+        self.lock = threading.Lock()
+
+    def execute(self, name, args):
+        handler = getattr(self, f"_{name.lower()}", None)
+        if handler is None:
+            raise RespError(f"unknown command '{name}'")
+        with self.lock:
+            return handler(*args)
+
+    def _ping(self, *args):
+        return _Status('PONG')
+
+    def _client(self, *args):
+        return _Status('OK')
+
+    def _select(self, db):
+        return _Status('OK')
+
+    def _hset(self, key, *pairs):
+        fields = self.data.setdefault(key, {})
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def _hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def _hmget(self, key, *fields):
+        stored = self.data.get(key, {})
+        return [stored.get(field) for field in fields]
+
+    def _exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def _del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _zadd(self, key, *pairs):
+        members = self.data.setdefault(key, {})
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in members
+            members[member] = float(score)
+        return added
+
+    def _zrem(self, key, *members):
+        stored = self.data.get(key, {})
+        removed = sum(stored.pop(member, None) is not None for member in members)
+        if key in self.data and not stored:
+            del self.data[key]
+        return removed
+
+    def _zrangebyscore(self, key, minimum, maximum, *options):
+        (low, low_exclusive), (high, high_exclusive) = _score_bound(minimum), _score_bound(maximum)
+        members = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        matches = [
+            member for member, score in members
+            if (score > low if low_exclusive else score >= low) and (score < high if high_exclusive else score <= high)
+        ]
+        if options and options[0].upper() == 'LIMIT':
+            offset, count = int(options[1]), int(options[2])
+            matches = matches[offset:] if count < 0 else matches[offset:offset + count]
+        return matches
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.store = _Store()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="resp-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,67 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("flask")
+
+import api_server
+from utils.service_cache import service_cache
+from utils.storage import storage
+from tests.fake_drive import FakeDrive
+
+USERS = 16
+REQUESTS_PER_USER = 6
+
+
+class SlowFakeDrive(FakeDrive):
+    """Yields the GIL on every round trip so requests from different users interleave"""
+
+    def record(self, method):
+        time.sleep(0.001)
+        super().record(method)
+
+
+@pytest.fixture
+def users():
+    """WhatsApp number -> name of the only file in that user's /Mine folder, each with their own Drive"""
+    users = {}
+    for index in range(USERS):
+        number = f"whatsapp:+{uuid.uuid4().int % 10**12}"
+        drive = SlowFakeDrive()
+        drive.add_file(f"owner-{index}.txt", [drive.add_folder('Mine')])
+
+        storage.save_token({"token": number}, number)
+        service_cache.put(number, drive, None, storage.token_version(number))
+        users[number] = f"owner-{index}.txt"
+
+    yield users
+
+    for number in users:
+        service_cache.invalidate(number)
+        storage.delete_token(number)
+
+
+def send(number):
+    client = api_server.app.test_client()
+    headers = {"X-WhatsApp-Number": number}
+    if random.random() < 0.5:
+        response = client.post('/api/execute', json={"message": "LIST /Mine"}, headers=headers)
+        return response.get_json()["response"]
+    response = client.get('/api/files', query_string={"folder": "/Mine"}, headers=headers)
+    return " ".join(file["name"] for file in response.get_json()["files"])
+
+
+def test_interleaved_requests_only_see_their_own_drive(users):
+    requests = [number for number in users for _ in range(REQUESTS_PER_USER)]
+    random.shuffle(requests)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(send, requests))
+
+    for number, response in zip(requests, responses):
+        others = [name for other, name in users.items() if other != number]
+        assert users[number] in response
+        assert not any(name in response for name in others)
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from utils.document_summarizer import DocumentSummarizer
+from utils.text_chunker import count_tokens
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel; records every prompt it is sent"""
+
+    def __init__(self, summary_words=5):
+        self.summary_words = summary_words
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            call = len(self.prompts)
+        return FakeResponse(" ".join(f"summary{call}word{index}" for index in range(self.summary_words)))
+
+    def merge_calls(self):
+        return [prompt for prompt in self.prompts if "Merge these summaries" in prompt]
+
+
+def make_summarizer(model, chunk_tokens=3000):
+    # Skips __init__, which needs a Gemini key and google.generativeai
+    summarizer = DocumentSummarizer.__new__(DocumentSummarizer)
+    summarizer.max_chars = 400000
+    summarizer.chunk_tokens = chunk_tokens
+    summarizer.client = model
+    return summarizer
+
+
+def document(words):
+    return " ".join(f"word{index}." for index in range(words))
+
+
+def test_reduce_cost():
+    summarizer = make_summarizer(FakeModel())
+    per_summary = DocumentSummarizer.PART_SUMMARY_TOKENS
+    prompt = DocumentSummarizer.PROMPT_TOKENS
+
+    assert summarizer._reduce_cost(1) == 0
+    # chunk_tokens // PART_SUMMARY_TOKENS = 15 summaries fit in one merge call
+    assert summarizer._reduce_cost(4) == 4 * per_summary + prompt
+    assert summarizer._reduce_cost(16) == 16 * per_summary + 2 * prompt + 2 * per_summary + prompt
+
+
+@pytest.mark.parametrize("token_budget", [500, 5000, 20000, 60000])
+def test_chunks_within_budget_fit_the_budget(token_budget):
+    summarizer = make_summarizer(FakeModel())
+    chunk_tokens = [3000] * 30
+
+    covered = summarizer._chunks_within_budget(chunk_tokens, token_budget)
+
+    assert 1 <= covered <= len(chunk_tokens)
+    if covered > 1:
+        spent = sum(chunk_tokens[:covered]) + covered * DocumentSummarizer.PROMPT_TOKENS
+        assert spent + summarizer._reduce_cost(covered) <= token_budget
+    if covered < len(chunk_tokens):
+        spent = sum(chunk_tokens[:covered + 1]) + (covered + 1) * DocumentSummarizer.PROMPT_TOKENS
+        assert spent + summarizer._reduce_cost(covered + 1) > token_budget
+
+
+def test_whole_budget_covers_every_chunk():
+    summarizer = make_summarizer(FakeModel())
+    assert summarizer._chunks_within_budget([3000] * 5, 10 ** 6) == 5
+
+
+def test_map_reduce_counts_every_call_it_makes():
+    model = FakeModel(summary_words=5)
+    summarizer = make_summarizer(model, chunk_tokens=100)
+
+    result = summarizer._map_reduce_summary(document(2000), "big.txt", concurrency=4, token_budget=10 ** 6)
+
+    assert result["chunks_summarized"] == result["chunks"] > 1
+    assert model.merge_calls()
+    assert result["tokens_used"] == sum(count_tokens(prompt) for prompt in model.prompts)
+
+
+def test_summaries_too_long_to_pair_skip_the_merge_calls():
+    # Every chunk summary fills a whole merge call, so none can be grouped
+    model = FakeModel(summary_words=60)
+    summarizer = make_summarizer(model, chunk_tokens=100)
+
+    result = summarizer._map_reduce_summary(document(300), "big.txt", concurrency=4, token_budget=10 ** 6)
+
+    assert model.merge_calls() == []
+    assert len(model.prompts) == result["chunks_summarized"] + 1
+    assert result["tokens_used"] == sum(count_tokens(prompt) for prompt in model.prompts)
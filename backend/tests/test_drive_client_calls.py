@@ -0,0 +1,128 @@
+"""
+How many Drive API round trips each GoogleDriveClient operation makes.
+Each test first builds the user's folder index, as the first command of a
+session does, so the counts below are those of a warm client.
+"""
+import uuid
+import pytest
+
+pytest.importorskip("googleapiclient.http")
+pytest.importorskip("google.oauth2.credentials")
+
+from utils.google_drive_client import GoogleDriveClient
+from tests.fake_drive import FakeDrive
+
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    drive.add_folder('Archive')
+    drive.add_file('notes.txt', [reports], 'text/plain', b'quarterly notes')
+    drive.add_file('plan', [reports], 'application/vnd.google-apps.document', b'the plan')
+    return drive
+
+
+@pytest.fixture
+def client(drive):
+    client = GoogleDriveClient()
+    client.service = drive
+    # A fresh number per test keeps the process-wide path cache and folder indexes apart
+    client.current_whatsapp_number = f"whatsapp:+{uuid.uuid4().int % 10**12}"
+
+    # Building the folder index costs three calls: the changes feed position, the root id
+    # and one listing of every folder
+    assert client._get_folder_id('/Reports')
+    assert drive.calls == {'changes.getStartPageToken': 1, 'files.get': 1, 'files.list': 1}
+    drive.reset_calls()
+    return client
+
+
+def test_get_document_content_text_file(client, drive):
+    result = client.get_document_content('/Reports/notes.txt')
+
+    assert result == {"content": "quarterly notes", "filename": "notes.txt"}
+    # One lookup of the file in its folder, one ranged download
+    assert drive.calls == {'files.list': 1, 'files.get_media': 1}
+
+
+def test_get_document_content_google_doc(client, drive):
+    result = client.get_document_content('/Reports/plan')
+
+    assert result["content"] == "the plan"
+    assert drive.calls == {'files.list': 1, 'files.export_media': 1}
+
+
+def test_get_document_content_again_makes_no_calls(client, drive):
+    client.get_document_content('/Reports/notes.txt')
+    drive.reset_calls()
+
+    # Path cache and text cache answer the repeat
+    assert client.get_document_content('/Reports/notes.txt')["content"] == "quarterly notes"
+    assert drive.total_calls() == 0
+
+
+def test_get_documents_content_lists_each_file_once(client, drive):
+    reports = client._get_folder_id('/Reports')
+    for index in range(3):
+        drive.add_file(f'extra{index}.txt', [reports], 'text/plain', b'extra')
+    paths = [f'/Reports/extra{index}.txt' for index in range(3)]
+    drive.reset_calls()
+
+    results = client.get_documents_content(paths)
+
+    assert [results[path]["content"] for path in paths] == ["extra"] * 3
+    assert drive.calls == {'files.list': 3, 'files.get_media': 3}
+
+
+def test_move_file(client, drive):
+    result = client.move_file('/Reports/notes.txt', '/Archive')
+
+    assert "error" not in result
+    # The file lookup returns its parents, so the move is a single update with no extra get
+    assert drive.calls == {'files.list': 1, 'files.update': 1}
+
+    archive = client._get_folder_id('/Archive')
+    moved = [file for file in drive.items.values() if file['name'] == 'notes.txt']
+    assert [file['parents'] for file in moved] == [[archive]]
+
+    # The moved file's new path is cached from the update response
+    drive.reset_calls()
+    assert client.get_file_metadata('/Archive/notes.txt')['parents'] == [archive]
+    assert drive.total_calls() == 0
+
+
+def test_copy_file(client, drive):
+    result = client.copy_file('/Reports/notes.txt', '/Archive')
+
+    assert "error" not in result
+    assert drive.calls == {'files.list': 1, 'files.copy': 1}
+    assert drive.items[result["file_id"]]['parents'] == [client._get_folder_id('/Archive')]
+
+
+def test_missing_destination_makes_no_write(client, drive):
+    result = client.move_file('/Reports/notes.txt', '/Nowhere')
+
+    assert "error" in result
+    assert drive.calls['files.update'] == 0
+
+
+def test_batch_resolves_paths_with_one_listing_per_folder(client, drive):
+    reports = client._get_folder_id('/Reports')
+    archive = client._get_folder_id('/Archive')
+    for index in range(120):
+        drive.add_file(f'r{index}.tmp', [reports])
+    for index in range(5):
+        drive.add_file(f'a{index}.tmp', [archive])
+    drive.reset_calls()
+
+    operations = [{"op": "delete", "path": f"/Reports/r{index}.tmp"} for index in range(120)]
+    operations += [{"op": "copy", "source_path": f"/Archive/a{index}.tmp", "destination_path": "/Reports"} for index in range(5)]
+    operations.append({"op": "delete", "path": "/Reports/missing.tmp"})
+    results = client.batch_execute(operations)["results"]
+
+    assert [result["success"] for result in results] == [True] * 125 + [False]
+    # Lookups: /Reports in three groups of at most 50 names, /Archive in one; the 125 writes go in two batches of 100
+    assert drive.calls == {'files.list': 4, 'batch': 2}
+    assert not [file for file in drive.items.values() if file['name'].startswith('r') and file['name'].endswith('.tmp')]
+    assert len([file for file in drive.items.values() if reports in file['parents'] and file['name'].startswith('a')]) == 5
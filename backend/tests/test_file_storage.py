@@ -0,0 +1,22 @@
+import os
+
+from utils.storage import FileStorageBackend
+
+
+def test_tokens_live_under_storage_dir(tmp_path, monkeypatch):
+    storage_dir = tmp_path / 'tokens'
+    elsewhere = tmp_path / 'cwd'
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    backend = FileStorageBackend(str(storage_dir))
+
+    assert backend.save_token({"token": "secret", "expiry": "2000-01-01T00:00:00Z"}, 'whatsapp:+1')
+
+    assert os.listdir(storage_dir) == ['token_whatsapp:+1.json']
+    assert os.listdir(elsewhere) == []
+    assert backend.load_token('whatsapp:+1')["token"] == "secret"
+    assert backend.tokens_expiring_before(0) == []
+    assert backend.tokens_expiring_before(10**10) == ['whatsapp:+1']
+
+    assert backend.delete_token('whatsapp:+1')
+    assert not backend.token_exists('whatsapp:+1')
@@ -0,0 +1,69 @@
+from utils.folder_index import FolderIndex
+from tests.fake_drive import FakeDrive
+
+
+def built(drive):
+    index = FolderIndex()
+    index.build(drive)
+    drive.reset_calls()
+    return index
+
+
+def test_refresh_drops_trashed_and_deleted_folders():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    archive = drive.add_folder('Archive')
+    old = drive.add_folder('2023', archive)
+    index = built(drive)
+    assert index.resolve('/Archive/2023') == old
+
+    drive.trash(reports)
+    drive.remove(archive)
+    drive.remove(old)
+    index.refresh(drive)
+
+    assert index.resolve('/Reports') is None
+    assert index.resolve('/Archive') is None
+    assert index.resolve('/Archive/2023') is None
+    assert drive.calls == {'changes.list': 1}
+
+
+def test_refresh_applies_new_renamed_and_moved_folders():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    archive = drive.add_folder('Archive')
+    index = built(drive)
+
+    new = drive.add_folder('New')
+    drive.rename(reports, 'Quarterly')
+    drive.files().update(fileId=archive, addParents=new, removeParents=FakeDrive.ROOT_ID).execute()
+    drive.add_file('notes.txt')
+    index.refresh(drive)
+
+    assert index.resolve('/Reports') is None
+    assert index.resolve('/Quarterly') == reports
+    assert index.resolve('/New/Archive') == archive
+    assert index.resolve('/Archive') is None
+    assert index.resolve('/notes.txt') is None
+
+
+def test_refresh_with_no_changes_keeps_the_index():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    index = built(drive)
+
+    assert index.refresh(drive) == 0
+    assert index.resolve('/reports') == reports
+
+
+def test_state_round_trip_continues_from_the_same_token():
+    drive = FakeDrive()
+    drive.add_folder('Reports')
+    index = built(drive)
+
+    restored = FolderIndex.from_state(index.to_state())
+    drive.add_folder('Later')
+    restored.refresh(drive)
+
+    assert restored.resolve('/Later') is not None
+    assert restored.resolve('/Reports') is not None
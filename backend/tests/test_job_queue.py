@@ -0,0 +1,101 @@
+import time
+import threading
+
+from utils.job_queue import JobQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / 'jobs.db'), retry_backoff=0, poll_interval=0.01, **kwargs)
+
+
+def test_expired_lease_cannot_complete_or_fail(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.05)
+    job_id = queue.enqueue('whatsapp:+1', 'FILESUMMARY', {})
+
+    first = queue.claim()
+    time.sleep(0.1)
+    second = queue.claim()
+
+    assert second['id'] == job_id and second['lease_token'] != first['lease_token']
+    assert not queue.complete(job_id, first['lease_token'], 'stale')
+    assert queue.fail(job_id, first['lease_token'], 'stale')
+    assert queue.get(job_id)['status'] == JobQueue.RUNNING
+
+    assert queue.complete(job_id, second['lease_token'], 'fresh')
+    assert queue.get(job_id)['result'] == 'fresh'
+
+
+def test_running_job_keeps_its_lease(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.3)
+    other = make_queue(tmp_path, visibility_timeout=0.3)
+    queue.enqueue('whatsapp:+1', 'FILESUMMARY', {})
+    started = threading.Event()
+    finished = []
+
+    def slow_handler(job):
+        started.set()
+        time.sleep(1)
+        return 'done'
+
+    queue.start(slow_handler, workers=1, on_finished=lambda job, succeeded: finished.append(job['result']))
+    try:
+        assert started.wait(5)
+        # Well past visibility_timeout, the heartbeat has kept the job leased
+        for _ in range(8):
+            assert other.claim() is None
+            time.sleep(0.1)
+
+        deadline = time.time() + 5
+        while not finished and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        queue.stop(timeout=5)
+
+    assert finished == ['done']
+    assert queue.stats()['done'] == 1
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_job(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.05, max_attempts=2)
+    job_id = queue.enqueue('whatsapp:+1', 'FILESUMMARY', {})
+
+    # Two workers claim the job in turn and both die without calling fail()
+    assert queue.claim()['attempts'] == 1
+    time.sleep(0.1)
+    assert queue.claim()['attempts'] == 2
+    time.sleep(0.1)
+
+    assert queue.claim() is None
+    abandoned = queue.fail_abandoned()
+    assert [job['id'] for job in abandoned] == [job_id]
+    assert queue.get(job_id)['status'] == JobQueue.FAILED
+    assert queue.fail_abandoned() == []
+
+
+def test_worker_reports_abandoned_jobs(tmp_path):
+    queue = make_queue(tmp_path, visibility_timeout=0.05, max_attempts=1)
+    queue.enqueue('whatsapp:+1', 'FILESUMMARY', {})
+    queue.claim()
+    time.sleep(0.1)
+    finished = []
+
+    queue.start(lambda job: 'never runs', workers=1, on_finished=lambda job, succeeded: finished.append(succeeded))
+    try:
+        deadline = time.time() + 5
+        while not finished and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        queue.stop(timeout=5)
+
+    assert finished == [False]
+
+
+def test_dedupe_key_enqueues_once(tmp_path):
+    queue = make_queue(tmp_path)
+
+    first = queue.enqueue('whatsapp:+1', 'FILESUMMARY', {}, dedupe_key='SM123')
+    second = queue.enqueue('whatsapp:+1', 'FILESUMMARY', {}, dedupe_key='SM123')
+    other = queue.enqueue('whatsapp:+1', 'FILESUMMARY', {})
+
+    assert first == second != other
+    assert queue.stats()['queued'] == 2
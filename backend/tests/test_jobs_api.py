@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import api_server
+from utils.job_queue import job_queue
+
+
+@pytest.fixture
+def client():
+    return api_server.app.test_client()
+
+
+def test_structured_summary_job_keeps_the_path_as_given(client):
+    response = client.post('/api/jobs', json={
+        "type": "file_summary", "path": "/My Report.pdf", "whatsapp_number": "whatsapp:+1"
+    })
+
+    assert response.status_code == 202
+    job = job_queue.get(response.get_json()["job_id"])
+    assert job["command"] == "FILESUMMARY"
+    assert job["payload"]["parsed_command"]["file_path"] == "/My Report.pdf"
+
+
+def test_folder_summary_job(client):
+    response = client.post('/api/jobs', json={
+        "type": "folder_summary", "path": "/Team Docs", "whatsapp_number": "whatsapp:+1"
+    })
+
+    job = job_queue.get(response.get_json()["job_id"])
+    assert job["command"] == "FOLDERSUMMARY"
+    assert job["payload"]["parsed_command"]["folder_path"] == "/Team Docs"
+
+
+@pytest.mark.parametrize("payload", [
+    {"type": "delete_everything", "path": "/x"},
+    {"type": "file_summary"},
+    {"type": "file_summary", "path": ""},
+])
+def test_invalid_structured_jobs_are_rejected(client, payload):
+    response = client.post('/api/jobs', json=dict(payload, whatsapp_number="whatsapp:+1"))
+    assert response.status_code == 400
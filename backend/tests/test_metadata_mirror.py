@@ -0,0 +1,93 @@
+import pytest
+from utils.metadata_mirror import MetadataMirror
+from tests.fake_drive import FakeDrive
+
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    drive.add_file('q1.pdf', [reports], 'application/pdf')
+    drive.add_file('notes.txt')
+    return drive
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return MetadataMirror(str(tmp_path / 'mirror.db'))
+
+
+def names(files):
+    return sorted(file['name'] for file in files)
+
+
+def test_seed_loads_listing_and_start_token(drive, mirror):
+    assert not mirror.is_seeded
+
+    assert mirror.seed(drive) == 3
+
+    assert mirror.is_seeded
+    assert mirror.root_id == FakeDrive.ROOT_ID
+    assert names(mirror.list_children(FakeDrive.ROOT_ID)) == ['Reports', 'notes.txt']
+    assert mirror.resolve_file('/reports/Q1.PDF')['name'] == 'q1.pdf'
+
+
+def test_sync_seeds_once_then_applies_only_new_changes(drive, mirror):
+    mirror.sync(drive)
+    drive.reset_calls()
+
+    reports = mirror.resolve_folder('/Reports')
+    drive.add_file('q2.pdf', [reports], 'application/pdf')
+
+    assert mirror.sync(drive) == 1
+    assert drive.calls == {'changes.list': 1}
+    assert names(mirror.list_children(reports)) == ['q1.pdf', 'q2.pdf']
+
+    # Nothing new: one cheap call, nothing applied
+    assert mirror.sync(drive) == 0
+
+
+def test_sync_follows_changes_pages(drive, mirror):
+    mirror.sync(drive)
+    for index in range(2500):
+        drive.add_file(f'file{index}.txt')
+    drive.reset_calls()
+
+    assert mirror.sync(drive) == 2500
+    assert drive.calls['changes.list'] == 3
+    assert len(mirror.list_children(FakeDrive.ROOT_ID)) == 2502
+
+
+def test_sync_applies_renames_and_moves(drive, mirror):
+    mirror.sync(drive)
+    notes = mirror.resolve_file('/notes.txt')['id']
+    archive = drive.add_folder('Archive')
+
+    drive.rename(notes, 'old-notes.txt')
+    drive.files().update(fileId=notes, addParents=archive, removeParents=FakeDrive.ROOT_ID).execute()
+    mirror.sync(drive)
+
+    assert mirror.resolve_file('/notes.txt') is None
+    assert mirror.resolve_file('/Archive/old-notes.txt')['id'] == notes
+
+
+def test_sync_drops_trashed_and_removed_files(drive, mirror):
+    mirror.sync(drive)
+    notes = mirror.resolve_file('/notes.txt')['id']
+    q1 = mirror.resolve_file('/Reports/q1.pdf')['id']
+
+    drive.trash(notes)
+    drive.remove(q1)
+    assert mirror.sync(drive) == 2
+
+    assert mirror.resolve_file('/notes.txt') is None
+    assert mirror.resolve_file('/Reports/q1.pdf') is None
+    assert names(mirror.list_children(mirror.resolve_folder('/Reports'))) == []
+
+
+def test_seed_starts_the_feed_before_listing(drive, mirror):
+    mirror.seed(drive)
+    late = drive.add_file('late.txt')
+    mirror.sync(drive)
+
+    assert mirror.resolve_file('/late.txt')['id'] == late
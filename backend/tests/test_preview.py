@@ -0,0 +1,73 @@
+import uuid
+import pytest
+
+pytest.importorskip("flask")
+
+import api_server
+from utils.google_drive_client import GoogleDriveClient
+from tests.fake_drive import FakeDrive
+
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    drive.add_folder('Archive')
+    drive.add_file('a.pdf', [reports], 'application/pdf')
+    drive.add_file('b.tmp', [reports])
+    return drive
+
+
+@pytest.fixture
+def client(drive):
+    client = GoogleDriveClient()
+    client.service = drive
+    client.current_whatsapp_number = f"whatsapp:+{uuid.uuid4().int % 10**12}"
+    return client
+
+
+def run(message, client):
+    parsed = api_server.command_parser.parse_message(message)
+    assert parsed["success"], parsed
+    return api_server._dispatch_command(parsed["command"], parsed, client)
+
+
+def writes(drive):
+    return sum(drive.calls[method] for method in ('files.delete', 'files.update', 'files.copy', 'batch'))
+
+
+@pytest.mark.parametrize("message", [
+    "DELETE /Reports/a.pdf PREVIEW",
+    "MOVE /Reports/a.pdf /Archive PREVIEW",
+    "COPY /Reports/a.pdf /Archive PREVIEW",
+    "DELETE /Reports/*.tmp PREVIEW",
+])
+def test_preview_changes_nothing(message, client, drive):
+    files_before = {file_id: dict(file) for file_id, file in drive.items.items()}
+
+    response = run(message, client)
+
+    assert "Preview" in response
+    assert writes(drive) == 0
+    assert drive.items == files_before
+
+
+def test_preview_of_missing_file_reports_it(client, drive):
+    assert "not found" in run("DELETE /Reports/missing.pdf PREVIEW", client)
+
+
+@pytest.mark.parametrize("message", [
+    "MOVE /Reports/a.pdf /Nowhere PREVIEW",
+    "MOVE /Reports/* /Nowhere PREVIEW",
+    "COPY /Reports/*.tmp /Nowhere PREVIEW",
+])
+def test_preview_of_missing_destination_reports_it(message, client, drive):
+    assert "not found" in run(message, client)
+    assert writes(drive) == 0
+
+
+def test_delete_without_preview_still_deletes(client, drive):
+    run("DELETE /Reports/a.pdf", client)
+
+    assert drive.calls['files.delete'] == 1
+    assert 'a.pdf' not in [file['name'] for file in drive.items.values()]
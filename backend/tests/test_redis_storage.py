@@ -0,0 +1,96 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("redis")
+
+from utils.storage import PersistentStorage, RedisStorageBackend, TokenCache
+from tests.resp_server import RespServer
+
+
+@pytest.fixture
+def server():
+    server = RespServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def workers(server):
+    """Two storages, like two gunicorn workers: separate backends, pools and token caches, one server"""
+    return [
+        PersistentStorage(RedisStorageBackend(server.url), TokenCache(validate_interval=0))
+        for _ in range(2)
+    ]
+
+
+def token(expires_in=3600, value="access"):
+    expiry = datetime.fromtimestamp(time.time() + expires_in, timezone.utc)
+    return {"token": value, "refresh_token": "refresh", "expiry": expiry.isoformat()}
+
+
+def test_token_saved_by_one_worker_is_loaded_by_the_other(workers):
+    first, second = workers
+    saved = token()
+
+    assert first.save_token(saved, 'whatsapp:+1')
+
+    assert second.load_token('whatsapp:+1') == saved
+    assert second.token_exists('whatsapp:+1')
+    assert second.load_token('whatsapp:+2') is None
+
+
+def test_version_changes_on_every_save(workers):
+    first, second = workers
+    first.save_token(token(), 'whatsapp:+1')
+    version = second.token_version('whatsapp:+1')
+
+    first.save_token(token(), 'whatsapp:+1')
+
+    assert version is not None
+    assert second.token_version('whatsapp:+1') != version
+    assert second.token_version('whatsapp:+2') is None
+
+
+def test_cached_token_is_revalidated_after_another_worker_writes(workers):
+    first, second = workers
+    first.save_token(token(value="old"), 'whatsapp:+1')
+    assert second.load_token('whatsapp:+1')["token"] == "old"
+
+    first.save_token(token(value="new"), 'whatsapp:+1')
+    assert second.load_token('whatsapp:+1')["token"] == "new"
+
+    first.delete_token('whatsapp:+1')
+    assert second.load_token('whatsapp:+1') is None
+    assert not second.token_exists('whatsapp:+1')
+
+
+def test_tokens_expiring_before(workers):
+    first, second = workers
+    now = time.time()
+    first.save_token(token(expires_in=600), 'whatsapp:+late')
+    first.save_token(token(expires_in=60), 'whatsapp:+soon')
+    first.save_token(token(expires_in=-60), 'whatsapp:+lapsed')
+    first.save_token({"token": "no expiry"}, 'whatsapp:+never')
+
+    assert second.tokens_expiring_before(now + 300) == ['whatsapp:+lapsed', 'whatsapp:+soon']
+    assert second.tokens_expiring_before(now + 3600, after=now) == ['whatsapp:+soon', 'whatsapp:+late']
+    assert second.tokens_expiring_before(now + 3600, limit=1) == ['whatsapp:+lapsed']
+
+    # Deleting a token, or saving one without an expiry, takes the user out of the refresh index
+    first.delete_token('whatsapp:+soon')
+    first.save_token({"token": "no expiry"}, 'whatsapp:+late')
+    assert second.tokens_expiring_before(now + 3600) == ['whatsapp:+lapsed']
+
+
+def test_load_tokens(workers):
+    first, second = workers
+    first.save_token(token(value="a"), 'whatsapp:+1')
+    first.save_token(token(value="b"), 'whatsapp:+2')
+
+    tokens = second.backend.load_tokens(['whatsapp:+1', 'whatsapp:+2', 'whatsapp:+3'])
+
+    assert {number: t and t["token"] for number, t in tokens.items()} == {
+        'whatsapp:+1': "a", 'whatsapp:+2': "b", 'whatsapp:+3': None
+    }
@@ -0,0 +1,61 @@
+import os
+import stat
+
+import pytest
+
+from utils.storage import SqliteStorageBackend
+from benchmarks.storage_benchmark import storage_benchmark
+
+posix_only = pytest.mark.skipif(not hasattr(os, 'getuid'), reason="POSIX permissions")
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@posix_only
+def test_database_and_side_files_are_private(tmp_path):
+    db_path = str(tmp_path / 'tokens' / 'tokens.db')
+    backend = SqliteStorageBackend(db_path)
+    backend.save_token({"token": "secret"}, 'whatsapp:+1')
+
+    assert mode(tmp_path / 'tokens') == 0o700
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        assert mode(path) == 0o600, path
+
+
+@posix_only
+def test_existing_readable_database_is_tightened(tmp_path):
+    db_path = str(tmp_path / 'tokens.db')
+    SqliteStorageBackend(db_path).save_token({"token": "secret"}, 'whatsapp:+1')
+    os.chmod(db_path, 0o644)
+
+    backend = SqliteStorageBackend(db_path)
+
+    assert mode(db_path) == 0o600
+    assert backend.load_token('whatsapp:+1') == {"token": "secret"}
+
+
+@posix_only
+def test_directory_others_can_write_is_refused(tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+
+    with pytest.raises(PermissionError):
+        SqliteStorageBackend(str(shared / 'tokens.db'))
+
+
+@posix_only
+def test_symlinked_database_is_refused(tmp_path):
+    target = tmp_path / 'elsewhere.db'
+    target.touch()
+    os.symlink(target, tmp_path / 'tokens.db')
+
+    with pytest.raises(OSError):
+        SqliteStorageBackend(str(tmp_path / 'tokens.db'))
+
+
+def test_benchmark_runs():
+    results = storage_benchmark(users=20)
+    assert set(results) == {"file", "sqlite"}
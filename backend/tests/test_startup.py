@@ -0,0 +1,28 @@
+from utils.startup import _parse_import_time, _slowest, _by_package
+
+# Shape of `python -X importtime` output: self us | cumulative us | two spaces of indent per depth
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |         urllib3.util
+import time:     40000 |      40300 |       urllib3
+import time:      2000 |       2000 |         google.auth.crypt
+import time:     30000 |      32000 |       google.auth
+import time:     50000 |     122300 |     googleapiclient.discovery
+import time:      1000 |     123300 |   utils.google_drive_client
+import time:      5000 |     128300 | api_server
+"""
+
+
+def test_nested_heavy_imports_are_ranked():
+    entries = _parse_import_time(SAMPLE)
+
+    assert [entry["module"] for entry in _slowest(entries, 3)] == ['googleapiclient.discovery', 'urllib3', 'google.auth']
+    assert {entry["module"]: entry["depth"] for entry in entries}['urllib3.util'] == 4
+
+
+def test_self_time_is_summed_per_package():
+    packages = _by_package(_parse_import_time(SAMPLE), 10)
+
+    assert [(package["package"], package["self_us"]) for package in packages[:3]] == [
+        ('googleapiclient', 50000), ('urllib3', 40300), ('google.auth', 32000)
+    ]
@@ -0,0 +1,32 @@
+from utils.text_chunker import count_tokens, chunk_text
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    # Words and punctuation count one each; each further four characters of a word add one
+    assert count_tokens("Hello, world!") == 6
+    assert count_tokens("a " * 10) == 10
+    assert count_tokens("internationalization") == 5
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("One paragraph.\n\nAnother one.", 100) == ["One paragraph.\n\nAnother one."]
+
+
+def test_paragraphs_are_kept_whole_where_they_fit():
+    paragraphs = [" ".join(f"p{index}w{word}" for word in range(20)) for index in range(5)]
+    chunks = chunk_text("\n\n".join(paragraphs), 70)
+
+    assert all(count_tokens(chunk) <= 70 for chunk in chunks)
+    assert [paragraph for chunk in chunks for paragraph in chunk.split("\n\n")] == paragraphs
+
+
+def test_long_paragraphs_and_sentences_are_split():
+    sentence = " ".join(f"word{index}" for index in range(100)) + "."
+    text = f"{sentence} {sentence}"
+
+    chunks = chunk_text(text, 30)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 30 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == text
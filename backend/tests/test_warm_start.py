@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from utils.warm_start import WarmStart
+
+
+@pytest.fixture
+def saved_snapshot(tmp_path):
+    path = str(tmp_path / 'warm_start.marshal')
+    writer = WarmStart(path)
+    writer.discovery()
+    assert writer.save(force=True)
+    return path
+
+
+def test_private_snapshot_is_loaded(saved_snapshot):
+    reader = WarmStart(saved_snapshot)
+    reader.discovery()
+    assert reader.discovery_source == "snapshot"
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="POSIX permissions")
+def test_snapshot_writable_by_others_is_ignored(saved_snapshot):
+    os.chmod(saved_snapshot, 0o666)
+
+    reader = WarmStart(saved_snapshot)
+    reader.discovery()
+    assert reader.discovery_source == "bundled"
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="needs symlinks")
+def test_symlinked_snapshot_is_ignored(saved_snapshot, tmp_path):
+    link = str(tmp_path / 'link.marshal')
+    os.symlink(saved_snapshot, link)
+
+    reader = WarmStart(link)
+    reader.discovery()
+    assert reader.discovery_source == "bundled"
+
+
+def test_background_save_writes_the_snapshot_off_the_caller_thread(tmp_path):
+    path = str(tmp_path / 'warm_start.marshal')
+    warm = WarmStart(path, save_interval=60)
+    warm.discovery()
+
+    assert warm.save_in_background()
+    # Within the interval (or while a save is running) nothing else is started
+    assert not warm.save_in_background()
+
+    deadline = time.time() + 5
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    assert os.stat(path).st_mode & 0o077 == 0
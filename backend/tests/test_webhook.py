@@ -0,0 +1,73 @@
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("flask")
+
+import api_server
+from utils.job_queue import JobQueue
+from utils.message_sender import FakeMessageSender
+from utils.service_cache import service_cache
+from utils.storage import storage
+from tests.fake_drive import FakeDrive
+
+
+@pytest.fixture
+def number():
+    number = f"whatsapp:+{uuid.uuid4().int % 10**12}"
+    drive = FakeDrive()
+    reports = drive.add_folder('Reports')
+    drive.add_file('a.tmp', [reports])
+    drive.add_file('b.tmp', [reports])
+
+    storage.save_token({"token": number}, number)
+    service_cache.put(number, drive, None, storage.token_version(number))
+    yield number
+
+    service_cache.invalidate(number)
+    storage.delete_token(number)
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), poll_interval=0.01)
+    monkeypatch.setattr(api_server, 'job_queue', queue)
+    yield queue
+    queue.stop(timeout=5)
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    sender = FakeMessageSender()
+    monkeypatch.setattr(api_server, 'message_sender', sender)
+    return sender
+
+
+def wait_until_idle(queue, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = queue.stats()
+        if not stats["queued"] and not stats["running"]:
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(f"Jobs still pending: {queue.stats()}")
+
+
+def test_twilio_retry_delivers_the_result_once(number, queue, sender):
+    client = api_server.app.test_client()
+    form = {"From": number, "Body": "DELETE /Reports/*.tmp", "MessageSid": "SM" + uuid.uuid4().hex}
+
+    # Twilio retries the webhook with the same MessageSid when the first response is slow
+    replies = [client.post('/api/webhook', data=form) for _ in range(2)]
+
+    for reply in replies:
+        assert reply.status_code == 200
+        assert "Working on it" in reply.get_data(as_text=True)
+
+    queue.start(api_server._run_job, 2, api_server._on_job_finished)
+    stats = wait_until_idle(queue)
+
+    assert stats["done"] == 1
+    assert len(queue.list_for(number)) == 1
+    assert len(sender.messages_for(number)) == 1
@@ -16,6 +16,9 @@ class CommandType(Enum):
 
 class CommandParser:
     """Parser for WhatsApp commands to Google Drive operations"""
+
+    WILDCARD_CHARS = ['*', '?']
+    PREVIEW_KEYWORDS = ['PREVIEW', '--DRY-RUN', 'DRYRUN']
     
     def __init__(self):
         """Initialize the command parser"""
@@ -102,59 +105,63 @@ class CommandParser:
 
 
     def _parse_delete_command(self, parts: list) -> Dict:
-        """Parse DELETE command"""
+        """Parse DELETE command, e.g. DELETE /Reports/*.tmp PREVIEW"""
+        parts, dry_run = self._pop_preview_flag(parts)
+
         if len(parts) < 2:
             return self._create_error_response("DELETE command requires a file path")
         
         file_path = parts[1]
-        if not self._is_valid_path(file_path):
+        is_pattern = self._is_pattern(file_path)
+
+        if not (self._is_valid_pattern(file_path) if is_pattern else self._is_valid_path(file_path)):
             return self._create_error_response("Invalid file path format")
         
         return {
             "command": "DELETE",
             "file_path": file_path,
+            "is_pattern": is_pattern,
+            "dry_run": dry_run,
             "success": True
         }
     
     def _parse_move_command(self, parts: list) -> Dict:
-        if len(parts) < 3:
-            return self._create_error_response("MOVE command requires source and destination paths")
-        
-        source_path = parts[1]
-        destination_path = parts[2]
-        
-        if not self._is_valid_path(source_path):
-            return self._create_error_response("Invalid source path format")
-        
-        if not self._is_valid_path(destination_path):
-            return self._create_error_response("Invalid destination path format")
-        
-        return {
-            "command": "MOVE",
-            "source_path": source_path,
-            "destination_path": destination_path,
-            "success": True
-        }
+        return self._parse_transfer_command(parts, "MOVE")
 
     def _parse_copy_command(self, parts: list) -> Dict:
+        return self._parse_transfer_command(parts, "COPY")
+
+    def _parse_transfer_command(self, parts: list, command: str) -> Dict:
+        """Parse MOVE/COPY, e.g. MOVE /Inbox/2024-* /Archive PREVIEW"""
+        parts, dry_run = self._pop_preview_flag(parts)
+
         if len(parts) < 3:
-            return self._create_error_response("COPY command requires source and destination paths")
+            return self._create_error_response(f"{command} command requires source and destination paths")
         
         source_path = parts[1]
         destination_path = parts[2]
+        is_pattern = self._is_pattern(source_path)
         
-        if not self._is_valid_path(source_path):
+        if not (self._is_valid_pattern(source_path) if is_pattern else self._is_valid_path(source_path)):
             return self._create_error_response("Invalid source path format")
         
         if not self._is_valid_path(destination_path):
             return self._create_error_response("Invalid destination path format")
         
         return {
-            "command": "COPY",
+            "command": command,
             "source_path": source_path,
             "destination_path": destination_path,
+            "is_pattern": is_pattern,
+            "dry_run": dry_run,
             "success": True
         }
+
+    def _pop_preview_flag(self, parts: list) -> Tuple[list, bool]:
+        """Strip a trailing PREVIEW keyword, which turns DELETE/MOVE/COPY (wildcard or not) into a dry run"""
+        if len(parts) > 1 and parts[-1] in self.PREVIEW_KEYWORDS:
+            return parts[:-1], True
+        return parts, False
     
     def _parse_summary_command(self, parts: list , command_type: str) -> Dict:
         """Parse SUMMARY command"""
@@ -173,6 +180,16 @@ class CommandParser:
             "file_path": folder_path,
         }   
     
+    def _is_pattern(self, path: str) -> bool:
+        return any(char in path for char in self.WILDCARD_CHARS)
+
+    def _is_valid_pattern(self, path: str) -> bool:
+        """Wildcards are only allowed in the last path segment, e.g. /Reports/*.tmp"""
+        folder_path, _, name_pattern = path.rstrip('/').rpartition('/')
+        if not name_pattern or self._is_pattern(folder_path):
+            return False
+        return self._is_valid_path(folder_path or '/') and path.startswith('/')
+
     def _is_valid_path(self, path: str) -> bool:
         """Validate path format"""
         if not path:
@@ -218,6 +235,9 @@ class CommandParser:
 📦 *COPY /Source/file.pdf /Destination*
    Copy file to different folder
 
+✳️ *Wildcards:* DELETE /Reports/*.tmp, MOVE /Inbox/2024-* /Archive
+   Add PREVIEW at the end to see matching files without changing anything
+
 📋 *FolderSummary /FolderName*
    Generate AI summaries of all documents in the folder
 
@@ -5,14 +5,116 @@ class Config:
     """Configuration management for the application"""
     
     # Storage configuration
-    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'file')  # 'environment' or 'file'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'file')  # 'environment', 'file', 'sqlite' or 'redis'
     STORAGE_PREFIX = os.getenv('STORAGE_PREFIX', 'STORAGE_')
     STORAGE_DIR = os.getenv('STORAGE_DIR', '/tmp')
+    # In its own directory, which SqliteStorageBackend creates readable by this user only
+    STORAGE_DB_PATH = os.getenv('STORAGE_DB_PATH', os.path.join(STORAGE_DIR, 'tokens', 'tokens.db'))
+    # Backends that may also be selected in production (everything else falls back to 'environment')
+    PRODUCTION_STORAGE_BACKENDS = ('sqlite', 'redis')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '20'))
     
     # Google Drive configuration
     GOOGLE_DRIVE_CREDENTIALS_FILE = os.getenv('GOOGLE_DRIVE_CREDENTIALS_FILE')
     GOOGLE_DRIVE_REDIRECT_URI = os.getenv('GOOGLE_DRIVE_REDIRECT_URI', 'https://whatsapp-drive-assistent.vercel.app')
     
+    # In-memory token cache in front of the storage backend
+    TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '300'))  # seconds
+    TOKEN_CACHE_VALIDATE_INTERVAL = int(os.getenv('TOKEN_CACHE_VALIDATE_INTERVAL', '5'))  # seconds between version checks
+    TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '1000'))
+    
+    # Background refresh of tokens that are about to expire
+    TOKEN_REFRESH_ENABLED = os.getenv('TOKEN_REFRESH_ENABLED', 'true').lower() == 'true'
+    TOKEN_REFRESH_INTERVAL = int(os.getenv('TOKEN_REFRESH_INTERVAL', '60'))  # seconds between scans
+    TOKEN_REFRESH_AHEAD = int(os.getenv('TOKEN_REFRESH_AHEAD', '300'))  # refresh tokens expiring within this many seconds
+    TOKEN_REFRESH_WORKERS = int(os.getenv('TOKEN_REFRESH_WORKERS', '4'))
+    TOKEN_REFRESH_JITTER = float(os.getenv('TOKEN_REFRESH_JITTER', '10'))  # seconds
+    TOKEN_REFRESH_BATCH_SIZE = int(os.getenv('TOKEN_REFRESH_BATCH_SIZE', '500'))
+    TOKEN_REFRESH_ACTIVE_WINDOW = int(os.getenv('TOKEN_REFRESH_ACTIVE_WINDOW', '86400'))  # only users seen this recently
+    
+    # Drive service cache configuration
+    DRIVE_SERVICE_CACHE_SIZE = int(os.getenv('DRIVE_SERVICE_CACHE_SIZE', '256'))
+    DRIVE_SERVICE_CACHE_TTL = int(os.getenv('DRIVE_SERVICE_CACHE_TTL', '3300'))  # seconds
+    
+    # Path-to-ID resolution cache configuration
+    PATH_CACHE_TTL = int(os.getenv('PATH_CACHE_TTL', '300'))  # seconds
+    PATH_CACHE_MAX_ENTRIES = int(os.getenv('PATH_CACHE_MAX_ENTRIES', '2048'))  # per user
+    
+    # Folder tree index configuration
+    FOLDER_INDEX_REFRESH_INTERVAL = int(os.getenv('FOLDER_INDEX_REFRESH_INTERVAL', '60'))  # seconds
+    FOLDER_INDEX_REBUILD_INTERVAL = int(os.getenv('FOLDER_INDEX_REBUILD_INTERVAL', '3600'))  # seconds
+    
+    # File listing configuration
+    LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '100'))
+    LIST_MAX_PAGE_SIZE = 1000  # Drive API maximum
+    LIST_MESSAGE_MAX_FILES = int(os.getenv('LIST_MESSAGE_MAX_FILES', '50'))  # files shown by a WhatsApp LIST
+    
+    # Local metadata mirror configuration
+    METADATA_MIRROR_ENABLED = os.getenv('METADATA_MIRROR_ENABLED', 'false').lower() == 'true'
+    METADATA_MIRROR_DIR = os.getenv('METADATA_MIRROR_DIR', os.path.join(STORAGE_DIR, 'drive_mirror'))
+    METADATA_MIRROR_SYNC_INTERVAL = int(os.getenv('METADATA_MIRROR_SYNC_INTERVAL', '30'))  # seconds
+    
+    # Document extraction process pool configuration
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))  # 0 = inline
+    EXTRACTION_MAX_PENDING = int(os.getenv('EXTRACTION_MAX_PENDING', str(2 * EXTRACTION_WORKERS)))
+    EXTRACTION_TIMEOUT = int(os.getenv('EXTRACTION_TIMEOUT', '60'))  # seconds per document
+    
+    # Download configuration
+    DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))  # bytes per ranged request
+    DOWNLOAD_SPILL_THRESHOLD = int(os.getenv('DOWNLOAD_SPILL_THRESHOLD', str(8 * 1024 * 1024)))  # per buffer
+    DOWNLOAD_REQUEST_MEMORY_CAP = int(os.getenv('DOWNLOAD_REQUEST_MEMORY_CAP', str(32 * 1024 * 1024)))  # per request
+    DOWNLOAD_MAX_BYTES = int(os.getenv('DOWNLOAD_MAX_BYTES', str(500 * 1024 * 1024)))  # hard limit per file
+    DOWNLOAD_SPILL_DIR = os.getenv('DOWNLOAD_SPILL_DIR') or None  # None = system temp dir
+    
+    # Batch API configuration
+    BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '500'))  # per /api/batch call
+    
+    # Wildcard bulk command configuration
+    BULK_MAX_FILES = int(os.getenv('BULK_MAX_FILES', '50'))  # files one command may touch
+    
+    # Summarizer configuration
+    SUMMARY_MAX_CHARS = int(os.getenv('SUMMARY_MAX_CHARS', '400000'))  # characters read per document
+    SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '3000'))  # document tokens per map call
+    SUMMARY_TOKEN_BUDGET = int(os.getenv('SUMMARY_TOKEN_BUDGET', '60000'))  # input tokens spent per document
+    SUMMARY_MAX_TOKEN_BUDGET = int(os.getenv('SUMMARY_MAX_TOKEN_BUDGET', '250000'))  # cap on per-request budgets
+    SUMMARY_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAP_CONCURRENCY', '4'))  # chunks summarized at once
+    SUMMARY_MAX_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAX_MAP_CONCURRENCY', '8'))  # cap on per-request values
+    
+    # Summary cache configuration
+    SUMMARY_CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH', os.path.join(STORAGE_DIR, 'summary_cache.db'))
+    SUMMARY_CACHE_MAX_BYTES = int(os.getenv('SUMMARY_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+    
+    # Extracted-text cache configuration
+    TEXT_CACHE_DIR = os.getenv('TEXT_CACHE_DIR', os.path.join(STORAGE_DIR, 'text_cache'))
+    TEXT_CACHE_MAX_BYTES = int(os.getenv('TEXT_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+    
+    # Keep-alive HTTP connection pool used by every Drive call
+    HTTP_POOL_MAX_PER_HOST = int(os.getenv('HTTP_POOL_MAX_PER_HOST', '10'))
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '60'))
+    
+    # Warm-start snapshot (parsed discovery document + folder indexes) reused by later invocations
+    WARM_START_ENABLED = os.getenv('WARM_START_ENABLED', 'true').lower() == 'true'
+    WARM_START_PATH = os.getenv('WARM_START_PATH', os.path.join(STORAGE_DIR, 'warm_start.marshal'))
+    WARM_START_SAVE_INTERVAL = int(os.getenv('WARM_START_SAVE_INTERVAL', '60'))
+    
+    # Time allowed for importing api_server (checked by utils/startup.py)
+    STARTUP_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', '1500'))
+    
+    # Outbound WhatsApp messages (results of commands that run in the background)
+    MESSAGE_SENDER = os.getenv('MESSAGE_SENDER', 'twilio')  # 'twilio' or 'fake'
+    TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
+    TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+    TWILIO_WHATSAPP_NUMBER = os.getenv('TWILIO_WHATSAPP_NUMBER', 'whatsapp:+14155238886')
+    
+    # Durable queue for long-running commands
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(STORAGE_DIR, 'jobs.db'))
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    JOB_VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', '600'))  # seconds a claimed job stays leased
+    JOB_RETRY_BACKOFF = float(os.getenv('JOB_RETRY_BACKOFF', '5'))  # seconds, doubled on every retry
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+    
     # Environment detection
     IS_DEVELOPMENT = os.getenv('FLASK_ENV') == 'DEV'
 
@@ -26,7 +128,7 @@ class Config:
     @classmethod
     def get_storage_backend(cls) -> str:
         """Get the appropriate storage backend based on environment"""
-        if cls.IS_DEVELOPMENT:
+        if cls.IS_DEVELOPMENT or cls.STORAGE_BACKEND in cls.PRODUCTION_STORAGE_BACKENDS:
             return cls.STORAGE_BACKEND
         else:
             return 'environment'  # Default to environment for production
@@ -37,5 +139,8 @@ class Config:
         return {
             'backend': cls.get_storage_backend(),
             'prefix': cls.STORAGE_PREFIX,
-            'storage_dir': cls.STORAGE_DIR
+            'storage_dir': cls.STORAGE_DIR,
+            'db_path': cls.STORAGE_DB_PATH,
+            'redis_url': cls.REDIS_URL,
+            'redis_max_connections': cls.REDIS_MAX_CONNECTIONS
         }
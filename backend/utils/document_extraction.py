@@ -0,0 +1,235 @@
+import io
+import mmap
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Union
+from .config import Config
+
+
+@contextmanager
+def open_source(source: Union[bytes, str]):
+    """Seekable stream over raw bytes, or a read-only memory map of a spilled download"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+    else:
+        yield io.BytesIO(source)
+
+
+def iter_pdf_text(source: Union[bytes, str]):
+    """Yield PDF text page by page"""
+    import PyPDF2
+
+    with open_source(source) as stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        for page in pdf_reader.pages:
+            yield page.extract_text() + "\n"
+
+
+def iter_docx_text(source: Union[bytes, str]):
+    """Yield DOCX text paragraph by paragraph"""
+    from docx import Document
+
+    with open_source(source) as stream:
+        doc = Document(stream)
+        for paragraph in doc.paragraphs:
+            yield paragraph.text + "\n"
+
+
+def collect_text(chunks, max_chars: int = None) -> str:
+    """Join text chunks, stopping as soon as max_chars characters are available"""
+    parts = []
+    total = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        total += len(chunk)
+        if max_chars is not None and total >= max_chars:
+            # Closing the generator skips parsing the remaining pages/paragraphs
+            chunks.close()
+            break
+
+    text = "".join(parts)
+    return text[:max_chars] if max_chars is not None else text
+
+
+def extract_pdf_text(source: Union[bytes, str], max_chars: int = None) -> str:
+    """Extract text content from PDF bytes (or a spilled file path), up to max_chars characters"""
+    return collect_text(iter_pdf_text(source), max_chars)
+
+
+def extract_docx_text(source: Union[bytes, str], max_chars: int = None) -> str:
+    """Extract text content from DOCX bytes (or a spilled file path), up to max_chars characters"""
+    return collect_text(iter_docx_text(source), max_chars)
+
+
+EXTRACTORS = {
+    "pdf": extract_pdf_text,
+    "docx": extract_docx_text
+}
+
+
+def _run_extractor(kind: str, source: Union[bytes, str], max_chars: int = None) -> str:
+    # Module-level so it can be pickled into worker processes
+    return EXTRACTORS[kind](source, max_chars)
+
+
+def _process_context():
+    # The server runs request, job and token-refresh threads; a forked child could inherit locks they hold
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class ExtractionPool:
+    """
+    Bounded process pool for CPU-bound document parsing.
+    Takes raw bytes, or the path of a spilled download which the worker memory-maps.
+    Keeps PyPDF2/python-docx off the request thread so they do not hold the GIL,
+    caps how many documents may be queued at once and enforces a per-document timeout.
+    Workers are started through forkserver (spawn where unavailable), never
+    forked from the multi-threaded server. After a timeout, new documents go to
+    a fresh pool and the old one is terminated once only timed-out documents
+    are left in it, so other requests' extractions are not cut short.
+    Falls back to inline extraction where worker processes are unavailable
+    (e.g. serverless runtimes without /dev/shm) or when max_workers is 0.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 4, timeout: int = 60):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._executor = None
+        self._inline = max_workers <= 0
+        self._lock = threading.Lock()
+        self._in_flight = {}  # executor -> futures submitted to it and not yet done
+        self._owners = {}     # future -> executor it was submitted to
+        self._retiring = {}   # replaced executor -> its futures that timed out
+        self.completed = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def submit(self, kind: str, source: Union[bytes, str], max_chars: int = None) -> Future:
+        """Queue a document for extraction; blocks while max_pending documents are in flight"""
+        executor = self._get_executor()
+
+        if executor is None:
+            future = Future()
+            try:
+                future.set_result(_run_extractor(kind, source, max_chars))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        try:
+            try:
+                future = executor.submit(_run_extractor, kind, source, max_chars)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start over with a fresh pool
+                self._discard(executor)
+                executor = self._get_executor()
+                future = executor.submit(_run_extractor, kind, source, max_chars)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight.setdefault(executor, set()).add(future)
+            self._owners[future] = executor
+        future.add_done_callback(self._finished)
+        return future
+
+    def result(self, future: Future, timeout: int = None) -> str:
+        """Wait for an extraction; returns an empty string on timeout or failure"""
+        try:
+            text = future.result(timeout=timeout or self.timeout)
+            self.completed += 1
+            return text
+        except TimeoutError:
+            print(f"Document extraction timed out after {timeout or self.timeout}s")
+            self.timeouts += 1
+            # A worker stuck on a pathological document can only be reclaimed by terminating its pool
+            self._retire(future)
+            return ""
+        except Exception as e:
+            print(f"Error extracting document content: {e}")
+            self.failures += 1
+            return ""
+
+    def extract(self, kind: str, source: Union[bytes, str], max_chars: int = None, timeout: int = None) -> str:
+        return self.result(self.submit(kind, source, max_chars), timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executors = [executor for executor in [self._executor, *self._retiring] if executor]
+            self._executor = None
+            self._retiring.clear()
+        for executor in executors:
+            self._terminate(executor)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retiring_pools = len(self._retiring)
+        return {
+            "workers": 0 if self._inline else self.max_workers,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "retiring_pools": retiring_pools
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._inline:
+                return None
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_process_context())
+                except (OSError, NotImplementedError) as e:
+                    print(f"Process pool unavailable, extracting inline: {e}")
+                    self._inline = True
+            return self._executor
+
+    def _finished(self, future: Future) -> None:
+        self._slots.release()
+        with self._lock:
+            executor = self._owners.pop(future, None)
+            self._in_flight.get(executor, set()).discard(future)
+        if executor is not None:
+            self._reap(executor)
+
+    def _retire(self, future: Future) -> None:
+        """Send new work to a fresh pool; the timed-out future's pool is reaped once it only holds stuck work"""
+        with self._lock:
+            executor = self._owners.get(future)
+            if executor is None:
+                return
+            if executor is self._executor:
+                self._executor = None
+            self._retiring.setdefault(executor, set()).add(future)
+        self._reap(executor)
+
+    def _reap(self, executor) -> None:
+        with self._lock:
+            stuck = self._retiring.get(executor)
+            if stuck is None or not self._in_flight.get(executor, set()) <= stuck:
+                return
+            del self._retiring[executor]
+            self._in_flight.pop(executor, None)
+        self._terminate(executor)
+
+    def _discard(self, executor) -> None:
+        with self._lock:
+            if executor is self._executor:
+                self._executor = None
+        self._terminate(executor)
+
+    def _terminate(self, executor) -> None:
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global extraction pool
+extraction_pool = ExtractionPool(Config.EXTRACTION_WORKERS, Config.EXTRACTION_MAX_PENDING, Config.EXTRACTION_TIMEOUT)
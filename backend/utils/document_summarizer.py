@@ -1,21 +1,46 @@
 import os
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from utils.google_drive_client import GoogleDriveClient
-import google.generativeai as genai
+from utils.summary_cache import summary_cache
+from utils.text_chunker import count_tokens, chunk_text, CHARS_PER_TOKEN
+from utils.config import Config
 
 
 
 class DocumentSummarizer:
-    """AI-powered document summarizer using GEMINI_API_KEY"""
+    """
+    AI-powered document summarizer using GEMINI_API_KEY.
+    Documents longer than one chunk are summarized map-reduce style: the text is
+    split into chunks of chunk_tokens (approximate) tokens, the chunks are
+    summarized concurrently, and the chunk summaries are merged into the final
+    summary. A token budget bounds the input tokens sent to the model per
+    document; text beyond what the budget covers is left out.
+    """
+
+    MODEL_NAME = "gemini-2.0-flash"
+    # Bump whenever the summary prompt changes so cached summaries are not reused
+    PROMPT_VERSION = "2"
+    # Output limit of chunk and intermediate summaries, which the budget planning relies on
+    PART_SUMMARY_TOKENS = 200
+    # Approximate tokens of the prompt wrapped around the content of each call
+    PROMPT_TOKENS = 60
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, max_chars: int = None, chunk_tokens: int = None):
         
+        # Character budget per document; extraction stops once it is reached
+        self.max_chars = max_chars or Config.SUMMARY_MAX_CHARS
+        self.chunk_tokens = chunk_tokens or Config.SUMMARY_CHUNK_TOKENS
+
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("GEMINI_API key not found")
         
+        # google.generativeai pulls in grpc and protobuf; load it only once a summarizer is needed
+        import google.generativeai as genai
+
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 
         proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']
@@ -27,7 +52,7 @@ class DocumentSummarizer:
                 del os.environ[var]
         
         try:
-            self.client = genai.GenerativeModel("gemini-2.0-flash")
+            self.client = genai.GenerativeModel(self.MODEL_NAME)
 
         except Exception as e:
             print(f"Error initializing OpenAI client: {e}")
@@ -41,20 +66,24 @@ class DocumentSummarizer:
                 os.environ[var] = value
 
     
-    def summarize_folder(self, drive_client: GoogleDriveClient, folder_path: str) -> Dict:
-        """Generate summaries for all documents in a folder"""
+    def summarize_folder(self, drive_client: GoogleDriveClient, folder_path: str,
+                         concurrency: int = None, token_budget: int = None) -> Dict:
+        """Generate summaries for all documents in a folder; token_budget applies to each document"""
         try:
-            # List files in the folder
-            files_result = drive_client.list_files(folder_path)
+            concurrency, token_budget = self._request_limits(concurrency, token_budget)
 
-            
-            if "error" in files_result:
-                return files_result
-            
-            if "message" in files_result and "No files found" in files_result["message"]:
+            # List files in the folder, with the version fields the summary cache keys on
+            try:
+                files = [
+                    {"name": file['name'], "type": file['mimeType'], "resource": file}
+                    for file in drive_client.iter_files(folder_path, fields="id, name, mimeType, md5Checksum, modifiedTime")
+                ]
+            except ValueError as error:
+                return {"error": str(error)}
+            
+            if not files:
                 return {"message": "No documents found in folder"}
             
-            files = files_result.get("files", [])
             summaries = []
             
             # Filter for document types that can be summarized
@@ -70,12 +99,20 @@ class DocumentSummarizer:
             if not document_files:
                 return {"message": "No summarizable documents found in folder"}
             
-            # Generate summaries for each document
-            for file_info in document_files:
-                file_path = f"{folder_path}/{file_info['name']}"
+            file_paths = [f"{folder_path.rstrip('/')}/{file_info['name']}" for file_info in document_files]
+            cache_keys = [self._metadata_cache_key(file_info['resource'], token_budget) for file_info in document_files]
+            cached = {file_path: summary_cache.get(key) for file_path, key in zip(file_paths, cache_keys)}
 
+            # Fetch every uncached document up front so PDF/DOCX extraction runs in parallel
+            contents = drive_client.get_documents_content(
+                [path for path in file_paths if not cached[path]], self._content_budget(token_budget)
+            )
 
-                summary = self._summarize_single_document(drive_client , file_path, file_info['name'])
+            # Generate summaries for each document
+            for file_info, file_path, cache_key in zip(document_files, file_paths, cache_keys):
+                summary = self._cached_result(cached[file_path], file_info['name']) or self._summarize_content(
+                    contents[file_path], file_info['name'], cache_key, concurrency, token_budget
+                )
                 
                 if "error" not in summary:
                     summaries.append({
@@ -101,12 +138,19 @@ class DocumentSummarizer:
             print(f"Error summarizing folder: {e}")
             return {"error": f"Failed to summarize folder: {str(e)}"}
     
-    def summarize_single_document(self,drive_client: GoogleDriveClient ,  file_path: str) -> Dict:
-        """Generate summary for a single document"""
+    def summarize_single_document(self,drive_client: GoogleDriveClient ,  file_path: str,
+                                  concurrency: int = None, token_budget: int = None) -> Dict:
+        """
+        Generate summary for a single document.
+        concurrency (chunks summarized at once) and token_budget (input tokens
+        spent on the document) override the configured defaults for this call.
+        """
         try:
+            concurrency, token_budget = self._request_limits(concurrency, token_budget)
+
             # Get file name from path
             file_name = file_path.split('/')[-1]
-            return self._summarize_single_document(drive_client,file_path, file_name)
+            return self._summarize_single_document(drive_client,file_path, file_name, concurrency, token_budget)
             
         except Exception as e:
             print(f"Error summarizing document: {e}")
@@ -114,13 +158,62 @@ class DocumentSummarizer:
     
 
     
-    def _summarize_single_document(self, drive_client: GoogleDriveClient, file_path: str, file_name: str) -> Dict:
+    def _summarize_single_document(self, drive_client: GoogleDriveClient, file_path: str, file_name: str,
+                                   concurrency: int, token_budget: int) -> Dict:
         print("""Generate summary for a single document""")
         try:
+            metadata = drive_client.get_file_metadata(file_path)
+            if "error" in metadata:
+                return metadata
+
+            cache_key = self._metadata_cache_key(metadata, token_budget)
+            cached = summary_cache.get(cache_key)
+            if cached:
+                return self._cached_result(cached, file_name)
+
             # Get document content
-            content_result = drive_client.get_document_content(file_path)
+            content_result = drive_client.get_document_content(file_path, self._content_budget(token_budget))
+            return self._summarize_content(content_result, file_name, cache_key, concurrency, token_budget)
+
+        except Exception as e:
+            print(f"Error in _summarize_single_document: {e}")
+            return {"error": f"Failed to summarize document: {str(e)}"}
+
+    def _request_limits(self, concurrency: Optional[int], token_budget: Optional[int]) -> tuple:
+        """Per-request concurrency and token budget, defaulted from Config and clamped to its caps"""
+        concurrency = min(max(1, concurrency or Config.SUMMARY_MAP_CONCURRENCY), Config.SUMMARY_MAX_MAP_CONCURRENCY)
+        token_budget = token_budget or Config.SUMMARY_TOKEN_BUDGET
+        # Anything below one full call would leave nothing to summarize
+        token_budget = min(max(self.chunk_tokens + self.PROMPT_TOKENS, token_budget), Config.SUMMARY_MAX_TOKEN_BUDGET)
+        return concurrency, token_budget
+
+    def _content_limit(self, token_budget: int) -> int:
+        # Text the budget cannot pay for is not worth extracting
+        return min(self.max_chars, token_budget * CHARS_PER_TOKEN)
+
+    def _content_budget(self, token_budget: int) -> int:
+        # One character past the limit tells _summarize_content the text was cut short
+        return self._content_limit(token_budget) + 1
+
+    def _prompt_version(self, token_budget: int) -> str:
+        # Chunk size and budget decide how much of a long document is covered, so they are part of the version
+        return f"{self.PROMPT_VERSION}:{self.chunk_tokens}:{token_budget}"
+
+    def _cached_result(self, cached: Optional[Dict], file_name: str) -> Optional[Dict]:
+        """A cache value as a result for this request; the file name always comes from the request, never the cache"""
+        if not cached:
+            return None
+        return dict(cached, filename=file_name)
+
+    def _metadata_cache_key(self, file: Dict, token_budget: int) -> Optional[str]:
+        return summary_cache.metadata_key(file, self.MODEL_NAME, self._prompt_version(token_budget))
+
+    def _summarize_content(self, content_result: Dict, file_name: str, cache_key: str = None,
+                           concurrency: int = None, token_budget: int = None) -> Dict:
+        """Summarize a document whose content has already been fetched"""
+        try:
+            concurrency, token_budget = self._request_limits(concurrency, token_budget)
 
-            
             if "error" in content_result:
                 return content_result
             
@@ -129,51 +222,179 @@ class DocumentSummarizer:
             if not content.strip():
                 return {"error": f"Document '{file_name}' is empty or could not be read"}
             
-            # Truncate content if too long (OpenAI has token limits)
-            max_chars = 8000  # Conservative limit
-            if len(content) > max_chars:
-                content = content[:max_chars] + "\n\n[Content truncated for summarization]"
-            
-            # Generate summary using OpenAI
-            summary = self._generate_ai_summary(content, file_name)
+            # Extraction stops one character past the limit when there is more text
+            content_limit = self._content_limit(token_budget)
+            truncated = len(content) > content_limit
+            content = content[:content_limit]
+            
+            # Identical text (e.g. a re-uploaded copy) can reuse an earlier summary
+            content_key = summary_cache.content_key(content, self.MODEL_NAME, self._prompt_version(token_budget), file_name)
+            cached = summary_cache.get(content_key)
+            if cached:
+                summary_cache.put(cached, cache_key)
+                return self._cached_result(cached, file_name)
+
+            summary = self._map_reduce_summary(content, file_name, concurrency, token_budget)
             
             if "error" in summary:
                 return summary
             
-            return {
-                "filename": file_name,
+            result = {
                 "summary": summary['summary'],
                 "word_count": len(content.split()),
-                "original_length": len(content)
+                "original_length": len(content),
+                "chunks": summary['chunks'],
+                "tokens_used": summary['tokens_used'],
+                "complete": not truncated and summary['chunks_summarized'] == summary['chunks']
             }
+            summary_cache.put(result, cache_key, content_key)
+            return self._cached_result(result, file_name)
             
         except Exception as e:
-            print(f"Error in _summarize_single_document: {e}")
+            print(f"Error in _summarize_content: {e}")
             return {"error": f"Failed to summarize document: {str(e)}"}
     
 
 
 
+    def _map_reduce_summary(self, content: str, filename: str, concurrency: int, token_budget: int) -> Dict:
+        """Summarize the chunks of content that fit the token budget concurrently, then merge the summaries"""
+        chunks = chunk_text(content, self.chunk_tokens)
+        covered = self._chunks_within_budget([count_tokens(chunk) for chunk in chunks], token_budget)
+
+        if covered == 1:
+            # Short documents (or a budget for one call only) are summarized directly
+            summary = self._generate_ai_summary(chunks[0], filename)
+            if "error" in summary:
+                return summary
+            return {"summary": summary['summary'], "chunks": len(chunks), "chunks_summarized": 1,
+                    "tokens_used": summary['tokens_used']}
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, covered), thread_name_prefix="summary-map") as pool:
+            # Map: one summary per chunk
+            futures = [
+                pool.submit(self._generate, self._part_prompt(chunk, index, len(chunks), filename), self.PART_SUMMARY_TOKENS)
+                for index, chunk in enumerate(chunks[:covered], 1)
+            ]
+            parts = [future.result() for future in futures]
+            tokens_used = sum(part.get('tokens_used', 0) for part in parts)
+            error = next((part for part in parts if "error" in part), None)
+            if error:
+                return error
+            summaries = [part['summary'] for part in parts]
+
+            # Reduce: merge neighbouring summaries until all of them fit in one call.
+            # Summaries too long to pair up (one group each) go to the final call as they are.
+            groups = self._group_summaries(summaries)
+            while 1 < len(groups) < len(summaries):
+                futures = [
+                    pool.submit(self._generate, self._merge_prompt(group, filename), self.PART_SUMMARY_TOKENS)
+                    for group in groups
+                ]
+                merged = [future.result() for future in futures]
+                tokens_used += sum(part.get('tokens_used', 0) for part in merged)
+                error = next((part for part in merged if "error" in part), None)
+                if error:
+                    return error
+                summaries = [part['summary'] for part in merged]
+                groups = self._group_summaries(summaries)
+
+        summary = self._generate(self._final_prompt(summaries, filename))
+        if "error" in summary:
+            return summary
+        return {"summary": summary['summary'], "chunks": len(chunks), "chunks_summarized": covered,
+                "tokens_used": tokens_used + summary['tokens_used']}
+
+    def _chunks_within_budget(self, chunk_tokens: List[int], token_budget: int) -> int:
+        """How many leading chunks can be summarized, map and reduce calls included, within token_budget"""
+        spent = 0
+        for covered, tokens in enumerate(chunk_tokens, 1):
+            spent += tokens + self.PROMPT_TOKENS
+            if spent + self._reduce_cost(covered) > token_budget:
+                return max(1, covered - 1)
+        return len(chunk_tokens)
+
+    def _reduce_cost(self, parts: int) -> int:
+        """Input tokens of the calls merging parts summaries, assuming each summary uses its full output limit"""
+        per_call = max(2, self.chunk_tokens // self.PART_SUMMARY_TOKENS)
+        cost = 0
+        while parts > 1:
+            calls = -(-parts // per_call)
+            cost += parts * self.PART_SUMMARY_TOKENS + calls * self.PROMPT_TOKENS
+            parts = calls
+        return cost
+
+    def _group_summaries(self, summaries: List[str]) -> List[List[str]]:
+        """Consecutive summaries packed into groups of at most chunk_tokens tokens"""
+        groups = []
+        current = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = count_tokens(summary)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(summary)
+            current_tokens += tokens
+
+        if current:
+            groups.append(current)
+        return groups
+
+    def _part_prompt(self, chunk: str, index: int, total: int, filename: str) -> str:
+        return f"""
+            Summarize part {index} of {total} of the document "{filename}" in at most 100 words.
+            Keep the key facts, figures and conclusions; the summary will be merged with those of the other parts.
+            
+            Document part:
+            {chunk}
+            
+            """
+
+    def _merge_prompt(self, summaries: List[str], filename: str) -> str:
+        return f"""
+            Merge these summaries of consecutive parts of the document "{filename}" into one summary of at most 100 words.
+            Keep the key facts, figures and conclusions.
+            
+            {self._numbered(summaries)}
+            
+            """
+
+    def _final_prompt(self, summaries: List[str], filename: str) -> str:
+        return f"""
+            Provide only 1-2 sentence linke short  summary with bullet pointes of the document "{filename}", based on these summaries of its consecutive parts:
+            
+            {self._numbered(summaries)}
+            
+            """
+
+    def _numbered(self, summaries: List[str]) -> str:
+        return "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+
     def _generate_ai_summary(self, content: str, filename: str) -> Dict:
         """Generate AI summary using Google Gemini"""
-        try:
-            prompt = f"""
+        prompt = f"""
             Provide only 1-2 sentence linke short  summary with bullet pointes of the following document: "{filename}"
             
             Document content:
             {content}
             
             """
+        return self._generate(prompt)
 
-            response = self.client.generate_content(prompt)
+    def _generate(self, prompt: str, max_output_tokens: int = None) -> Dict:
+        """One Gemini call; tokens_used is the approximate size of the prompt"""
+        try:
+            generation_config = {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+            response = self.client.generate_content(prompt, generation_config=generation_config)
             summary = response.text.strip()
 
-        
-            return {"summary": summary}
+            return {"summary": summary, "tokens_used": count_tokens(prompt)}
             
         except Exception as e:
             print(f"Error generating AI summary: {e}")
-            return {"error": f"Failed to generate AI summary: {str(e)}"}
+            return {"error": f"Failed to generate AI summary: {str(e)}", "tokens_used": count_tokens(prompt)}
 
 
     
@@ -221,6 +442,8 @@ class DocumentSummarizer:
             if "filename" in summary_result and "summary" in summary_result:
                 response = f"📄 *{summary_result['filename']}*\n\n"
                 response += f"{summary_result['summary']}\n\n"
+                if not summary_result.get("complete", True):
+                    response += "ℹ️ The document is longer than the summary budget; only its beginning was summarized.\n\n"
                 return response
             
             # Folder summary
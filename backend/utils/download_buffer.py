@@ -0,0 +1,145 @@
+import io
+import os
+import tempfile
+import threading
+from typing import Union, Dict, Any
+from .config import Config
+
+
+class DownloadLimitExceeded(Exception):
+    """Raised when a single download grows past the hard size limit"""
+
+
+class DownloadBudget:
+    """
+    In-memory byte allowance shared by every download buffer of one request.
+    Buffers that cannot reserve more memory spill to disk instead.
+    """
+
+    def __init__(self, memory_cap: int):
+        self.memory_cap = memory_cap
+        self.in_memory = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.in_memory + size > self.memory_cap:
+                return False
+            self.in_memory += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.in_memory -= size
+
+
+class DownloadStats:
+    """Process-wide counters for download buffers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.spills = 0
+        self.limit_exceeded = 0
+        self.peak_buffer_bytes = 0
+        self.peak_memory_bytes = 0
+
+    def record(self, buffer: 'SpillBuffer') -> None:
+        with self._lock:
+            self.downloads += 1
+            self.spills += 1 if buffer.spilled else 0
+            self.peak_buffer_bytes = max(self.peak_buffer_bytes, buffer.size)
+            self.peak_memory_bytes = max(self.peak_memory_bytes, buffer.peak_memory)
+
+    def record_limit_exceeded(self) -> None:
+        with self._lock:
+            self.limit_exceeded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "downloads": self.downloads,
+                "spills": self.spills,
+                "limit_exceeded": self.limit_exceeded,
+                "peak_buffer_bytes": self.peak_buffer_bytes,
+                "peak_memory_bytes": self.peak_memory_bytes
+            }
+
+
+class SpillBuffer:
+    """
+    Write target for MediaIoBaseDownload.
+    Data stays in memory until the buffer passes spill_threshold or the request's
+    DownloadBudget runs out, then moves to a temporary file. Spilled buffers are
+    handed to parsers by path so they can be memory-mapped rather than copied.
+    """
+
+    def __init__(self, budget: DownloadBudget = None, spill_threshold: int = None, max_bytes: int = None):
+        self.budget = budget or DownloadBudget(Config.DOWNLOAD_REQUEST_MEMORY_CAP)
+        self.spill_threshold = spill_threshold or Config.DOWNLOAD_SPILL_THRESHOLD
+        self.max_bytes = max_bytes or Config.DOWNLOAD_MAX_BYTES
+        self.size = 0
+        self.peak_memory = 0
+        self.path = None
+        self._memory = io.BytesIO()
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def write(self, data: bytes) -> int:
+        if self.size + len(data) > self.max_bytes:
+            download_stats.record_limit_exceeded()
+            raise DownloadLimitExceeded(f"Download exceeds the {self.max_bytes} byte limit")
+
+        if not self.spilled:
+            if self.size + len(data) > self.spill_threshold or not self.budget.try_reserve(len(data)):
+                self._spill()
+            else:
+                self._memory.write(data)
+                self.size += len(data)
+                self.peak_memory = max(self.peak_memory, self.size)
+                return len(data)
+
+        self._file.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def source(self) -> Union[bytes, str]:
+        """What to hand a parser: the bytes themselves, or the path of the spilled file"""
+        if self.spilled:
+            self._file.flush()
+            return self.path
+        return self._memory.getvalue()
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        if not self.spilled and self.size:
+            self.budget.release(self.size)
+        self._memory = io.BytesIO()
+
+    def _spill(self) -> None:
+        fd, self.path = tempfile.mkstemp(prefix='download_', dir=Config.DOWNLOAD_SPILL_DIR)
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(self._memory.getbuffer())
+        self.budget.release(self.size)
+        self._memory = io.BytesIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+# Global download counters
+download_stats = DownloadStats()
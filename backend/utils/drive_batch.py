@@ -0,0 +1,51 @@
+from typing import Dict, List, Callable, Any
+
+
+class DriveBatch:
+    """
+    Groups Drive API requests into multipart batch requests.
+    Each batch holds at most MAX_BATCH_SIZE calls (the Drive limit) and every
+    queued request gets its own result, so one failure does not affect the others.
+    """
+
+    MAX_BATCH_SIZE = 100
+
+    def __init__(self, service, batch_size: int = MAX_BATCH_SIZE):
+        self.service = service
+        self.batch_size = min(batch_size, self.MAX_BATCH_SIZE)
+        self._queued = []
+
+    def add(self, request, on_success: Callable[[Any], None] = None) -> int:
+        """Queue a request; returns its position in the results list"""
+        self._queued.append((request, on_success))
+        return len(self._queued) - 1
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def execute(self) -> List[Dict]:
+        """Run every queued request; returns [{'response': ...} or {'error': ...}] in queue order"""
+        results = [None] * len(self._queued)
+
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                results[index] = {"error": str(exception)}
+                return
+
+            results[index] = {"response": response}
+            on_success = self._queued[index][1]
+            if on_success:
+                try:
+                    on_success(response)
+                except Exception as e:
+                    print(f"Error in batch success handler: {e}")
+
+        for start in range(0, len(self._queued), self.batch_size):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index in range(start, min(start + self.batch_size, len(self._queued))):
+                batch.add(self._queued[index][0], request_id=str(index))
+            batch.execute()
+
+        self._queued = []
+        return [result or {"error": "No response received"} for result in results]
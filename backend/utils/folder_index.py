@@ -0,0 +1,245 @@
+import time
+import threading
+from typing import Optional, Dict, List, Any
+from .config import Config
+
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+class FolderIndex:
+    """
+    In-memory tree of a user's Drive folders.
+    Built from one paginated listing of every folder, after which a path of any
+    depth resolves with one dictionary lookup per level. Refreshes read the Drive
+    changes feed from where the last build or refresh stopped, which (unlike a
+    modifiedTime query) also reports folders trashed or deleted since then.
+    """
+
+    CHANGE_FIELDS = "nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, parents, mimeType, trashed))"
+
+    def __init__(self):
+        self.root_id = None
+        self.folders = {}    # folder id -> {'name', 'parents'}
+        self.children = {}   # parent id -> {casefolded name -> [(name, folder id)]}
+        self.built_at = None
+        self.refreshed_at = None
+        self._page_token = None  # changes feed position the next refresh starts from
+        self._lock = threading.RLock()
+
+    @property
+    def is_built(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, service) -> None:
+        """(Re)build the whole index from a bulk folder listing"""
+        # Taken before listing so nothing changed mid-build is missed
+        page_token = service.changes().getStartPageToken().execute()['startPageToken']
+        root_id = service.files().get(fileId='root', fields='id').execute()['id']
+        folders = self._list_folders(service, f"mimeType='{FOLDER_MIME_TYPE}' and trashed=false")
+
+        with self._lock:
+            self.root_id = root_id
+            self.folders = {}
+            self.children = {}
+            for folder in folders:
+                self._add(folder)
+            self.built_at = self.refreshed_at = time.time()
+            self._page_token = page_token
+
+        print(f"Folder index built with {len(folders)} folders")
+
+    def refresh(self, service) -> int:
+        """Apply folders created, renamed, moved, trashed or deleted since the last build/refresh"""
+        if not self.is_built:
+            self.build(service)
+            return len(self.folders)
+
+        changes, page_token = self._list_changes(service, self._page_token)
+
+        applied = 0
+        with self._lock:
+            for change in changes:
+                file = change.get('file')
+                if change.get('removed') or not file or file.get('trashed'):
+                    # Files that are not folders are not in the index; removing them is a no-op
+                    if change['fileId'] in self.folders:
+                        self.remove(change['fileId'])
+                        applied += 1
+                elif file.get('mimeType') == FOLDER_MIME_TYPE:
+                    self.upsert(file)
+                    applied += 1
+            self.refreshed_at = time.time()
+            self._page_token = page_token
+
+        return applied
+
+    def upsert(self, folder: Dict[str, Any]) -> None:
+        """Insert or update a single folder ({'id', 'name', 'parents'})"""
+        with self._lock:
+            self._discard(folder['id'])
+            self._add(folder)
+
+    def remove(self, folder_id: str) -> None:
+        """Remove a folder and every folder below it"""
+        with self._lock:
+            pending = [folder_id]
+            while pending:
+                current = pending.pop()
+                for entries in self.children.pop(current, {}).values():
+                    pending.extend(child_id for _, child_id in entries)
+                self._discard(current)
+
+    def resolve(self, folder_path: str) -> Optional[str]:
+        """Resolve '/A/B/C' to a folder ID, or None if any level is missing"""
+        with self._lock:
+            current = self.root_id
+            for part in [part for part in folder_path.split('/') if part]:
+                entries = self.children.get(current, {}).get(part.casefold())
+                if not entries:
+                    return None
+                # Prefer an exact-case match; commands arrive upper-cased
+                exact = [folder_id for name, folder_id in entries if name == part]
+                current = exact[0] if exact else entries[0][1]
+            return current
+
+    def to_state(self) -> Dict[str, Any]:
+        """Plain-data copy of the index for the warm-start snapshot"""
+        with self._lock:
+            return {
+                "root_id": self.root_id,
+                "folders": {folder_id: dict(folder) for folder_id, folder in self.folders.items()},
+                "built_at": self.built_at,
+                "refreshed_at": self.refreshed_at,
+                "page_token": self._page_token
+            }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'FolderIndex':
+        index = cls()
+        index.root_id = state["root_id"]
+        for folder_id, folder in state["folders"].items():
+            index._add({"id": folder_id, "name": folder["name"], "parents": folder["parents"]})
+        index.built_at = state["built_at"]
+        index.refreshed_at = state["refreshed_at"]
+        index._page_token = state["page_token"]
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "folders": len(self.folders),
+                "built_at": self.built_at,
+                "refreshed_at": self.refreshed_at
+            }
+
+    def _add(self, folder: Dict[str, Any]) -> None:
+        parents = folder.get('parents', [])
+        self.folders[folder['id']] = {"name": folder['name'], "parents": parents}
+        for parent_id in parents:
+            siblings = self.children.setdefault(parent_id, {})
+            siblings.setdefault(folder['name'].casefold(), []).append((folder['name'], folder['id']))
+
+    def _discard(self, folder_id: str) -> None:
+        folder = self.folders.pop(folder_id, None)
+        if not folder:
+            return
+        key = folder['name'].casefold()
+        for parent_id in folder['parents']:
+            siblings = self.children.get(parent_id, {})
+            remaining = [entry for entry in siblings.get(key, []) if entry[1] != folder_id]
+            if remaining:
+                siblings[key] = remaining
+            else:
+                siblings.pop(key, None)
+
+    def _list_changes(self, service, page_token: str) -> tuple:
+        """Every change since page_token, and the token to continue from next time"""
+        changes = []
+        while True:
+            results = service.changes().list(
+                pageToken=page_token,
+                pageSize=1000,
+                includeRemoved=True,
+                fields=self.CHANGE_FIELDS
+            ).execute()
+            changes.extend(results.get('changes', []))
+            if results.get('newStartPageToken'):
+                return changes, results['newStartPageToken']
+            page_token = results['nextPageToken']
+
+    def _list_folders(self, service, query: str) -> List[Dict]:
+        folders = []
+        page_token = None
+        while True:
+            results = service.files().list(
+                q=query,
+                pageSize=1000,
+                pageToken=page_token,
+                fields="nextPageToken, files(id, name, parents)"
+            ).execute()
+            folders.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return folders
+
+
+class FolderIndexRegistry:
+    """Holds one FolderIndex per WhatsApp number"""
+
+    def __init__(self, refresh_interval: int = 60, rebuild_interval: int = 3600):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, whatsapp_number: str) -> FolderIndex:
+        with self._lock:
+            index = self._indexes.get(whatsapp_number)
+            if index is None:
+                index = self._indexes[whatsapp_number] = FolderIndex()
+            return index
+
+    def get_fresh(self, whatsapp_number: str, service) -> FolderIndex:
+        """Return the user's index, building or refreshing it as needed"""
+        index = self.get(whatsapp_number)
+        now = time.time()
+
+        if not index.is_built or now - index.built_at > self.rebuild_interval:
+            index.build(service)
+        elif now - index.refreshed_at > self.refresh_interval:
+            index.refresh(service)
+
+        return index
+
+    def discard(self, whatsapp_number: str) -> None:
+        with self._lock:
+            self._indexes.pop(whatsapp_number, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """State of every built index, keyed by WhatsApp number"""
+        with self._lock:
+            indexes = dict(self._indexes)
+        return {number: index.to_state() for number, index in indexes.items() if index.is_built}
+
+    def restore(self, states: Dict[str, Dict[str, Any]]) -> int:
+        """Load indexes from a snapshot; indexes already in memory win. Returns how many were restored"""
+        restored = 0
+        with self._lock:
+            for number, state in states.items():
+                if number not in self._indexes:
+                    self._indexes[number] = FolderIndex.from_state(state)
+                    restored += 1
+        return restored
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return {
+            "users": len(indexes),
+            "folders": sum(len(index.folders) for index in indexes)
+        }
+
+
+# Global folder index registry
+folder_indexes = FolderIndexRegistry(Config.FOLDER_INDEX_REFRESH_INTERVAL, Config.FOLDER_INDEX_REBUILD_INTERVAL)
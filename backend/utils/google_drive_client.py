@@ -1,36 +1,58 @@
 import os
 import io
 import json
+import codecs
+import fnmatch
 from typing import List, Dict, Optional, Tuple
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 from googleapiclient.errors import HttpError
-import base64
-from docx import Document
-import PyPDF2
-from bs4 import BeautifulSoup
+from concurrent.futures import Future
+from itertools import islice
 from datetime import datetime
-from google_auth_oauthlib.flow import Flow
 from .storage import storage
 from .config import Config
+from .service_cache import service_cache
+from .path_cache import path_cache
+from .folder_index import folder_indexes, FOLDER_MIME_TYPE
+from .metadata_mirror import metadata_mirrors
+from .document_extraction import extraction_pool
+from .text_cache import text_cache
+from .drive_batch import DriveBatch
+from .download_buffer import SpillBuffer, DownloadBudget, DownloadLimitExceeded, download_stats
+from .http_pool import http_pool
+from .warm_start import warm_start
+from .token_refresher import token_refresher
 
 
 class GoogleDriveClient:
-    
-    service = None
-    current_whatsapp_number = None
+    """Drive operations for one user; create one client per request (see utils/session.py)"""
 
     SCOPES = [
       "https://www.googleapis.com/auth/drive.appdata", "https://www.googleapis.com/auth/drive.file",
        "https://www.googleapis.com/auth/drive" , "https://www.googleapis.com/auth/drive.metadata.readonly", "https://www.googleapis.com/auth/userinfo.email", "openid" ,  "https://www.googleapis.com/auth/userinfo.profile" ,"https://www.googleapis.com/auth/drive.readonly"
     ]
+    LIST_FIELDS = "id, name, mimeType, size, modifiedTime"
+    # Compact descriptor returned by path resolution and reused by later calls
+    FILE_FIELDS = "id, name, mimeType, parents, size, modifiedTime, md5Checksum"
+    # File names looked up together in one files.list query (keeps the query well under Drive's length limit)
+    LOOKUP_NAMES_PER_QUERY = 50
+
+    DOCUMENT_MIME_TYPES = [
+        'application/vnd.google-apps.document',
+        'application/pdf',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        'text/plain'
+    ]
+
     def __init__(self, credentials_file: str = None):
         self.credentials_file =  os.getenv('GOOGLE_DRIVE_CREDENTIALS_FILE')
+        self.service = None
+        self.current_whatsapp_number = None
     
     def signIn(self, code: str, whatsapp_number: str):
+        # The OAuth flow (requests-oauthlib) is only needed when a user signs in
+        from google_auth_oauthlib.flow import Flow
+
         try:
             flow = Flow.from_client_secrets_file(
                         self.credentials_file, scopes=self.SCOPES, redirect_uri=Config.GOOGLE_DRIVE_REDIRECT_URI
@@ -65,6 +87,10 @@ class GoogleDriveClient:
     def disconnect(self, whatsapp_number: str) -> bool:
         try:
             storage.delete_token(whatsapp_number)
+            service_cache.invalidate(whatsapp_number)
+            path_cache.invalidate_user(whatsapp_number)
+            folder_indexes.discard(whatsapp_number)
+            metadata_mirrors.discard(whatsapp_number)
             if self.current_whatsapp_number == whatsapp_number:
                 self.current_whatsapp_number = None
                 self.service = None
@@ -99,8 +125,9 @@ class GoogleDriveClient:
                   creds = self.signIn(code, whatsapp_number)
                 
             try:
-                self.service = build('drive', 'v3', credentials=creds)
+                self.service = warm_start.build_service(http_pool.authorized_http(creds))
                 self.current_whatsapp_number = whatsapp_number
+                service_cache.put(whatsapp_number, self.service, creds, storage.token_version(whatsapp_number))
 
                 print('self.service' , self.service)
 
@@ -127,24 +154,38 @@ class GoogleDriveClient:
             
         if not whatsapp_number:
             return False
+
+        token_refresher.touch(whatsapp_number)
+
+        cached = service_cache.get(whatsapp_number, lambda: storage.token_version(whatsapp_number))
+        if cached:
+            self.service = cached['service']
+            self.current_whatsapp_number = whatsapp_number
+            return True
             
         if not storage.token_exists(whatsapp_number):
             return False
 
+        # Version first: a concurrent write then makes the cached service look stale, never fresh
+        version = storage.token_version(whatsapp_number)
+
         # Load token from persistent storage
         token_data = storage.load_token(whatsapp_number)
         if not token_data:
             return False
 
         creds = Credentials.from_authorized_user_info(token_data, self.SCOPES)
+        token_refresher.record_hot_path(whatsapp_number, refreshed_inline=bool(creds.expired and creds.refresh_token))
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 try:
+                    from google.auth.transport.requests import Request
                     creds.refresh(Request())  # 🔄 Refresh the token
                     # Save refreshed credentials to persistent storage
                     refreshed_token_data = json.loads(creds.to_json())
                     storage.save_token(refreshed_token_data, whatsapp_number)
+                    version = storage.token_version(whatsapp_number)
                 except Exception as e:
                     print(f"Token refresh failed for WhatsApp number {whatsapp_number}:", e)
                     return False
@@ -152,8 +193,9 @@ class GoogleDriveClient:
                 return False
 
         # Build the Drive API self.service with valid credentials
-        self.service = build('drive', 'v3', credentials=creds)
+        self.service = warm_start.build_service(http_pool.authorized_http(creds))
         self.current_whatsapp_number = whatsapp_number
+        service_cache.put(whatsapp_number, self.service, creds, version)
         return True
 
     
@@ -161,51 +203,116 @@ class GoogleDriveClient:
 
 
 
-    def list_files(self, folder_path: str = None) -> List[Dict]:
-        """List files in a specific folder or root"""
+    def list_files(self, folder_path: str = None, limit: int = None) -> Dict:
+        """List the files in a specific folder or root, at most limit of them (has_more tells if there are others)"""
         try:
-            query = "trashed=false"
+            mirror = self._get_mirror()
+            if mirror:
+                files = self._list_from_mirror(mirror, folder_path)
+            else:
+                files = self.iter_files(folder_path, page_size=limit + 1 if limit else None)
 
+            # One file past the limit shows there is more without fetching further pages
+            file_list = [self._format_file(file) for file in islice(files, limit + 1 if limit else None)]
+
+            if not file_list:
+                return {"message": "No files found"}
             
-            if folder_path and folder_path != "/":
-                # Get folder ID by name
-                folder_id = self._get_folder_id(folder_path)
-                if folder_id:
-                    query += f" and '{folder_id}' in parents"
-                else:
-                    return {"error": f"Folder '{folder_path}' not found"}
+            if limit and len(file_list) > limit:
+                return {"files": file_list[:limit], "has_more": True}
+            return {"files": file_list, "has_more": False}
             
+        except ValueError as error:
+            return {"error": str(error)}
+        except HttpError as error:
+            print(f"Error listing files: {error}")
+            return {"error": f"Failed to list files: {str(error)}"}
+
+    def list_files_page(self, folder_path: str = None, page_token: str = None, limit: int = None) -> Dict:
+        """List a single page of files; pass the returned nextPageToken back to continue"""
+        try:
+            limit = min(limit or Config.LIST_PAGE_SIZE, Config.LIST_MAX_PAGE_SIZE)
+
             results = self.service.files().list(
-                q=query,
-                pageSize=50,
-                fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)"
+                q=self._build_list_query(folder_path),
+                pageSize=limit,
+                pageToken=page_token,
+                fields=f"nextPageToken, files({self.LIST_FIELDS})"
             ).execute()
 
-            
-            files = results.get('files', [])
-
-            if not files:
-                return {"message": "No files found"}
-            
-            file_list = []
-            for file in files:
-                file_info = {
-                    "name": file['name'],
-                    "id": file['id'],
-                    "type": file['mimeType'],
-                    "size": self._format_size( int(file.get('size', '0'))),
-                    "modified": datetime.strptime(file['modifiedTime'], '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y-%m-%d %H:%M:%S')
-                }
+            return {
+                "files": [self._format_file(file) for file in results.get('files', [])],
+                "nextPageToken": results.get('nextPageToken')
+            }
 
-                file_list.append(file_info)
-            
-            # print("file_list ----------- " , file_list)
-            
-            return {"files": file_list}
-            
+        except ValueError as error:
+            return {"error": str(error)}
         except HttpError as error:
             print(f"Error listing files: {error}")
             return {"error": f"Failed to list files: {str(error)}"}
+
+    def iter_files(self, folder_path: str = None, page_size: int = None, fields: str = None):
+        """
+        Yield raw file resources directly in a folder ('/' is the Drive root),
+        fetching the next page only when the previous one is exhausted.
+        Raises ValueError if the folder does not exist.
+        """
+        query = self._build_list_query(folder_path)
+        page_size = min(page_size or Config.LIST_PAGE_SIZE, Config.LIST_MAX_PAGE_SIZE)
+        fields = fields or self.LIST_FIELDS
+
+        page_token = None
+        while True:
+            results = self.service.files().list(
+                q=query,
+                pageSize=page_size,
+                pageToken=page_token,
+                fields=f"nextPageToken, files({fields})"
+            ).execute()
+
+            yield from results.get('files', [])
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _list_from_mirror(self, mirror, folder_path: str = None) -> List[Dict]:
+        if not folder_path or folder_path == "/":
+            return mirror.list_children(mirror.root_id)
+
+        folder_id = self._get_folder_id(folder_path)
+        if not folder_id:
+            raise ValueError(f"Folder '{folder_path}' not found")
+        return mirror.list_children(folder_id)
+
+    def _get_mirror(self):
+        """The user's synced metadata mirror, or None when the mirror is disabled"""
+        if not Config.METADATA_MIRROR_ENABLED or not self.current_whatsapp_number:
+            return None
+        try:
+            return metadata_mirrors.get_synced(self.current_whatsapp_number, self.service)
+        except Exception as e:
+            print(f"Metadata mirror unavailable, falling back to the API: {e}")
+            return None
+
+    def _build_list_query(self, folder_path: str = None) -> str:
+        # Only direct children; '/' would otherwise list the whole Drive
+        if not folder_path or folder_path == "/":
+            return "trashed=false and 'root' in parents"
+
+        folder_id = self._get_folder_id(folder_path)
+        if not folder_id:
+            raise ValueError(f"Folder '{folder_path}' not found")
+        return f"trashed=false and '{folder_id}' in parents"
+
+    def _format_file(self, file: Dict) -> Dict:
+        return {
+            "name": file['name'],
+            "id": file['id'],
+            "type": file['mimeType'],
+            "size": self._format_size(int(file.get('size', '0'))),
+            "modified": datetime.strptime(file['modifiedTime'], '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y-%m-%d %H:%M:%S')
+        }
     
 
 
@@ -219,6 +326,7 @@ class GoogleDriveClient:
                 return {"error": f"File '{file_path}' not found"}
             
             self.service.files().delete(fileId=file_id).execute()
+            self._after_delete(file_path, file_id)
 
          
             return {"message": f"File '{file_path}' deleted successfully"}
@@ -231,8 +339,8 @@ class GoogleDriveClient:
     
     def move_file(self, source_path: str, destination_path: str) -> Dict:
         try:
-            file_id = self._get_file_id(source_path)
-            if not file_id:
+            source_file = self._get_file(source_path)
+            if not source_file:
                 return {"error": f"Source file '{source_path}' not found"}
             
     
@@ -241,17 +349,17 @@ class GoogleDriveClient:
             if not destination_folder_id:
                 return {"error": f"Destination folder '{destination_path}' not found"}
             
-            # Get current parents
-            file = self.service.files().get(fileId=file_id, fields='parents').execute()
-            previous_parents = ",".join(file.get('parents', []))
+            # Current parents come with the descriptor, no extra get needed
+            previous_parents = ",".join(source_file.get('parents', []))
             
             # Move the file to the new folder
             file = self.service.files().update(
-                fileId=file_id,
+                fileId=source_file['id'],
                 addParents=destination_folder_id,
                 removeParents=previous_parents,
-                fields='id, parents'
+                fields=self.FILE_FIELDS
             ).execute()
+            self._after_move(source_path, destination_path, file)
             
             return {"message": f"File moved from '{source_path}' to '{destination_path}' successfully"}
             
@@ -264,26 +372,25 @@ class GoogleDriveClient:
 
     def copy_file(self, source_path: str, destination_path: str) -> Dict:
         try:
-            file_id = self._get_file_id(source_path)
-            if not file_id:
+            source_file = self._get_file(source_path)
+            if not source_file:
                 return {"error": f"Source file '{source_path}' not found"}
             
             destination_folder_id = self._get_folder_id(destination_path)
 
             if not destination_folder_id:
                 return {"error": f"Destination folder '{destination_path}' not found"}
-            
-            # Get the source file metadata (to preserve name, etc.)
-            source_file = self.service.files().get(fileId=file_id, fields='name, mimeType').execute()
 
             # Create the copy in the destination folder
             copied_file = self.service.files().copy(
-            fileId=file_id,
+            fileId=source_file['id'],
             body={
                 'name': source_file['name'],  # Keep original name
                 'parents': [destination_folder_id]
-            }
+            },
+            fields=self.FILE_FIELDS
             ).execute()
+            self._after_copy(source_path, destination_path, copied_file)
 
             return {"message": f"File '{source_path}' copied to '{destination_path}' successfully", "file_id": copied_file.get('id')}
 
@@ -294,42 +401,333 @@ class GoogleDriveClient:
 
 
 
-    def get_document_content(self, file_path: str) -> Dict:
-        """Extract text content from various document types"""
+    def batch_execute(self, operations: List[Dict]) -> Dict:
+        """
+        Run many delete/move/copy/get operations in multipart batch requests.
+        Each operation is {"op": "delete" | "get", "path": ...} or
+        {"op": "move" | "copy", "source_path": ..., "destination_path": ...};
+        results come back per item, in the same order.
+        """
         try:
-            file_id = self._get_file_id(file_path)
+            batch = DriveBatch(self.service)
+            results = [None] * len(operations)
+            queued = []
+
+            # Resolve every source path up front, one listing per folder instead of one per operation
+            resolved = self._prefetch_files([
+                operation.get("path") or operation.get("source_path")
+                for operation in operations if isinstance(operation, dict)
+            ])
+
+            for index, operation in enumerate(operations):
+                if not isinstance(operation, dict):
+                    results[index] = {"op": None, "success": False, "error": "Invalid operation"}
+                    continue
+                prepared = self._prepare_batch_operation(operation, resolved)
+                if "error" in prepared:
+                    results[index] = {"op": operation.get("op"), "success": False, "error": prepared["error"]}
+                    continue
+                batch.add(prepared["request"], prepared["on_success"])
+                queued.append((index, operation, prepared["message"]))
+
+            for (index, operation, message), outcome in zip(queued, batch.execute()):
+                if "error" in outcome:
+                    results[index] = {"op": operation["op"], "success": False, "error": outcome["error"]}
+                else:
+                    results[index] = {"op": operation["op"], "success": True, "message": message}
+                    if operation["op"] in ("get", "copy"):
+                        results[index]["file"] = outcome["response"]
 
-            if not file_id:
-                return {"error": f"File '{file_path}' not found"}
-            
-            # Get file metadata
-            file_metadata = self.service.files().get(fileId=file_id).execute()
-            mime_type = file_metadata['mimeType']
-            
-            content = ""
-            
-            if mime_type == 'application/vnd.google-apps.document':
-                # Google Docs
-                content = self._get_google_doc_content(file_id)
-            elif mime_type == 'application/pdf':
-                # PDF files
-                content = self._get_pdf_content(file_id)
-            elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                # DOCX files
-                content = self._get_docx_content(file_id)
-            elif mime_type == 'text/plain':
-                # Text files
-                content = self._get_text_content(file_id)
+            return {"results": results}
+
+        except HttpError as error:
+            print(f"Error executing batch: {error}")
+            return {"error": f"Failed to execute batch: {str(error)}"}
+
+    def bulk_operation(self, op: str, pattern: str, destination_path: str = None, dry_run: bool = False) -> Dict:
+        """
+        Apply delete/move/copy to every file matching a wildcard such as /Reports/*.tmp.
+        The pattern is expanded against a single listing of its folder and the
+        resulting operations run as one batch. Dry runs only report the matches.
+        """
+        try:
+            matches = self.expand_pattern(pattern)
+            if "error" in matches:
+                return matches
+
+            paths = matches["paths"]
+            if not paths:
+                return {"error": f"No files match '{pattern}'"}
+
+            if len(paths) > Config.BULK_MAX_FILES:
+                return {"error": f"'{pattern}' matches {len(paths)} files; at most {Config.BULK_MAX_FILES} can be changed at once"}
+
+            # Checked before a dry run too, so a preview never passes where the real command would fail
+            if op != "delete" and not self._get_folder_id(destination_path or ''):
+                return {"error": f"Destination folder '{destination_path}' not found"}
+
+            if dry_run:
+                return {"dry_run": True, "op": op, "paths": paths, "destination_path": destination_path}
+
+            if op == "delete":
+                operations = [{"op": op, "path": path} for path in paths]
             else:
-                return {"error": f"Unsupported file type: {mime_type}"}
-            
-            return {"content": content, "filename": file_metadata['name']}
-            
+                operations = [{"op": op, "source_path": path, "destination_path": destination_path} for path in paths]
+
+            result = self.batch_execute(operations)
+            if "error" in result:
+                return result
+
+            return {"op": op, "paths": paths, "results": result["results"], "destination_path": destination_path}
+
+        except ValueError as error:
+            return {"error": str(error)}
         except HttpError as error:
-            print(f"Error getting document content: {error}")
-            return {"error": f"Failed to get document content: {str(error)}"}
+            print(f"Error running bulk {op}: {error}")
+            return {"error": f"Failed to {op} files: {str(error)}"}
+
+    def preview_operation(self, op: str, file_path: str, destination_path: str = None) -> Dict:
+        """Dry run of a delete/move/copy on a single path: checks that the paths resolve and changes nothing"""
+        if not self._get_file(file_path):
+            return {"error": f"File '{file_path}' not found"}
+
+        if destination_path is not None and not self._get_folder_id(destination_path):
+            return {"error": f"Destination folder '{destination_path}' not found"}
+
+        return {"dry_run": True, "op": op, "paths": [file_path], "destination_path": destination_path}
+
+    def expand_pattern(self, pattern: str) -> Dict:
+        """List the files (not folders) in the pattern's folder whose names match it, case-insensitively"""
+        folder_path, _, name_pattern = pattern.rstrip('/').rpartition('/')
+        folder_path = folder_path or '/'
+        name_pattern = name_pattern.casefold()
+
+        # Only direct children; '/' would otherwise list the whole Drive
+        folder_id = self._get_folder_id(folder_path)
+        if not folder_id:
+            return {"error": f"Folder '{folder_path}' not found"}
+
+        results = {"paths": []}
+        page_token = None
+        while True:
+            response = self.service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false and mimeType != '{FOLDER_MIME_TYPE}'",
+                pageSize=Config.LIST_MAX_PAGE_SIZE,
+                pageToken=page_token,
+                fields=f"nextPageToken, files({self.FILE_FIELDS})"
+            ).execute()
+
+            for file in response.get('files', []):
+                if fnmatch.fnmatchcase(file['name'].casefold(), name_pattern):
+                    path = f"{folder_path.rstrip('/')}/{file['name']}"
+                    # Seed the path cache so the batch does not resolve each match again
+                    path_cache.put(self.current_whatsapp_number, 'file', path, file)
+                    results["paths"].append(path)
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return results
+
+    def _prefetch_files(self, file_paths: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Resolve many file paths with one files.list per parent folder (per
+        LOOKUP_NAMES_PER_QUERY names) and seed the path cache with them.
+        Returns {path: descriptor or None} for every path it settled; paths left
+        out (e.g. when the metadata mirror resolves locally) go through _get_file.
+        """
+        resolved = {}
+        if self._get_mirror():
+            return resolved  # the mirror resolves paths locally
+
+        wanted = {}  # folder id -> {name as given -> [paths]}
+        for file_path in file_paths:
+            if not file_path or file_path in resolved:
+                continue
+            cached_file = path_cache.get(self.current_whatsapp_number, 'file', file_path)
+            if cached_file:
+                resolved[file_path] = cached_file
+                continue
+            folder_path, _, name = file_path.rstrip('/').rpartition('/')
+            folder_id = self._get_folder_id(folder_path or '/') if name else None
+            if not folder_id:
+                resolved[file_path] = None
+                continue
+            wanted.setdefault(folder_id, {}).setdefault(name, []).append(file_path)
+            resolved[file_path] = None  # until the listing finds it
+
+        for folder_id, paths_by_name in wanted.items():
+            names = list(paths_by_name)
+            for start in range(0, len(names), self.LOOKUP_NAMES_PER_QUERY):
+                group = names[start:start + self.LOOKUP_NAMES_PER_QUERY]
+                name_clause = " or ".join(f"name='{self._escape_query(name)}'" for name in group)
+                files = []
+                page_token = None
+                while True:
+                    response = self.service.files().list(
+                        q=f"'{folder_id}' in parents and trashed=false and ({name_clause})",
+                        pageSize=Config.LIST_MAX_PAGE_SIZE,
+                        pageToken=page_token,
+                        fields=f"nextPageToken, files({self.FILE_FIELDS})"
+                    ).execute()
+                    files.extend(response.get('files', []))
+                    page_token = response.get('nextPageToken')
+                    if not page_token:
+                        break
+
+                for name in group:
+                    # Same preference as a single lookup: an exact-case match, then any
+                    matches = ([file for file in files if file['name'] == name]
+                               or [file for file in files if file['name'].casefold() == name.casefold()])
+                    if matches:
+                        for file_path in paths_by_name[name]:
+                            resolved[file_path] = matches[0]
+                            path_cache.put(self.current_whatsapp_number, 'file', file_path, matches[0])
+
+        return resolved
+
+    def _prepare_batch_operation(self, operation: Dict, resolved: Dict[str, Optional[Dict]] = None) -> Dict:
+        """Resolve paths (from resolved when _prefetch_files settled them) and build the API request for one batch item"""
+        op = (operation.get("op") or "").lower()
+        operation["op"] = op
+        resolved = resolved or {}
+
+        def get_file(file_path: str) -> Optional[Dict]:
+            return resolved[file_path] if file_path in resolved else self._get_file(file_path)
+
+        if op in ("delete", "get"):
+            path = operation.get("path")
+            file = get_file(path) if path else None
+            if not file:
+                return {"error": f"File '{path}' not found"}
+
+            if op == "delete":
+                return {
+                    "request": self.service.files().delete(fileId=file['id']),
+                    "on_success": lambda _: self._after_delete(path, file['id']),
+                    "message": f"File '{path}' deleted successfully"
+                }
+            return {
+                "request": self.service.files().get(fileId=file['id'], fields=self.FILE_FIELDS),
+                "on_success": None,
+                "message": f"File '{path}' fetched successfully"
+            }
+
+        if op in ("move", "copy"):
+            source_path = operation.get("source_path")
+            destination_path = operation.get("destination_path")
+            source_file = get_file(source_path) if source_path else None
+            if not source_file:
+                return {"error": f"Source file '{source_path}' not found"}
+
+            destination_folder_id = self._get_folder_id(destination_path) if destination_path else None
+            if not destination_folder_id:
+                return {"error": f"Destination folder '{destination_path}' not found"}
+
+            if op == "move":
+                return {
+                    "request": self.service.files().update(
+                        fileId=source_file['id'],
+                        addParents=destination_folder_id,
+                        removeParents=",".join(source_file.get('parents', [])),
+                        fields=self.FILE_FIELDS
+                    ),
+                    "on_success": lambda file: self._after_move(source_path, destination_path, file),
+                    "message": f"File moved from '{source_path}' to '{destination_path}' successfully"
+                }
+            return {
+                "request": self.service.files().copy(
+                    fileId=source_file['id'],
+                    body={'name': source_file['name'], 'parents': [destination_folder_id]},
+                    fields=self.FILE_FIELDS
+                ),
+                "on_success": lambda file: self._after_copy(source_path, destination_path, file),
+                "message": f"File '{source_path}' copied to '{destination_path}' successfully"
+            }
+
+        return {"error": f"Unsupported batch operation: {operation.get('op')}"}
+
+    def get_file_metadata(self, file_path: str) -> Dict:
+        """Get the file descriptor (FILE_FIELDS) for a path"""
+        file = self._get_file(file_path)
+
+        if not file:
+            return {"error": f"File '{file_path}' not found"}
+
+        return file
+
+    def get_document_content(self, file_path: str, max_chars: int = None) -> Dict:
+        """Extract text content from various document types, optionally only the first max_chars characters"""
+        return self.get_documents_content([file_path], max_chars)[file_path]
+
+    def get_documents_content(self, file_paths: List[str], max_chars: int = None) -> Dict[str, Dict]:
+        """
+        Extract text content from several documents, keyed by path.
+        Files are downloaded one after another while PDF/DOCX parsing of the
+        earlier ones runs in parallel in the extraction pool. With max_chars,
+        extraction stops as soon as that many characters are available.
+        """
+        results = {}
+        pending = {}
+        # Buffers of this request share one in-memory allowance and spill to disk beyond it
+        budget = DownloadBudget(Config.DOWNLOAD_REQUEST_MEMORY_CAP)
+
+        for file_path in file_paths:
+            try:
+                file_metadata = self._get_file(file_path)
+
+                if not file_metadata:
+                    results[file_path] = {"error": f"File '{file_path}' not found"}
+                    continue
+                
+                file_id = file_metadata['id']
+                mime_type = file_metadata['mimeType']
+                filename = file_metadata['name']
+                modified_time = file_metadata.get('modifiedTime')
+
+                if mime_type not in self.DOCUMENT_MIME_TYPES:
+                    results[file_path] = {"error": f"Unsupported file type: {mime_type}"}
+                    continue
+
+                cached_text = text_cache.get(file_id, modified_time, max_chars)
+                if cached_text is not None:
+                    results[file_path] = {"content": cached_text, "filename": filename}
+                    continue
+                
+                if mime_type == 'application/vnd.google-apps.document':
+                    # Google Docs
+                    content = self._get_google_doc_content(file_id, max_chars)
+                elif mime_type == 'application/pdf':
+                    # PDF files
+                    pending[file_path] = (self._submit_extraction('pdf', file_id, max_chars, budget), file_metadata)
+                    continue
+                elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+                    # DOCX files
+                    pending[file_path] = (self._submit_extraction('docx', file_id, max_chars, budget), file_metadata)
+                    continue
+                else:
+                    # Text files
+                    content = self._get_text_content(file_id, max_chars)
+
+                self._cache_text(file_id, modified_time, content, max_chars)
+                results[file_path] = {"content": content, "filename": filename}
+                
+            except HttpError as error:
+                print(f"Error getting document content: {error}")
+                results[file_path] = {"error": f"Failed to get document content: {str(error)}"}
+
+        for file_path, (future, file_metadata) in pending.items():
+            content = extraction_pool.result(future)
+            self._cache_text(file_metadata['id'], file_metadata.get('modifiedTime'), content, max_chars)
+            results[file_path] = {"content": content, "filename": file_metadata['name']}
+
+        return {file_path: results[file_path] for file_path in file_paths}
+
+    def _cache_text(self, file_id: str, modified_time: str, content: str, max_chars: int = None):
+        # Text that filled the budget may have been cut short, so only complete documents are cached
+        if max_chars is None or len(content) < max_chars:
+            text_cache.put(file_id, modified_time, content)
     
-    def _get_google_doc_content(self, file_id: str) -> str:
+    def _get_google_doc_content(self, file_id: str, max_chars: int = None) -> str:
         """Extract content from Google Docs"""
         try:
             # Export as plain text
@@ -337,77 +735,87 @@ class GoogleDriveClient:
                 fileId=file_id,
                 mimeType='text/plain'
             )
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            return fh.getvalue().decode('utf-8')
+            return self._download_text(request, self._max_bytes_for(max_chars))[:max_chars]
         except Exception as e:
             print(f"Error extracting Google Doc content: {e}")
             return ""
     
-    def _get_pdf_content(self, file_id: str) -> str:
+    def _get_pdf_content(self, file_id: str, max_chars: int = None) -> str:
         """Extract text content from PDF"""
-        try:
-            request = self.service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            pdf_content = fh.getvalue()
-            
-            # Extract text using PyPDF2
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text
-        except Exception as e:
-            print(f"Error extracting PDF content: {e}")
-            return ""
+        return extraction_pool.result(self._submit_extraction('pdf', file_id, max_chars))
     
-    def _get_docx_content(self, file_id: str) -> str:
+    def _get_docx_content(self, file_id: str, max_chars: int = None) -> str:
         """Extract text content from DOCX"""
+        return extraction_pool.result(self._submit_extraction('docx', file_id, max_chars))
+
+    def _submit_extraction(self, kind: str, file_id: str, max_chars: int = None, budget: DownloadBudget = None) -> Future:
+        """Download a file and hand it to the extraction pool; the buffer is released once parsed"""
         try:
-            request = self.service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
+            buffer = self._download_media(file_id, budget)
+            try:
+                future = extraction_pool.submit(kind, buffer.source(), max_chars)
+            except Exception:
+                buffer.close()
+                raise
+            future.add_done_callback(lambda _: buffer.close())
+            return future
+        except Exception as e:
+            print(f"Error downloading {kind} content: {e}")
+            future = Future()
+            future.set_result("")
+            return future
+
+    def _download_media(self, file_id: str, budget: DownloadBudget = None) -> SpillBuffer:
+        """Download a file into a buffer that spills to disk past the memory limits"""
+        from googleapiclient.http import MediaIoBaseDownload
+
+        request = self.service.files().get_media(fileId=file_id)
+        buffer = SpillBuffer(budget)
+        try:
+            downloader = MediaIoBaseDownload(buffer, request, chunksize=Config.DOWNLOAD_CHUNK_SIZE)
             done = False
             while done is False:
                 status, done = downloader.next_chunk()
-            
-            docx_content = fh.getvalue()
-            
-            # Extract text using python-docx
-            doc = Document(io.BytesIO(docx_content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            return text
-        except Exception as e:
-            print(f"Error extracting DOCX content: {e}")
-            return ""
+        except Exception:
+            buffer.close()
+            raise
+        finally:
+            download_stats.record(buffer)
+        return buffer
     
-    def _get_text_content(self, file_id: str) -> str:
+    def _get_text_content(self, file_id: str, max_chars: int = None) -> str:
         """Extract text content from plain text files"""
         try:
             request = self.service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while done is False:
-                status, done = downloader.next_chunk()
-            
-            return fh.getvalue().decode('utf-8')
+            return self._download_text(request, self._max_bytes_for(max_chars))[:max_chars]
         except Exception as e:
             print(f"Error extracting text content: {e}")
             return ""
+
+    def _max_bytes_for(self, max_chars: int = None) -> Optional[int]:
+        # A UTF-8 character is at most 4 bytes, so this many bytes always covers max_chars
+        return max_chars * 4 if max_chars is not None else None
+
+    def _download_text(self, request, max_bytes: int = None) -> str:
+        """
+        Download and decode UTF-8 text, stopping after max_bytes bytes.
+        Each chunk is fetched with an HTTP Range request and decoded as it
+        arrives; a multi-byte character split by the cut is simply dropped.
+        """
+        from googleapiclient.http import MediaIoBaseDownload
+
+        sink = _DecodingSink()
+        chunk_size = Config.DOWNLOAD_CHUNK_SIZE
+        if max_bytes is not None:
+            chunk_size = min(chunk_size, max_bytes)
+
+        downloader = MediaIoBaseDownload(sink, request, chunksize=chunk_size)
+        done = False
+        while done is False and (max_bytes is None or sink.bytes_received < max_bytes):
+            status, done = downloader.next_chunk()
+
+        return sink.getvalue()
+    
     
 
 
@@ -415,74 +823,122 @@ class GoogleDriveClient:
 
 
     def _get_folder_id(self, folder_path: str) -> Optional[str]:
-        """Get folder ID by name"""
+        """Get folder ID by path, e.g. /A/B/C"""
         try:
-            # Remove leading slash
-            folder_name = folder_path.lstrip('/')
-            
-            # Search for folder
-            results = self.service.files().list(
-                q=f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false",
-                fields="files(id, name)"
-            ).execute()
-            
-            files = results.get('files', [])
-            if files:
-                return files[0]['id']
-            return None
-        except Exception as e:
-            print(f"Error getting folder ID: {e}")
-            return None
-    
-
-
-
+            cached_id = path_cache.get(self.current_whatsapp_number, 'folder', folder_path)
+            if cached_id:
+                return cached_id
 
+            mirror = self._get_mirror()
+            if mirror:
+                folder_id = mirror.resolve_folder(folder_path)
+                if folder_id:
+                    path_cache.put(self.current_whatsapp_number, 'folder', folder_path, folder_id)
+                return folder_id
 
+            index = folder_indexes.get_fresh(self.current_whatsapp_number, self.service)
+            folder_id = index.resolve(folder_path)
 
+            if not folder_id:
+                # The folder may have been created outside the bot since the last refresh
+                index.refresh(self.service)
+                folder_id = index.resolve(folder_path)
 
+            # Let the next invocation on this instance start with the index already built
+            warm_start.save_in_background()
 
+            if folder_id:
+                path_cache.put(self.current_whatsapp_number, 'folder', folder_path, folder_id)
+            return folder_id
+        except Exception as e:
+            print(f"Error getting folder ID: {e}")
+            return None
 
     def _get_file_id(self, file_path: str) -> Optional[str]:
-        """Get file ID by path"""
+        """Get file ID by path, e.g. /A/B/file.pdf"""
+        file = self._get_file(file_path)
+        return file['id'] if file else None
+
+    def _get_file(self, file_path: str) -> Optional[Dict]:
+        """Resolve a path to a compact file descriptor (FILE_FIELDS)"""
         try:
+            cached_file = path_cache.get(self.current_whatsapp_number, 'file', file_path)
+            if cached_file:
+                return cached_file
 
+            mirror = self._get_mirror()
+            if mirror:
+                file = mirror.resolve_file(file_path)
+                path_cache.put(self.current_whatsapp_number, 'file', file_path, file)
+                return file
 
-            path_parts = file_path.strip('/').split('/')
+            path_parts = [part for part in file_path.split('/') if part]
 
-            if len(path_parts) < 2:
+            if not path_parts:
                 return None
             
-            folder_name = path_parts[0]
-            file_name = path_parts[1]
+            file_name = path_parts[-1]
             
-            # Get folder ID
-            folder_id = self._get_folder_id(f"/{folder_name}")
-
-            # print(folder_id)
+            # Get parent folder ID
+            folder_id = self._get_folder_id('/' + '/'.join(path_parts[:-1]))
 
             if not folder_id:
                 return None
             
             # Search for file in folder
             results = self.service.files().list(
-                q=f"'{folder_id}' in parents and name='{file_name}' and trashed=false",
-                fields="files(id, name)"
+                q=f"'{folder_id}' in parents and name='{self._escape_query(file_name)}' and trashed=false",
+                fields=f"files({self.FILE_FIELDS})"
             ).execute()
-
-            # print('results' , results)
             
             files = results.get('files', [])
-            # print("getfileid files" , files)
-
 
             if files:
-                return files[0]['id']
+                path_cache.put(self.current_whatsapp_number, 'file', file_path, files[0])
+                return files[0]
 
             return None
         except Exception as e:
-            print(f"Error getting file ID: {e}")
+            print(f"Error getting file: {e}")
             return None
+
+    def _escape_query(self, value: str) -> str:
+        """Escape a literal for use inside a Drive query string"""
+        return value.replace('\\', '\\\\').replace("'", "\\'")
+
+    def _join_path(self, folder_path: str, source_path: str) -> str:
+        """Path the source file ends up at once placed in folder_path"""
+        return f"{folder_path.rstrip('/')}/{source_path.rstrip('/').split('/')[-1]}"
+
+    def _after_delete(self, file_path: str, file_id: str):
+        """Bring local caches in line with a delete we just made"""
+        self._invalidate_paths(file_path)
+        # No-op unless the deleted item was a folder
+        folder_indexes.get(self.current_whatsapp_number).remove(file_id)
+        if Config.METADATA_MIRROR_ENABLED:
+            metadata_mirrors.get(self.current_whatsapp_number).remove(file_id)
+
+    def _after_move(self, source_path: str, destination_path: str, file: Dict):
+        """Bring local caches in line with a move we just made"""
+        new_path = self._join_path(destination_path, source_path)
+        self._invalidate_paths(source_path, new_path)
+        path_cache.put(self.current_whatsapp_number, 'file', new_path, file)
+
+        if file.get('mimeType') == FOLDER_MIME_TYPE:
+            folder_indexes.get(self.current_whatsapp_number).upsert(file)
+        if Config.METADATA_MIRROR_ENABLED:
+            metadata_mirrors.get(self.current_whatsapp_number).upsert(file)
+
+    def _after_copy(self, source_path: str, destination_path: str, copied_file: Dict):
+        """Bring local caches in line with a copy we just made"""
+        self._invalidate_paths(self._join_path(destination_path, source_path))
+        if Config.METADATA_MIRROR_ENABLED:
+            metadata_mirrors.get(self.current_whatsapp_number).upsert(copied_file)
+
+    def _invalidate_paths(self, *paths: str):
+        """Drop cached resolutions touched by one of our own mutations"""
+        for path in paths:
+            path_cache.invalidate(self.current_whatsapp_number, path)
     
     def _format_size(self, size_bytes: int) -> str:
         """Format file size in human readable format"""
@@ -496,3 +952,23 @@ class GoogleDriveClient:
             i += 1
         
         return f"{size_bytes:.1f} {size_names[i]}"
+
+
+class _DecodingSink:
+    """Write target for MediaIoBaseDownload that decodes UTF-8 incrementally"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._parts = []
+        self.bytes_received = 0
+
+    def write(self, data: bytes) -> int:
+        self.bytes_received += len(data)
+        if self.bytes_received > Config.DOWNLOAD_MAX_BYTES:
+            download_stats.record_limit_exceeded()
+            raise DownloadLimitExceeded(f"Download exceeds the {Config.DOWNLOAD_MAX_BYTES} byte limit")
+        self._parts.append(self._decoder.decode(data))
+        return len(data)
+
+    def getvalue(self) -> str:
+        return "".join(self._parts)
@@ -0,0 +1,119 @@
+import threading
+from typing import Dict, Any
+from .config import Config
+
+
+# httplib2's default, repeated here so the module imports without loading httplib2
+DEFAULT_MAX_REDIRECTS = 5
+
+
+class PooledHttp:
+    """
+    httplib2.Http-compatible transport backed by a shared urllib3 PoolManager.
+    googleapiclient only calls request(), so Drive services built with this
+    transport reuse keep-alive connections across requests, threads and users.
+    Instances are cheap; the pool underneath is thread-safe.
+    """
+
+    def __init__(self, pool: 'HttpPool'):
+        self._pool = pool
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                redirections=DEFAULT_MAX_REDIRECTS, connection_type=None):
+        import httplib2
+        import urllib3
+
+        retries = urllib3.Retry(total=None, connect=0, read=0, status=0, other=0,
+                                redirect=redirections, raise_on_redirect=False)
+        try:
+            response = self._pool.manager.request(
+                method, uri, body=body, headers=headers, retries=retries, preload_content=True
+            )
+        except urllib3.exceptions.TimeoutError as e:
+            # googleapiclient retries on the exceptions httplib2 itself would raise
+            raise TimeoutError(str(e)) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise ConnectionError(str(e)) from e
+        finally:
+            self._pool.record_request()
+
+        info = dict(response.headers)
+        info['status'] = str(response.status)
+        info['content-location'] = response.geturl() or uri
+        resp = httplib2.Response(info)
+        resp.reason = response.reason
+        return resp, response.data
+
+    def close(self):
+        # Connections belong to the shared pool, nothing to release per instance
+        pass
+
+
+class HttpPool:
+    """
+    Keep-alive connection pool shared by every Drive call of the process.
+    At most max_per_host connections are open to one host; further requests
+    wait for a free connection instead of opening new ones.
+    """
+
+    def __init__(self, max_per_host: int = 10, timeout: float = 60):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._manager = None
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def manager(self):
+        # Created on first use so importing this module stays cheap
+        with self._lock:
+            if self._manager is None:
+                import urllib3
+                self._manager = urllib3.PoolManager(
+                    num_pools=10,
+                    maxsize=self.max_per_host,
+                    block=True,
+                    timeout=urllib3.Timeout(total=self.timeout)
+                )
+            return self._manager
+
+    def http(self) -> PooledHttp:
+        """A per-request transport object over the shared pool"""
+        return PooledHttp(self)
+
+    def authorized_http(self, credentials):
+        """Transport that adds (and refreshes) OAuth credentials, for build(..., http=...)"""
+        from google_auth_httplib2 import AuthorizedHttp
+        return AuthorizedHttp(credentials, http=self.http())
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        connections_opened = 0
+        idle_connections = 0
+        hosts = 0
+        pools = self._manager.pools if self._manager else {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts += 1
+            connections_opened += pool.num_connections
+            idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+
+        with self._lock:
+            requests = self.requests
+
+        return {
+            "hosts": hosts,
+            "requests": requests,
+            "connections_opened": connections_opened,
+            "idle_connections": idle_connections,
+            "reuse_rate": round(1 - connections_opened / requests, 3) if requests else 0.0
+        }
+
+
+# Global HTTP connection pool
+http_pool = HttpPool(Config.HTTP_POOL_MAX_PER_HOST, Config.HTTP_TIMEOUT)
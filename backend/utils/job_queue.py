@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from typing import Optional, Dict, Any, List, Callable
+from .config import Config
+
+
+class JobQueue:
+    """
+    Durable queue for long-running commands, stored in SQLite.
+    A worker claims a job by leasing it for visibility_timeout seconds and renews
+    the lease while the job runs; if the worker dies the lease runs out and
+    another worker picks the job up again. Every claim gets a new lease token and
+    only the current holder can complete or fail the job, so a worker whose lease
+    was taken over cannot record (or reply with) a second result.
+    Failed jobs are retried with exponential backoff up to max_attempts.
+    Jobs can carry a dedupe key (e.g. a Twilio MessageSid) so the same message
+    is only ever enqueued once.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, db_path: str, max_attempts: int = 3, visibility_timeout: int = 600,
+                 retry_backoff: float = 5.0, poll_interval: float = 1.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._workers = []
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_schema(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    whatsapp_number TEXT,
+                    command TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    dedupe_key TEXT UNIQUE,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    available_at REAL NOT NULL,
+                    locked_until REAL,
+                    lease_token TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'lease_token' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_number ON jobs (whatsapp_number, created_at)")
+
+    def enqueue(self, whatsapp_number: str, command: str, payload: Dict[str, Any], dedupe_key: str = None) -> str:
+        """Add a job; returns its id (or the id of the job already enqueued under dedupe_key)"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            # One statement, so two processes enqueueing the same key cannot both insert it
+            cursor = conn.execute(
+                """INSERT INTO jobs (id, whatsapp_number, command, payload, dedupe_key, status,
+                                     available_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (dedupe_key) DO NOTHING""",
+                (job_id, whatsapp_number, command, json.dumps(payload), dedupe_key, self.QUEUED, now, now, now)
+            )
+            if cursor.rowcount == 0:
+                return conn.execute("SELECT id FROM jobs WHERE dedupe_key = ?", (dedupe_key,)).fetchone()['id']
+
+        self._wakeup.set()
+        return job_id
+
+    def fail_abandoned(self) -> List[Dict[str, Any]]:
+        """
+        Mark running jobs failed whose lease expired on their last allowed attempt
+        (the worker crashed or hung, so fail() never ran); returns those jobs
+        """
+        now = time.time()
+        error = "The worker running this job stopped responding"
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND locked_until < ? AND attempts >= ?",
+                (self.RUNNING, now, self.max_attempts)
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    """UPDATE jobs SET status = ?, error = ?, locked_until = NULL, lease_token = NULL, updated_at = ?
+                       WHERE id = ?""",
+                    (self.FAILED, error, now, row['id'])
+                )
+
+        jobs = [self._to_dict(row) for row in rows]
+        for job in jobs:
+            job.update(status=self.FAILED, error=error, locked_until=None, lease_token=None)
+        return jobs
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable job, including running jobs whose lease expired with attempts left"""
+        now = time.time()
+        lease_token = uuid.uuid4().hex
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            # Take the write lock up front so workers in other processes cannot claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE (status = ? AND available_at <= ?)
+                      OR (status = ? AND locked_until < ? AND attempts < ?)
+                   ORDER BY available_at LIMIT 1""",
+                (self.QUEUED, now, self.RUNNING, now, self.max_attempts)
+            ).fetchone()
+            if not row:
+                return None
+
+            conn.execute(
+                """UPDATE jobs SET status = ?, attempts = attempts + 1, locked_until = ?, lease_token = ?, updated_at = ?
+                   WHERE id = ?""",
+                (self.RUNNING, now + self.visibility_timeout, lease_token, now, row['id'])
+            )
+
+        job = self._to_dict(row)
+        job['status'] = self.RUNNING
+        job['attempts'] += 1
+        job['lease_token'] = lease_token
+        return job
+
+    def renew(self, job_id: str, lease_token: str) -> bool:
+        """Extend a lease by visibility_timeout; returns False if the lease now belongs to another worker"""
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET locked_until = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (now + self.visibility_timeout, now, job_id, self.RUNNING, lease_token)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, lease_token: str, result: str) -> bool:
+        """Record the result; returns False (and records nothing) if the lease was lost"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = NULL, locked_until = NULL, lease_token = NULL,
+                                   updated_at = ?
+                   WHERE id = ? AND status = ? AND lease_token = ?""",
+                (self.DONE, result, time.time(), job_id, self.RUNNING, lease_token)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, lease_token: str, error: str) -> bool:
+        """
+        Record a failed attempt; returns True if the job will be retried (or has
+        been taken over by another worker), False once it has failed for good
+        """
+        now = time.time()
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND status = ? AND lease_token = ?",
+                (job_id, self.RUNNING, lease_token)
+            ).fetchone()
+            if not row:
+                return True
+
+            attempts = row['attempts']
+            if attempts < self.max_attempts:
+                delay = self.retry_backoff * (2 ** (attempts - 1))
+                conn.execute(
+                    """UPDATE jobs SET status = ?, error = ?, available_at = ?, locked_until = NULL, lease_token = NULL,
+                                       updated_at = ?
+                       WHERE id = ?""",
+                    (self.QUEUED, error, now + delay, now, job_id)
+                )
+                return True
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, locked_until = NULL, lease_token = NULL, updated_at = ? WHERE id = ?",
+                (self.FAILED, error, now, job_id)
+            )
+            return False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_for(self, whatsapp_number: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs of one user"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE whatsapp_number = ? ORDER BY created_at DESC LIMIT ?",
+                (whatsapp_number, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def start(self, handler: Callable[[Dict[str, Any]], str], workers: int = 2,
+              on_finished: Callable[[Dict[str, Any], bool], None] = None) -> None:
+        """
+        Start worker threads. handler returns the job's result text and raises to
+        signal a retryable failure; on_finished(job, succeeded) runs once the job
+        is done or has used up its attempts.
+        """
+        if self._workers:
+            return
+
+        self._stop.clear()
+        for index in range(workers):
+            worker = threading.Thread(
+                target=self._work, args=(handler, on_finished), name=f"job-worker-{index}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        counts = {row['status']: row['count'] for row in rows}
+        return {
+            "workers": len(self._workers),
+            "queued": counts.get(self.QUEUED, 0),
+            "running": counts.get(self.RUNNING, 0),
+            "done": counts.get(self.DONE, 0),
+            "failed": counts.get(self.FAILED, 0)
+        }
+
+    def _work(self, handler, on_finished) -> None:
+        while not self._stop.is_set():
+            try:
+                for abandoned in self.fail_abandoned():
+                    print(f"Job {abandoned['id']} ({abandoned['command']}) failed: lease expired on its last attempt")
+                    if on_finished:
+                        self._notify(on_finished, abandoned, False)
+                job = self.claim()
+            except sqlite3.Error as e:
+                print(f"Error claiming job: {e}")
+                job = None
+
+            if not job:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                with self._lease_kept(job):
+                    result = handler(job)
+            except Exception as e:
+                print(f"Job {job['id']} ({job['command']}) failed on attempt {job['attempts']}: {e}")
+                if not self.fail(job['id'], job['lease_token'], str(e)) and on_finished:
+                    job.update(status=self.FAILED, error=str(e))
+                    self._notify(on_finished, job, False)
+                continue
+
+            if not self.complete(job['id'], job['lease_token'], result):
+                print(f"Job {job['id']} ({job['command']}) finished after its lease was taken over; result dropped")
+                continue
+            if on_finished:
+                job.update(status=self.DONE, result=result)
+                self._notify(on_finished, job, True)
+
+    @contextmanager
+    def _lease_kept(self, job: Dict[str, Any]):
+        """Renew the job's lease in the background, every third of visibility_timeout, until the block exits"""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.visibility_timeout / 3):
+                try:
+                    if not self.renew(job['id'], job['lease_token']):
+                        print(f"Lost the lease on job {job['id']}")
+                        return
+                except sqlite3.Error as e:
+                    print(f"Error renewing lease on job {job['id']}: {e}")
+
+        thread = threading.Thread(target=heartbeat, name=f"job-lease-{job['id'][:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    @staticmethod
+    def _notify(on_finished, job: Dict[str, Any], succeeded: bool) -> None:
+        try:
+            on_finished(job, succeeded)
+        except Exception as e:
+            print(f"Error in job completion handler: {e}")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+
+# Global job queue
+job_queue = JobQueue(
+    Config.JOB_QUEUE_PATH,
+    Config.JOB_MAX_ATTEMPTS,
+    Config.JOB_VISIBILITY_TIMEOUT,
+    Config.JOB_RETRY_BACKOFF,
+    Config.JOB_POLL_INTERVAL
+)
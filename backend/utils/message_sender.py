@@ -0,0 +1,87 @@
+import threading
+from typing import List, Dict
+from .config import Config
+
+
+class MessageSender:
+    """Abstract base class for outbound WhatsApp message senders"""
+
+    def send(self, to: str, body: str) -> bool:
+        raise NotImplementedError
+
+
+class TwilioMessageSender(MessageSender):
+    """Sends WhatsApp messages through the Twilio REST API"""
+
+    # Twilio rejects WhatsApp message bodies longer than this
+    MAX_BODY_LENGTH = 1600
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def send(self, to: str, body: str) -> bool:
+        try:
+            client = self._get_client()
+            for chunk in self._split(body):
+                client.messages.create(from_=self.from_number, to=to, body=chunk)
+            return True
+        except Exception as e:
+            print(f"Failed to send WhatsApp message to {to}: {e}")
+            return False
+
+    def _split(self, body: str) -> List[str]:
+        """Split long replies on line boundaries so each part fits in one message"""
+        chunks = []
+        current = ""
+        for line in body.splitlines(keepends=True):
+            while len(line) > self.MAX_BODY_LENGTH:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:self.MAX_BODY_LENGTH])
+                line = line[self.MAX_BODY_LENGTH:]
+            if len(current) + len(line) > self.MAX_BODY_LENGTH:
+                chunks.append(current)
+                current = ""
+            current += line
+        if current:
+            chunks.append(current)
+        return chunks or [body]
+
+
+class FakeMessageSender(MessageSender):
+    """Records messages instead of sending them (for local development and tests)"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to: str, body: str) -> bool:
+        with self._lock:
+            self.sent.append({"to": to, "body": body})
+        print(f"[fake sender] to {to}: {body}")
+        return True
+
+    def messages_for(self, to: str) -> List[Dict]:
+        with self._lock:
+            return [message for message in self.sent if message["to"] == to]
+
+
+def create_message_sender() -> MessageSender:
+    """Create message sender based on configuration"""
+    if Config.MESSAGE_SENDER == 'twilio':
+        return TwilioMessageSender(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN, Config.TWILIO_WHATSAPP_NUMBER)
+    return FakeMessageSender()
+
+
+# Global message sender instance
+message_sender = create_message_sender()
@@ -0,0 +1,285 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Optional, Dict, List, Any
+from .config import Config
+from .folder_index import FOLDER_MIME_TYPE
+
+
+class MetadataMirror:
+    """
+    Local SQLite copy of one user's Drive metadata.
+    Seeded once from a full listing, then kept current through the Drive
+    changes feed starting from a stored startPageToken.
+    """
+
+    FILE_FIELDS = "id, name, parents, mimeType, size, modifiedTime, md5Checksum, trashed"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.synced_at = None
+        self._sync_lock = threading.Lock()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_schema(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    name_folded TEXT NOT NULL,
+                    mime_type TEXT,
+                    size INTEGER,
+                    modified_time TEXT,
+                    md5_checksum TEXT
+                );
+                CREATE TABLE IF NOT EXISTS parents (
+                    file_id TEXT NOT NULL,
+                    parent_id TEXT NOT NULL,
+                    PRIMARY KEY (file_id, parent_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_parents_parent ON parents (parent_id);
+                CREATE INDEX IF NOT EXISTS idx_files_name ON files (name_folded);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    # -- Sync -----------------------------------------------------------
+
+    @property
+    def is_seeded(self) -> bool:
+        return self._get_meta('start_page_token') is not None
+
+    def seed(self, service) -> int:
+        """Load the full file listing and remember where the changes feed starts"""
+        # Take the token before listing so nothing changed mid-seed is missed
+        start_page_token = service.changes().getStartPageToken().execute()['startPageToken']
+        root_id = service.files().get(fileId='root', fields='id').execute()['id']
+
+        count = 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM parents")
+
+            page_token = None
+            while True:
+                results = service.files().list(
+                    q="trashed=false",
+                    pageSize=1000,
+                    pageToken=page_token,
+                    fields=f"nextPageToken, files({self.FILE_FIELDS})"
+                ).execute()
+
+                for file in results.get('files', []):
+                    self._upsert(conn, file)
+                    count += 1
+
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+            self._set_meta(conn, 'root_id', root_id)
+            self._set_meta(conn, 'start_page_token', start_page_token)
+
+        self.synced_at = time.time()
+        print(f"Metadata mirror seeded with {count} files")
+        return count
+
+    def sync(self, service) -> int:
+        """Apply pending changes from the changes feed; seeds first if needed"""
+        with self._sync_lock:
+            if not self.is_seeded:
+                return self.seed(service)
+
+            page_token = self._get_meta('start_page_token')
+            applied = 0
+
+            with closing(self._connect()) as conn, conn:
+                while page_token:
+                    results = service.changes().list(
+                        pageToken=page_token,
+                        pageSize=1000,
+                        includeRemoved=True,
+                        fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({self.FILE_FIELDS}))"
+                    ).execute()
+
+                    for change in results.get('changes', []):
+                        file = change.get('file')
+                        if change.get('removed') or not file or file.get('trashed'):
+                            self._delete(conn, change['fileId'])
+                        else:
+                            self._upsert(conn, file)
+                        applied += 1
+
+                    if results.get('newStartPageToken'):
+                        self._set_meta(conn, 'start_page_token', results['newStartPageToken'])
+                        break
+                    page_token = results.get('nextPageToken')
+
+            self.synced_at = time.time()
+            return applied
+
+    def upsert(self, file: Dict[str, Any]) -> None:
+        """Record a file we just created or changed ourselves"""
+        with closing(self._connect()) as conn, conn:
+            self._upsert(conn, file)
+
+    def remove(self, file_id: str) -> None:
+        """Record a file we just deleted ourselves"""
+        with closing(self._connect()) as conn, conn:
+            self._delete(conn, file_id)
+
+    # -- Queries --------------------------------------------------------
+
+    @property
+    def root_id(self) -> Optional[str]:
+        return self._get_meta('root_id')
+
+    def list_children(self, parent_id: str = None) -> List[Dict]:
+        """Files directly in a folder, or every file when parent_id is None"""
+        with closing(self._connect()) as conn:
+            if parent_id is None:
+                rows = conn.execute("SELECT * FROM files ORDER BY name_folded").fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT files.* FROM files JOIN parents ON parents.file_id = files.id "
+                    "WHERE parents.parent_id = ? ORDER BY files.name_folded",
+                    (parent_id,)
+                ).fetchall()
+            return [self._to_resource(conn, row) for row in rows]
+
+    def find_child(self, parent_id: str, name: str, folders_only: bool = False) -> Optional[Dict]:
+        """Find a direct child by name, preferring an exact-case match"""
+        with closing(self._connect()) as conn:
+            sql = ("SELECT files.* FROM files JOIN parents ON parents.file_id = files.id "
+                   "WHERE parents.parent_id = ? AND files.name_folded = ?")
+            if folders_only:
+                sql += f" AND files.mime_type = '{FOLDER_MIME_TYPE}'"
+            rows = conn.execute(sql, (parent_id, name.casefold())).fetchall()
+
+            if not rows:
+                return None
+            exact = [row for row in rows if row['name'] == name]
+            return self._to_resource(conn, (exact or rows)[0])
+
+    def resolve_folder(self, folder_path: str) -> Optional[str]:
+        current = self.root_id
+        for part in [part for part in folder_path.split('/') if part]:
+            folder = self.find_child(current, part, folders_only=True)
+            if not folder:
+                return None
+            current = folder['id']
+        return current
+
+    def resolve_file(self, file_path: str) -> Optional[Dict]:
+        path_parts = [part for part in file_path.split('/') if part]
+        if not path_parts:
+            return None
+
+        folder_id = self.resolve_folder('/' + '/'.join(path_parts[:-1]))
+        if not folder_id:
+            return None
+        return self.find_child(folder_id, path_parts[-1])
+
+    # -- Internals ------------------------------------------------------
+
+    def _upsert(self, conn: sqlite3.Connection, file: Dict[str, Any]) -> None:
+        size = file.get('size')
+        conn.execute(
+            "INSERT INTO files (id, name, name_folded, mime_type, size, modified_time, md5_checksum) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, name_folded = excluded.name_folded, "
+            "mime_type = excluded.mime_type, size = excluded.size, "
+            "modified_time = excluded.modified_time, md5_checksum = excluded.md5_checksum",
+            (file['id'], file['name'], file['name'].casefold(), file.get('mimeType'),
+             int(size) if size is not None else None, file.get('modifiedTime'), file.get('md5Checksum'))
+        )
+        conn.execute("DELETE FROM parents WHERE file_id = ?", (file['id'],))
+        conn.executemany(
+            "INSERT INTO parents (file_id, parent_id) VALUES (?, ?)",
+            [(file['id'], parent_id) for parent_id in file.get('parents', [])]
+        )
+
+    def _delete(self, conn: sqlite3.Connection, file_id: str) -> None:
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        conn.execute("DELETE FROM parents WHERE file_id = ?", (file_id,))
+
+    def _to_resource(self, conn: sqlite3.Connection, row: sqlite3.Row) -> Dict:
+        """Convert a row back into the shape the Drive API returns"""
+        parents = [r['parent_id'] for r in conn.execute(
+            "SELECT parent_id FROM parents WHERE file_id = ?", (row['id'],)
+        )]
+        resource = {
+            "id": row['id'],
+            "name": row['name'],
+            "mimeType": row['mime_type'],
+            "parents": parents,
+            "modifiedTime": row['modified_time']
+        }
+        if row['size'] is not None:
+            resource['size'] = str(row['size'])
+        if row['md5_checksum']:
+            resource['md5Checksum'] = row['md5_checksum']
+        return resource
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row['value'] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+
+class MetadataMirrorRegistry:
+    """Holds one MetadataMirror per WhatsApp number"""
+
+    def __init__(self, mirror_dir: str, sync_interval: int = 30):
+        self.mirror_dir = mirror_dir
+        self.sync_interval = sync_interval
+        self._mirrors = {}
+        self._lock = threading.Lock()
+
+    def get(self, whatsapp_number: str) -> MetadataMirror:
+        with self._lock:
+            mirror = self._mirrors.get(whatsapp_number)
+            if mirror is None:
+                safe_number = ''.join(char if char.isalnum() else '_' for char in whatsapp_number)
+                db_path = os.path.join(self.mirror_dir, f"mirror_{safe_number}.db")
+                mirror = self._mirrors[whatsapp_number] = MetadataMirror(db_path)
+            return mirror
+
+    def get_synced(self, whatsapp_number: str, service) -> MetadataMirror:
+        """Return the user's mirror after pulling changes if the last sync is stale"""
+        mirror = self.get(whatsapp_number)
+        if mirror.synced_at is None or time.time() - mirror.synced_at > self.sync_interval:
+            mirror.sync(service)
+        return mirror
+
+    def discard(self, whatsapp_number: str) -> None:
+        with self._lock:
+            mirror = self._mirrors.pop(whatsapp_number, None)
+        if mirror and os.path.exists(mirror.db_path):
+            os.remove(mirror.db_path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": Config.METADATA_MIRROR_ENABLED, "users": len(self._mirrors)}
+
+
+# Global metadata mirror registry
+metadata_mirrors = MetadataMirrorRegistry(Config.METADATA_MIRROR_DIR, Config.METADATA_MIRROR_SYNC_INTERVAL)
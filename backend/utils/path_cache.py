@@ -0,0 +1,87 @@
+import time
+import threading
+from typing import Optional, Dict, Any
+from .config import Config
+
+
+class PathCache:
+    """
+    Per-user cache of resolved Drive paths.
+    Entries are dropped by our own mutations and expire after a TTL so that
+    changes made outside the bot are eventually picked up. Keys are casefolded
+    like path resolution itself, so '/REPORTS/A.PDF' (WhatsApp commands arrive
+    upper-cased) and '/Reports/a.pdf' share one entry and one invalidation.
+    """
+
+    def __init__(self, ttl: int = 300, max_entries_per_user: int = 2048):
+        self.ttl = ttl
+        self.max_entries_per_user = max_entries_per_user
+        self._users = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """Normalize a path to casefolded '/a/b' form"""
+        parts = [part.casefold() for part in (path or '').split('/') if part]
+        return '/' + '/'.join(parts)
+
+    def get(self, whatsapp_number: str, kind: str, path: str) -> Optional[Any]:
+        """Look up a resolved 'folder' or 'file' path"""
+        key = (kind, self.normalize(path))
+        with self._lock:
+            entries = self._users.get(whatsapp_number)
+            entry = entries.get(key) if entries else None
+
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del entries[key]
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[0]
+
+    def put(self, whatsapp_number: str, kind: str, path: str, value: Any) -> None:
+        if not whatsapp_number or value is None:
+            return
+
+        key = (kind, self.normalize(path))
+        with self._lock:
+            entries = self._users.setdefault(whatsapp_number, {})
+            if len(entries) >= self.max_entries_per_user and key not in entries:
+                # Make room by dropping the entry closest to expiry
+                oldest = min(entries, key=lambda existing: entries[existing][1])
+                del entries[oldest]
+            entries[key] = (value, time.time() + self.ttl)
+
+    def invalidate(self, whatsapp_number: str, path: str) -> None:
+        """Drop a path (of either kind) and everything below it"""
+        path = self.normalize(path)
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            entries = self._users.get(whatsapp_number)
+            if not entries:
+                return
+            for key in [key for key in entries if key[1] == path or key[1].startswith(prefix)]:
+                del entries[key]
+
+    def invalidate_user(self, whatsapp_number: str) -> None:
+        with self._lock:
+            self._users.pop(whatsapp_number, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "entries": sum(len(entries) for entries in self._users.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Global path cache instance
+path_cache = PathCache(Config.PATH_CACHE_TTL, Config.PATH_CACHE_MAX_ENTRIES)
@@ -0,0 +1,129 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable
+from .config import Config
+
+
+class DriveServiceCache:
+    """
+    Bounded LRU cache of ready-to-use Drive service objects keyed by WhatsApp number.
+    Entries expire at the earlier of the configured TTL and the token expiry.
+    Each entry remembers the storage version of the token it was built from;
+    once validate_interval has passed, get() compares it with the current one,
+    so a disconnect or re-auth on another worker drops the entry.
+    """
+
+    # Drop entries slightly before the access token expires so a cached
+    # service is never handed out with a token that dies mid-request.
+    EXPIRY_SKEW_SECONDS = 60
+
+    def __init__(self, max_size: int = 256, ttl: int = 3300, validate_interval: int = 5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.validate_interval = validate_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+
+    def get(self, whatsapp_number: str, current_version: Callable[[], Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry ({'service', 'credentials'}) or None.
+        current_version returns the stored token's version; it is called at most
+        once per validate_interval per entry, and an exception counts as a change.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(whatsapp_number)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry['expires_at'] <= now:
+                del self._entries[whatsapp_number]
+                self.misses += 1
+                return None
+
+            needs_validation = current_version is not None and now - entry['validated_at'] > self.validate_interval
+
+        if needs_validation:
+            try:
+                version = current_version()
+                changed = version is None or version != entry['version']
+            except Exception as e:
+                print(f"Failed to revalidate cached Drive service for WhatsApp number {whatsapp_number}: {e}")
+                changed = True
+
+            with self._lock:
+                self.revalidations += 1
+                if changed:
+                    if self._entries.get(whatsapp_number) is entry:
+                        del self._entries[whatsapp_number]
+                    self.misses += 1
+                    return None
+                entry['validated_at'] = now
+
+        with self._lock:
+            if whatsapp_number in self._entries:
+                self._entries.move_to_end(whatsapp_number)
+            self.hits += 1
+            return entry
+
+    def put(self, whatsapp_number: str, service, credentials, version: Any = None) -> None:
+        """Cache a built service with the credentials and the token version it was built from"""
+        expires_at = time.time() + self.ttl
+
+        token_expiry = getattr(credentials, 'expiry', None)
+        if token_expiry is not None:
+            # google-auth stores expiry as a naive UTC datetime
+            seconds_left = (token_expiry - datetime.utcnow()).total_seconds()
+            expires_at = min(expires_at, time.time() + seconds_left - self.EXPIRY_SKEW_SECONDS)
+
+        if expires_at <= time.time():
+            return
+
+        with self._lock:
+            self._entries[whatsapp_number] = {
+                "service": service,
+                "credentials": credentials,
+                "version": version,
+                "expires_at": expires_at,
+                "validated_at": time.time()
+            }
+            self._entries.move_to_end(whatsapp_number)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, whatsapp_number: str) -> None:
+        with self._lock:
+            self._entries.pop(whatsapp_number, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revalidations": self.revalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Global service cache instance
+service_cache = DriveServiceCache(
+    Config.DRIVE_SERVICE_CACHE_SIZE, Config.DRIVE_SERVICE_CACHE_TTL, Config.TOKEN_CACHE_VALIDATE_INTERVAL
+)
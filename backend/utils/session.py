@@ -0,0 +1,38 @@
+from typing import Optional
+from .google_drive_client import GoogleDriveClient
+
+
+class Session:
+    """
+    Everything one request needs to act for one user: the WhatsApp number and a
+    GoogleDriveClient bound to that user's credentials and Drive service.
+    Cached Drive services run on the thread-safe pooled transport (utils/http_pool.py),
+    so concurrent sessions of the same user can share them.
+    """
+
+    def __init__(self, whatsapp_number: str, drive_client: GoogleDriveClient):
+        self.whatsapp_number = whatsapp_number
+        self.drive_client = drive_client
+
+    @property
+    def service(self):
+        return self.drive_client.service
+
+
+class SessionManager:
+    """Opens per-request sessions"""
+
+    def open(self, whatsapp_number: str) -> Optional[Session]:
+        """Session for an authenticated user, or None if the user has not signed in"""
+        if not whatsapp_number:
+            return None
+
+        drive_client = GoogleDriveClient()
+        if not drive_client.is_authenticated(whatsapp_number):
+            return None
+
+        return Session(whatsapp_number, drive_client)
+
+
+# Global session manager
+session_manager = SessionManager()
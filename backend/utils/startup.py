@@ -0,0 +1,132 @@
+"""
+Startup-time measurement for api_server.
+
+api_server records how long its own import took (see record_startup) and
+/api/metrics reports it against Config.STARTUP_BUDGET_MS. For a breakdown by
+module, run from the backend directory:
+
+    python -m utils.startup [--module api_server] [--top 15]
+
+which imports the module in a fresh interpreter with ``-X importtime``, prints
+the imports with the most self time at any depth (so heavy third-party modules
+pulled in indirectly, like googleapiclient or urllib3, show up) and exits with status 1 if the total exceeds the
+budget.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from typing import Dict, Any, List
+from .config import Config
+
+
+# Filled in by record_startup once api_server has finished importing
+startup_stats: Dict[str, Any] = {}
+
+
+def record_startup(started: float, budget_ms: int = None) -> Dict[str, Any]:
+    """Record the import time of the calling module, measured from time.perf_counter() value started"""
+    budget_ms = budget_ms or Config.STARTUP_BUDGET_MS
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    startup_stats.update({
+        "import_ms": elapsed_ms,
+        "budget_ms": budget_ms,
+        "within_budget": elapsed_ms <= budget_ms
+    })
+    if elapsed_ms > budget_ms:
+        print(f"Startup took {elapsed_ms}ms, over the {budget_ms}ms budget")
+    return startup_stats
+
+
+def import_time_report(module: str = 'api_server', top: int = 15) -> Dict[str, Any]:
+    """Import module in a fresh interpreter with -X importtime and summarise the result"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    entries = _parse_import_time(completed.stderr)
+    total = next((entry for entry in entries if entry["depth"] == 0 and entry["module"] == module), None)
+
+    return {
+        "module": module,
+        "total_ms": round(total["cumulative_us"] / 1000, 1) if total else None,
+        "slowest": _slowest(entries, top),
+        "packages": _by_package(entries, top)
+    }
+
+
+def _slowest(entries: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+    """
+    The imports that cost the most by themselves, at any depth. Ranking by
+    cumulative time would only surface the modules that import them.
+    """
+    return sorted(entries, key=lambda entry: entry["self_us"], reverse=True)[:top]
+
+
+def _package(module: str) -> str:
+    parts = module.split('.')
+    # google.* is a namespace shared by separate distributions (google.auth, google.oauth2, ...)
+    return '.'.join(parts[:2]) if parts[0] == 'google' and len(parts) > 1 else parts[0]
+
+
+def _by_package(entries: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+    """Self time summed per top-level package, most expensive first"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        name = _package(entry["module"])
+        package = totals.setdefault(name, {"package": name, "self_us": 0, "modules": 0})
+        package["self_us"] += entry["self_us"]
+        package["modules"] += 1
+    return sorted(totals.values(), key=lambda package: package["self_us"], reverse=True)[:top]
+
+
+def _parse_import_time(output: str) -> List[Dict[str, Any]]:
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            "module": stripped,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1])
+        })
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time report checked against the startup budget")
+    parser.add_argument('--module', default='api_server')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=int, default=Config.STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    report = import_time_report(args.module, args.top)
+    print(f"{'self ms':>8}  {'cumulative ms':>14}  {'depth':>5}  module")
+    for entry in report["slowest"]:
+        print(f"{entry['self_us'] / 1000:>8.1f}  {entry['cumulative_us'] / 1000:>14.1f}  {entry['depth']:>5}  {entry['module']}")
+
+    print(f"\n{'self ms':>8}  {'modules':>7}  package")
+    for package in report["packages"]:
+        print(f"{package['self_us'] / 1000:>8.1f}  {package['modules']:>7}  {package['package']}")
+
+    total_ms = report["total_ms"]
+    print(f"\nimport {args.module}: {total_ms}ms (budget {args.budget_ms}ms)")
+    return 0 if total_ms is not None and total_ms <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
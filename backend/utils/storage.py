@@ -1,10 +1,31 @@
 import os
+import copy
 import json
+import time
+import stat
 import base64
-from typing import Optional, Dict, Any
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from .config import Config
 
 
+def token_expiry_timestamp(token_data: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds of the 'expiry' field written by Credentials.to_json(), or None"""
+    expiry = token_data.get('expiry')
+    if not expiry:
+        return None
+    try:
+        parsed = datetime.fromisoformat(expiry.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
 class StorageBackend:
     """Abstract base class for storage backends"""
     
@@ -19,6 +40,24 @@ class StorageBackend:
     
     def token_exists(self, whatsapp_number: str) -> bool:
         raise NotImplementedError
+    
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        """
+        Cheap marker that changes whenever the stored token changes (e.g. file mtime).
+        Used to revalidate cached tokens; None means "no token stored".
+        Backends that cannot provide one are only refreshed when cache entries expire.
+        """
+        raise NotImplementedError
+    
+    def load_token_with_version(self, whatsapp_number: str) -> Tuple[Optional[Dict[str, Any]], Optional[Any]]:
+        """Token and the version it was read at; backends override this to do both in one round trip"""
+        # Version first: a concurrent write then makes the pair look stale, never fresh
+        version = self.token_version(whatsapp_number)
+        return self.load_token(whatsapp_number), version
+    
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        """WhatsApp numbers whose access token expires before timestamp (and not before after), soonest first"""
+        raise NotImplementedError
 
 
 
@@ -125,6 +164,25 @@ class EnvironmentStorageBackend(StorageBackend):
     def token_exists(self, whatsapp_number: str) -> bool:
         env_key = f"{self.prefix}TOKEN_{whatsapp_number}"
         return env_key in os.environ and os.environ[env_key] is not None
+    
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        # The encoded value itself; comparing it is a memory lookup
+        return os.environ.get(f"{self.prefix}TOKEN_{whatsapp_number}")
+    
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        key_prefix = f"{self.prefix}TOKEN_"
+        expiring = []
+        for env_key, token_encoded in list(os.environ.items()):
+            if not env_key.startswith(key_prefix):
+                continue
+            try:
+                token_data = json.loads(base64.b64decode(token_encoded.encode('utf-8')).decode('utf-8'))
+            except Exception:
+                continue
+            expiry = token_expiry_timestamp(token_data)
+            if expiry is not None and expiry < timestamp and (after is None or expiry >= after):
+                expiring.append((expiry, env_key[len(key_prefix):]))
+        return [whatsapp_number for _, whatsapp_number in sorted(expiring)[:limit]]
 
 
 
@@ -135,14 +193,14 @@ class FileStorageBackend(StorageBackend):
     def __init__(self, storage_dir: str = "/tmp"):
         self.storage_dir = storage_dir
     
+    def _token_path(self, whatsapp_number: str) -> str:
+        return os.path.join(self.storage_dir, f"token_{whatsapp_number}.json")
+    
     def save_token(self, token_data: Dict[str, Any], whatsapp_number: str) -> bool:
         try:
-            tmp_dir = os.path.join(os.getcwd(), "tmp")   # or use tempfile.gettempdir()
-            os.makedirs(tmp_dir, exist_ok=True)          # Create folder if missing
-
-            file_path = os.path.join(tmp_dir, f"token_{whatsapp_number}.json")
+            os.makedirs(self.storage_dir, exist_ok=True)  # Create folder if missing
 
-            # file_path = os.path.join(self.storage_dir, f"token_{whatsapp_number}.json")
+            file_path = self._token_path(whatsapp_number)
 
             with open(file_path, 'w') as f:
                 json.dump(token_data, f)
@@ -155,7 +213,7 @@ class FileStorageBackend(StorageBackend):
     
     def load_token(self, whatsapp_number: str) :
         try:
-            file_path =  os.path.join(os.path.join(os.getcwd(), "tmp")  , f"token_{whatsapp_number}.json")
+            file_path = self._token_path(whatsapp_number)
 
             print('file_path', file_path)
 
@@ -174,7 +232,7 @@ class FileStorageBackend(StorageBackend):
     
     def delete_token(self, whatsapp_number: str) -> bool:
         try:
-            file_path =  os.path.join(os.path.join(os.getcwd(), "tmp")  , f"token_{whatsapp_number}.json")
+            file_path = self._token_path(whatsapp_number)
 
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -187,32 +245,388 @@ class FileStorageBackend(StorageBackend):
             return False
     
     def token_exists(self, whatsapp_number: str) -> bool:
-        file_path =  os.path.join(os.path.join(os.getcwd(), "tmp")  , f"token_{whatsapp_number}.json")
+        return os.path.exists(self._token_path(whatsapp_number))
+    
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        try:
+            stat = os.stat(self._token_path(whatsapp_number))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        if not os.path.isdir(self.storage_dir):
+            return []
+
+        expiring = []
+        for file_name in os.listdir(self.storage_dir):
+            if not (file_name.startswith("token_") and file_name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.storage_dir, file_name), 'r') as f:
+                    token_data = json.load(f)
+            except Exception:
+                continue
+            expiry = token_expiry_timestamp(token_data)
+            if expiry is not None and expiry < timestamp and (after is None or expiry >= after):
+                expiring.append((expiry, file_name[len("token_"):-len(".json")]))
+        return [whatsapp_number for _, whatsapp_number in sorted(expiring)[:limit]]
+
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    Storage backend using a single SQLite database in WAL mode.
+    Writes are atomic upserts, readers never block the writer, and an index on
+    the token expiry lets tokens due for refresh be found without a full scan.
+    Each thread keeps its own connection so sqlite3's statement cache is reused.
+    The database holds refresh tokens, so its directory is created 0700 and the
+    database and its -wal/-shm files 0600 before SQLite first opens them.
+    """
+
+    # SQLite creates these next to the database in WAL mode, with the database file's permissions
+    SIDE_FILE_SUFFIXES = ('-wal', '-shm')
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._create_private_files()
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tokens (
+                    whatsapp_number TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    expiry REAL,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tokens_expiry ON tokens (expiry)")
+
+    def _create_private_files(self) -> None:
+        directory = os.path.dirname(self.db_path) or '.'
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.stat(directory)
+        if hasattr(os, 'getuid'):
+            # Without the sticky bit (which /tmp has), anyone who can write here could swap the database out
+            if info.st_uid not in (os.getuid(), 0) or (info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX):
+                raise PermissionError(f"{directory} can be modified by other users; refusing to store tokens in it")
+
+        for path in (self.db_path,) + tuple(self.db_path + suffix for suffix in self.SIDE_FILE_SUFFIXES):
+            # O_NOFOLLOW: a symlink planted in a shared directory must not redirect the tokens elsewhere
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+            try:
+                info = os.fstat(fd)
+                if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+                    raise PermissionError(f"{path} belongs to another user; refusing to store tokens in it")
+                if stat.S_IMODE(info.st_mode) & 0o077:
+                    os.fchmod(fd, 0o600)
+            finally:
+                os.close(fd)
 
-        return os.path.exists(file_path)
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
 
+    def save_token(self, token_data: Dict[str, Any], whatsapp_number: str) -> bool:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    """INSERT INTO tokens (whatsapp_number, token, expiry, version, updated_at)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(whatsapp_number) DO UPDATE SET
+                           token = excluded.token,
+                           expiry = excluded.expiry,
+                           version = excluded.version,
+                           updated_at = excluded.updated_at""",
+                    (whatsapp_number, json.dumps(token_data), token_expiry_timestamp(token_data),
+                     time.time_ns(), time.time())
+                )
+            return True
+        except Exception as e:
+            print(f"Failed to save token to database for WhatsApp number {whatsapp_number}: {e}")
+            return False
+
+    def load_token(self, whatsapp_number: str) -> Optional[Dict[str, Any]]:
+        try:
+            row = self._connection().execute(
+                "SELECT token FROM tokens WHERE whatsapp_number = ?", (whatsapp_number,)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"Failed to load token from database for WhatsApp number {whatsapp_number}: {e}")
+            return None
+
+    def delete_token(self, whatsapp_number: str) -> bool:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM tokens WHERE whatsapp_number = ?", (whatsapp_number,))
+            return True
+        except Exception as e:
+            print(f"Failed to delete token from database for WhatsApp number {whatsapp_number}: {e}")
+            return False
+
+    def token_exists(self, whatsapp_number: str) -> bool:
+        return self.token_version(whatsapp_number) is not None
+
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        # Nanosecond timestamp of the last write, so a token deleted and saved again never reuses a version
+        row = self._connection().execute(
+            "SELECT version FROM tokens WHERE whatsapp_number = ?", (whatsapp_number,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_token_with_version(self, whatsapp_number: str) -> Tuple[Optional[Dict[str, Any]], Optional[Any]]:
+        row = self._connection().execute(
+            "SELECT token, version FROM tokens WHERE whatsapp_number = ?", (whatsapp_number,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT whatsapp_number FROM tokens WHERE expiry >= ? AND expiry < ? ORDER BY expiry LIMIT ?",
+            (after if after is not None else float('-inf'), timestamp, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+
+class RedisStorageBackend(StorageBackend):
+    """
+    Storage backend on a Redis-protocol key-value server, shared by every worker and instance.
+    Each user is one hash (token JSON + write version); a sorted set scored by
+    token expiry finds tokens due for refresh. Multi-key operations are pipelined
+    and connections come from a bounded pool. Client-side caching is provided by
+    the TokenCache in PersistentStorage, revalidated through token_version.
+    """
+
+    def __init__(self, url: str, prefix: str = "STORAGE_", max_connections: int = 20):
+        import redis
+
+        self.prefix = prefix
+        self.pool = redis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+        self.client = redis.Redis(connection_pool=self.pool)
+        self.expiry_key = f"{prefix}token_expiry"
+
+    def _key(self, whatsapp_number: str) -> str:
+        return f"{self.prefix}token:{whatsapp_number}"
+
+    def save_token(self, token_data: Dict[str, Any], whatsapp_number: str) -> bool:
+        try:
+            expiry = token_expiry_timestamp(token_data)
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hset(self._key(whatsapp_number), mapping={
+                "token": json.dumps(token_data),
+                "version": time.time_ns()
+            })
+            if expiry is not None:
+                pipe.zadd(self.expiry_key, {whatsapp_number: expiry})
+            else:
+                pipe.zrem(self.expiry_key, whatsapp_number)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Failed to save token to Redis for WhatsApp number {whatsapp_number}: {e}")
+            return False
+
+    def load_token(self, whatsapp_number: str) -> Optional[Dict[str, Any]]:
+        return self.load_token_with_version(whatsapp_number)[0]
+
+    def load_token_with_version(self, whatsapp_number: str) -> Tuple[Optional[Dict[str, Any]], Optional[Any]]:
+        try:
+            token_json, version = self.client.hmget(self._key(whatsapp_number), "token", "version")
+            if token_json is None:
+                return None, None
+            return json.loads(token_json), version
+        except Exception as e:
+            print(f"Failed to load token from Redis for WhatsApp number {whatsapp_number}: {e}")
+            return None, None
+
+    def load_tokens(self, whatsapp_numbers: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Tokens of many users in one pipelined round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for whatsapp_number in whatsapp_numbers:
+            pipe.hget(self._key(whatsapp_number), "token")
+        return {
+            whatsapp_number: json.loads(token_json) if token_json else None
+            for whatsapp_number, token_json in zip(whatsapp_numbers, pipe.execute())
+        }
+
+    def delete_token(self, whatsapp_number: str) -> bool:
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(self._key(whatsapp_number))
+            pipe.zrem(self.expiry_key, whatsapp_number)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Failed to delete token from Redis for WhatsApp number {whatsapp_number}: {e}")
+            return False
+
+    def token_exists(self, whatsapp_number: str) -> bool:
+        return bool(self.client.exists(self._key(whatsapp_number)))
+
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        return self.client.hget(self._key(whatsapp_number), "version")
+
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        return self.client.zrangebyscore(
+            self.expiry_key, after if after is not None else "-inf", f"({timestamp}", start=0, num=limit
+        )
+
+
+
+class TokenCache:
+    """
+    In-memory, LRU-bounded copy of stored tokens (including "no token" results).
+    Entries are served without touching the backend until validate_interval has
+    passed; then the backend's token_version is compared, so writes made by other
+    workers are picked up. Entries are dropped after ttl regardless.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: int = 300, validate_interval: int = 5, max_entries: int = 1000):
+        self.ttl = ttl
+        self.validate_interval = validate_interval
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # whatsapp_number -> {'token', 'version', 'loaded_at', 'validated_at'}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get(self, whatsapp_number: str, backend: StorageBackend):
+        """Cached token (None if none is stored), or TokenCache._MISSING if the backend must be read"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(whatsapp_number)
+            if entry is None or now - entry['loaded_at'] > self.ttl:
+                self._entries.pop(whatsapp_number, None)
+                self.misses += 1
+                return self._MISSING
+
+            needs_validation = now - entry['validated_at'] > self.validate_interval
+
+        if needs_validation:
+            version = self._version(backend, whatsapp_number)
+            with self._lock:
+                self.revalidations += 1
+                if version is self._MISSING or version != entry['version']:
+                    self._entries.pop(whatsapp_number, None)
+                    self.misses += 1
+                    return self._MISSING
+                entry['validated_at'] = now
+
+        with self._lock:
+            self._entries.move_to_end(whatsapp_number)
+            self.hits += 1
+        return copy.deepcopy(entry['token'])
+
+    def put(self, whatsapp_number: str, token: Optional[Dict[str, Any]], version) -> None:
+        """Cache a token together with the backend version it was read at (see version())"""
+        if version is self._MISSING:
+            # Without a version the entry could never be revalidated; rely on the backend instead
+            return
+
+        now = time.time()
+        with self._lock:
+            self._entries[whatsapp_number] = {
+                'token': copy.deepcopy(token),
+                'version': version,
+                'loaded_at': now,
+                'validated_at': now
+            }
+            self._entries.move_to_end(whatsapp_number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, whatsapp_number: str) -> None:
+        with self._lock:
+            self._entries.pop(whatsapp_number, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+    def version(self, backend: StorageBackend, whatsapp_number: str):
+        return self._version(backend, whatsapp_number)
+
+    def _version(self, backend: StorageBackend, whatsapp_number: str):
+        try:
+            return backend.token_version(whatsapp_number)
+        except NotImplementedError:
+            return self._MISSING
+        except Exception as e:
+            print(f"Failed to read token version for WhatsApp number {whatsapp_number}: {e}")
+            return self._MISSING
 
 
 class PersistentStorage:
     """
     Persistent storage utility for Vercel serverless environment.
-    Supports multiple storage backends.
+    Supports multiple storage backends, with a write-through TokenCache in front.
     """
     
-    def __init__(self, backend: StorageBackend = None):
+    def __init__(self, backend: StorageBackend = None, cache: TokenCache = None):
         self.backend = backend or EnvironmentStorageBackend()
+        self.cache = cache or TokenCache()
     
     def save_token(self, token_data: Dict[str, Any], whatsapp_number: str) -> bool:
-        return self.backend.save_token(token_data, whatsapp_number)
+        saved = self.backend.save_token(token_data, whatsapp_number)
+        if saved:
+            self.cache.put(whatsapp_number, token_data, self.cache.version(self.backend, whatsapp_number))
+        else:
+            self.cache.invalidate(whatsapp_number)
+        return saved
     
     def load_token(self, whatsapp_number: str) -> Optional[Dict[str, Any]]:
-        return self.backend.load_token(whatsapp_number)
+        cached = self.cache.get(whatsapp_number, self.backend)
+        if cached is not TokenCache._MISSING:
+            return cached
+
+        try:
+            token_data, version = self.backend.load_token_with_version(whatsapp_number)
+        except NotImplementedError:
+            token_data, version = self.backend.load_token(whatsapp_number), TokenCache._MISSING
+        self.cache.put(whatsapp_number, token_data, version)
+        return token_data
     
     def delete_token(self, whatsapp_number: str) -> bool:
-        return self.backend.delete_token(whatsapp_number)
+        deleted = self.backend.delete_token(whatsapp_number)
+        self.cache.invalidate(whatsapp_number)
+        return deleted
+    
+    def token_version(self, whatsapp_number: str) -> Optional[Any]:
+        """The backend's current version of the stored token, read past the cache (None if no token)"""
+        return self.backend.token_version(whatsapp_number)
     
     def token_exists(self, whatsapp_number: str) -> bool:
-        return self.backend.token_exists(whatsapp_number)
+        cached = self.cache.get(whatsapp_number, self.backend)
+        if cached is not TokenCache._MISSING:
+            return cached is not None
+        return self.load_token(whatsapp_number) is not None
+    
+    def tokens_expiring_before(self, timestamp: float, limit: int = 100, after: float = None) -> List[str]:
+        return self.backend.tokens_expiring_before(timestamp, limit, after)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
 
 
 
@@ -224,10 +638,16 @@ def create_storage_instance() -> PersistentStorage:
     
     if config['backend'] == 'file':
         backend = FileStorageBackend(config['storage_dir'])
+    elif config['backend'] == 'sqlite':
+        backend = SqliteStorageBackend(config['db_path'])
+    elif config['backend'] == 'redis':
+        backend = RedisStorageBackend(config['redis_url'], config['prefix'], config['redis_max_connections'])
     else:
         backend = EnvironmentStorageBackend(config['prefix'])
     
-    return PersistentStorage(backend)
+    cache = TokenCache(Config.TOKEN_CACHE_TTL, Config.TOKEN_CACHE_VALIDATE_INTERVAL, Config.TOKEN_CACHE_MAX_ENTRIES)
+    return PersistentStorage(backend, cache)
 
 # Global storage instance
 storage = create_storage_instance()
+
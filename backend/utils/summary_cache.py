@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Optional, Dict, Any
+from .config import Config
+
+
+class SummaryCache:
+    """
+    Persistent, content-addressed cache of document summaries.
+    Keys combine the document version (Drive md5Checksum/modifiedTime or a hash
+    of the extracted text), the model name and the prompt-template version, so
+    a changed document, model or prompt never returns a stale summary.
+    Values hold only the summary fields; callers add the requesting file's
+    name, since one entry may serve several files (or users) with the same text.
+    Least-recently-used entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 50 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._create_schema()
+
+    @staticmethod
+    def metadata_key(file: Dict[str, Any], model: str, prompt_version: str) -> Optional[str]:
+        """Key from Drive metadata; None if the file carries no version information"""
+        version = file.get('md5Checksum') or file.get('modifiedTime')
+        if not file.get('id') or not version:
+            return None
+        return SummaryCache._hash(f"file:{file['id']}:{version}:{model}:{prompt_version}")
+
+    @staticmethod
+    def content_key(content: str, model: str, prompt_version: str, file_name: str = '') -> str:
+        """Key from the extracted text itself (and the file name, which the summary prompt includes)"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return SummaryCache._hash(f"content:{digest}:{file_name}:{model}:{prompt_version}")
+
+    @staticmethod
+    def _hash(value: str) -> str:
+        return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _create_schema(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_access ON summaries (last_access)")
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value FROM summaries WHERE key = ?", (key,)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, value: Dict[str, Any], *keys: Optional[str]) -> None:
+        """Store a summary result under one or more keys"""
+        payload = json.dumps(value)
+        now = time.time()
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            for key in keys:
+                if key:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                        (key, payload, len(payload), now)
+                    )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM summaries ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global summary cache instance
+summary_cache = SummaryCache(Config.SUMMARY_CACHE_PATH, Config.SUMMARY_CACHE_MAX_BYTES)
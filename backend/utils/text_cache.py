@@ -0,0 +1,145 @@
+import os
+import mmap
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from .config import Config
+
+
+class TextCache:
+    """
+    Disk-backed cache of extracted document text keyed by Drive file ID and modifiedTime.
+    Entries are plain UTF-8 files read through mmap, so large texts are paged
+    in by the OS instead of being read into a buffer first. Least-recently-used
+    files are removed once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.txt'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_atime, name, stat.st_size))
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _file_prefix(self, file_id: str) -> str:
+        return hashlib.sha256(file_id.encode('utf-8')).hexdigest()[:32]
+
+    def _file_name(self, file_id: str, modified_time: str) -> str:
+        version = hashlib.sha256(modified_time.encode('utf-8')).hexdigest()[:16]
+        return f"{self._file_prefix(file_id)}-{version}.txt"
+
+    def get(self, file_id: str, modified_time: str, max_chars: int = None) -> Optional[str]:
+        """Return cached text (optionally only the first max_chars characters) or None"""
+        if not file_id or not modified_time:
+            return None
+
+        name = self._file_name(file_id, modified_time)
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+
+        try:
+            with self.open_view(name) as view:
+                if max_chars is None:
+                    return view[:].decode('utf-8')
+                # A character is at most 4 bytes in UTF-8; only that prefix is paged in
+                return view[:max_chars * 4].decode('utf-8', errors='ignore')[:max_chars]
+        except (OSError, ValueError) as e:
+            print(f"Error reading cached text: {e}")
+            self._forget(name)
+            return None
+
+    def open_view(self, name: str):
+        """Memory-map a cache entry read-only; use as a context manager"""
+        path = os.path.join(self.cache_dir, name)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return _EmptyView()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def put(self, file_id: str, modified_time: str, text: str) -> None:
+        if not file_id or not modified_time or not text:
+            return
+
+        data = text.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+
+        name = self._file_name(file_id, modified_time)
+        prefix = self._file_prefix(file_id)
+
+        # Write to a temporary file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.cache_dir, name))
+
+        with self._lock:
+            # Older versions of the same file can never be hit again
+            for stale in [entry for entry in self._entries if entry.startswith(prefix) and entry != name]:
+                self._remove_locked(stale)
+
+            self._total_bytes += len(data) - self._entries.get(name, 0)
+            self._entries[name] = len(data)
+            self._entries.move_to_end(name)
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def _forget(self, name: str) -> None:
+        with self._lock:
+            self._remove_locked(name)
+
+    def _remove_locked(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is None:
+            return
+        self._total_bytes -= size
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class _EmptyView(bytes):
+    """Stand-in for mmap on empty files, which cannot be mapped"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+# Global extracted-text cache instance
+text_cache = TextCache(Config.TEXT_CACHE_DIR, Config.TEXT_CACHE_MAX_BYTES)
@@ -0,0 +1,80 @@
+import re
+from typing import List
+
+
+# Rough characters per model token for English prose, used where only a character count is known
+CHARS_PER_TOKEN = 4
+
+# Words, numbers and single punctuation marks; the pieces a BPE tokenizer mostly keeps whole
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate model token count, computed locally.
+    Every word or punctuation mark counts as one token, plus one more for each
+    further four characters of a long word (which the model splits into pieces).
+    Within about 10-15% of Gemini's count for English text, and never calls the API.
+    """
+    return sum(1 + (len(piece) - 1) // CHARS_PER_TOKEN for piece in _TOKEN_PIECES.findall(text))
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens approximate tokens.
+    Paragraphs are kept together where they fit; longer paragraphs are split
+    between sentences, and sentences longer than a chunk between words.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for piece, tokens in _pieces(text, max_tokens):
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += tokens
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _pieces(text: str, max_tokens: int):
+    """Yield (piece, token count) pairs, no piece above max_tokens"""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        tokens = count_tokens(paragraph)
+        if tokens <= max_tokens:
+            yield paragraph, tokens
+            continue
+
+        for sentence in _SENTENCE_END.split(paragraph):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens
+            else:
+                yield from _split_words(sentence, max_tokens)
+
+
+def _split_words(sentence: str, max_tokens: int):
+    words = []
+    words_tokens = 0
+    for word in sentence.split():
+        tokens = count_tokens(word)
+        if words and words_tokens + tokens > max_tokens:
+            yield " ".join(words), words_tokens
+            words = []
+            words_tokens = 0
+        words.append(word)
+        words_tokens += tokens
+
+    if words:
+        yield " ".join(words), words_tokens
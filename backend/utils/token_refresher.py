@@ -0,0 +1,175 @@
+import json
+import time
+import random
+import threading
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+from .config import Config
+from .storage import storage, PersistentStorage
+
+
+class TokenRefreshScheduler:
+    """
+    Refreshes stored OAuth tokens shortly before they expire, in the background,
+    so is_authenticated rarely has to refresh inside a user's webhook.
+    Every scan interval (plus jitter) the scheduler asks the storage backend for
+    tokens expiring within refresh_ahead seconds and refreshes the ones of users
+    active within active_window on a bounded thread pool, spreading the calls out
+    with a random per-token delay. Tokens of inactive users are left to expire.
+    With several workers each one runs its own scheduler; the jitter keeps them
+    from refreshing in lockstep and a duplicate refresh is harmless.
+    """
+
+    def __init__(self, storage: PersistentStorage, interval: int = 60, refresh_ahead: int = 300,
+                 max_workers: int = 4, jitter: float = 10, batch_size: int = 100, active_window: int = 86400):
+        self.storage = storage
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.active_window = active_window
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._last_seen = {}  # whatsapp_number -> last time is_authenticated ran for the user
+        self._replaced_expiry = {}  # whatsapp_number -> expiry of the token the scheduler replaced
+        self.scans = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.hot_path_refreshes = 0
+        self.hot_path_refreshes_avoided = 0
+
+    def start(self) -> None:
+        if self._thread:
+            return
+
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="token-refresh")
+        self._thread = threading.Thread(target=self._run, name="token-refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def scan(self) -> int:
+        """Queue refreshes for tokens expiring soon; returns how many were queued"""
+        now = time.time()
+        # Tokens that lapsed more than a couple of scans ago belong to users the scheduler no longer keeps fresh
+        lapsed_before = now - 2 * (self.interval + self.jitter)
+        try:
+            due = self.storage.tokens_expiring_before(now + self.refresh_ahead, self.batch_size, after=lapsed_before)
+        except NotImplementedError:
+            return 0
+        except Exception as e:
+            print(f"Token refresh scan failed: {e}")
+            return 0
+
+        queued = 0
+        with self._lock:
+            self.scans += 1
+            self._forget_inactive(now)
+            due = [number for number in due if number in self._last_seen and number not in self._in_flight]
+            self._in_flight.update(due)
+
+        for whatsapp_number in due:
+            self._executor.submit(self._refresh, whatsapp_number, random.uniform(0, self.jitter))
+            queued += 1
+        return queued
+
+    def touch(self, whatsapp_number: str) -> None:
+        """Mark a user as active; called on every is_authenticated"""
+        with self._lock:
+            self._last_seen[whatsapp_number] = time.time()
+
+    def record_hot_path(self, whatsapp_number: str, refreshed_inline: bool) -> None:
+        """Called by is_authenticated whenever it loads a token from storage"""
+        with self._lock:
+            if refreshed_inline:
+                self.hot_path_refreshes += 1
+                return
+
+            # The token the scheduler replaced would have expired by now: a webhook refresh was avoided
+            replaced_expiry = self._replaced_expiry.get(whatsapp_number)
+            if replaced_expiry is not None and time.time() >= replaced_expiry:
+                del self._replaced_expiry[whatsapp_number]
+                self.hot_path_refreshes_avoided += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "scans": self.scans,
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "in_flight": len(self._in_flight),
+                "active_users": len(self._last_seen),
+                "hot_path_refreshes": self.hot_path_refreshes,
+                "hot_path_refreshes_avoided": self.hot_path_refreshes_avoided
+            }
+
+    def _forget_inactive(self, now: float) -> None:
+        for whatsapp_number, last_seen in list(self._last_seen.items()):
+            if now - last_seen > self.active_window:
+                del self._last_seen[whatsapp_number]
+                self._replaced_expiry.pop(whatsapp_number, None)
+
+    def _run(self) -> None:
+        # Start at a random point in the interval so workers booted together do not scan together
+        self._stop.wait(random.uniform(0, self.jitter))
+        while not self._stop.is_set():
+            self.scan()
+            self._stop.wait(self.interval + random.uniform(0, self.jitter))
+
+    def _refresh(self, whatsapp_number: str, delay: float) -> None:
+        from google.oauth2.credentials import Credentials
+        from google.auth.transport.requests import Request
+
+        try:
+            if self._stop.wait(delay):
+                return
+
+            token_data = self.storage.load_token(whatsapp_number)
+            if not token_data or not token_data.get('refresh_token'):
+                return
+
+            creds = Credentials.from_authorized_user_info(token_data)
+            old_expiry = creds.expiry
+            creds.refresh(Request())
+
+            if not self.storage.save_token(json.loads(creds.to_json()), whatsapp_number):
+                raise RuntimeError("could not save the refreshed token")
+
+            with self._lock:
+                self.refreshed += 1
+                if old_expiry:
+                    # Credentials.expiry is a naive UTC datetime
+                    self._replaced_expiry[whatsapp_number] = old_expiry.replace(tzinfo=timezone.utc).timestamp()
+        except Exception as e:
+            print(f"Background token refresh failed for WhatsApp number {whatsapp_number}: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(whatsapp_number)
+
+
+# Global token refresh scheduler
+token_refresher = TokenRefreshScheduler(
+    storage,
+    Config.TOKEN_REFRESH_INTERVAL,
+    Config.TOKEN_REFRESH_AHEAD,
+    Config.TOKEN_REFRESH_WORKERS,
+    Config.TOKEN_REFRESH_JITTER,
+    Config.TOKEN_REFRESH_BATCH_SIZE,
+    Config.TOKEN_REFRESH_ACTIVE_WINDOW
+)
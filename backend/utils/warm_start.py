@@ -0,0 +1,266 @@
+"""
+Warm-start state for serverless cold starts (see WarmStart).
+
+Cold-start benchmark, run from the backend directory (offline):
+
+    python -m utils.warm_start [--runs 5]
+
+which times imports, the first and a second Drive service build in fresh
+interpreters, for googleapiclient's build(), the bundled document and a
+warm-start snapshot.
+"""
+import os
+import sys
+import json
+import stat
+import time
+import marshal
+import argparse
+import tempfile
+import threading
+import subprocess
+from typing import Optional, Dict, Any
+from .config import Config
+from .folder_index import folder_indexes
+
+
+class WarmStart:
+    """
+    Keeps serverless cold starts cheap.
+    Drive services are built from the Drive v3 discovery document bundled with
+    google-api-python-client, parsed once per process instead of on every build.
+    The parsed document and the users' folder indexes are also saved as a
+    snapshot (marshal format) so the next invocation on the same instance can
+    skip both the parse and the folder-tree rebuild. Snapshots are written on a
+    background thread, and only read back if this user owns them and nobody else
+    can write them (marshal must never load untrusted data).
+    """
+
+    SERVICE_NAME = 'drive'
+    VERSION = 'v3'
+    FORMAT = 2  # 2: folder indexes keep a changes feed token instead of a timestamp
+
+    def __init__(self, snapshot_path: str, save_interval: int = 60, enabled: bool = True):
+        self.snapshot_path = snapshot_path
+        self.save_interval = save_interval
+        self.enabled = enabled
+        self._discovery = None
+        self._lock = threading.Lock()
+        self._last_saved_at = 0
+        self._saving = False
+        self.discovery_source = None
+        self.discovery_load_ms = None
+        self.restored_indexes = 0
+        self.builds = 0
+        self.build_ms_total = 0.0
+        self.first_build_ms = None
+
+    def discovery(self) -> Dict[str, Any]:
+        """Parsed Drive v3 discovery document, loaded once per process"""
+        with self._lock:
+            if self._discovery is None:
+                started = time.perf_counter()
+                snapshot = self._read_snapshot()
+                if snapshot:
+                    self._discovery = snapshot["discovery"]
+                    self.discovery_source = "snapshot"
+                    self.restored_indexes = folder_indexes.restore(snapshot.get("folder_indexes", {}))
+                else:
+                    from googleapiclient.discovery_cache import get_static_doc
+                    self._discovery = json.loads(get_static_doc(self.SERVICE_NAME, self.VERSION))
+                    self.discovery_source = "bundled"
+                self.discovery_load_ms = round((time.perf_counter() - started) * 1000, 2)
+            return self._discovery
+
+    def build_service(self, http):
+        """Build a Drive service from the bundled document; never fetches discovery over the network"""
+        from googleapiclient.discovery import build_from_document
+
+        started = time.perf_counter()
+        # googleapiclient only applies idempotent fix-ups to the method descriptions, so one parsed document is shared
+        service = build_from_document(self.discovery(), http=http)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.builds += 1
+            self.build_ms_total += elapsed
+            if self.first_build_ms is None:
+                self.first_build_ms = round(elapsed, 2)
+        return service
+
+    def save_in_background(self) -> bool:
+        """Start a save on a background thread if one is due; never blocks the caller on disk I/O"""
+        if not self.enabled:
+            return False
+
+        with self._lock:
+            if (self._discovery is None or self._saving
+                    or time.time() - self._last_saved_at < self.save_interval):
+                return False
+            self._saving = True
+
+        threading.Thread(target=self._save_in_thread, name="warm-start-save", daemon=True).start()
+        return True
+
+    def _save_in_thread(self) -> None:
+        try:
+            self.save(force=True)
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def save(self, force: bool = False) -> bool:
+        """Write the snapshot, at most once per save_interval unless forced"""
+        if not self.enabled:
+            return False
+
+        now = time.time()
+        with self._lock:
+            if self._discovery is None or (not force and now - self._last_saved_at < self.save_interval):
+                return False
+            self._last_saved_at = now
+            discovery = self._discovery
+
+        snapshot = {
+            "format": self.FORMAT,
+            "python": list(sys.version_info[:2]),
+            "saved_at": now,
+            "discovery": discovery,
+            "folder_indexes": folder_indexes.snapshot()
+        }
+
+        directory = os.path.dirname(self.snapshot_path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # mkstemp creates the file readable by this user only; the rename makes the write atomic
+            fd, tmp_path = tempfile.mkstemp(prefix='.warm_start_', dir=directory)
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+            return True
+        except Exception as e:
+            print(f"Failed to save warm-start snapshot: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "discovery_source": self.discovery_source,
+                "discovery_load_ms": self.discovery_load_ms,
+                "restored_indexes": self.restored_indexes,
+                "builds": self.builds,
+                "first_build_ms": self.first_build_ms,
+                "average_build_ms": round(self.build_ms_total / self.builds, 2) if self.builds else None
+            }
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        if not self.enabled or not os.path.exists(self.snapshot_path):
+            return None
+
+        try:
+            # O_NOFOLLOW and fstat on the open file: the checked file is the one that gets loaded
+            fd = os.open(self.snapshot_path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+            with os.fdopen(fd, 'rb') as f:
+                info = os.fstat(f.fileno())
+                if not self._is_trusted(info):
+                    print(f"Ignoring warm-start snapshot {self.snapshot_path}: not a private file owned by this user")
+                    return None
+                snapshot = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            print(f"Ignoring unreadable warm-start snapshot: {e}")
+            return None
+
+        if (not isinstance(snapshot, dict) or snapshot.get("format") != self.FORMAT
+                or snapshot.get("python") != list(sys.version_info[:2])):
+            return None
+        return snapshot
+
+    @staticmethod
+    def _is_trusted(info: os.stat_result) -> bool:
+        """A regular file owned by this process's user that no other user can write"""
+        owned = not hasattr(os, 'getuid') or info.st_uid == os.getuid()
+        return stat.S_ISREG(info.st_mode) and owned and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+# (setup, build) per scenario, timed in fresh interpreters since a cold start is paid once per process
+_BENCHMARK_SCENARIOS = {
+    # What every build cost before: googleapiclient reads and parses the bundled document on each call
+    "build() per service": (
+        "import httplib2\nfrom googleapiclient.discovery import build",
+        "build('drive', 'v3', http=httplib2.Http(), static_discovery=True, cache_discovery=False)"
+    ),
+    "bundled document": (
+        "import httplib2\nfrom utils.warm_start import warm_start\nwarm_start.enabled = False",
+        "warm_start.build_service(httplib2.Http())"
+    ),
+    "warm-start snapshot": (
+        "import httplib2\nfrom utils.warm_start import warm_start",
+        "warm_start.build_service(httplib2.Http())"
+    )
+}
+
+_BENCHMARK_SCRIPT = """
+import time
+_started = time.perf_counter()
+{setup}
+_imported = time.perf_counter()
+{build}
+_first = time.perf_counter()
+{build}
+print((_imported - _started) * 1000, (_first - _imported) * 1000, (time.perf_counter() - _first) * 1000)
+"""
+
+
+def cold_start_benchmark(runs: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Median milliseconds spent on imports, on the first Drive service build and on a
+    second build in a new process, per scenario. Runs offline.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, WARM_START_ENABLED='true', WARM_START_PATH=os.path.join(directory, 'warm_start.marshal'))
+        # The snapshot scenario reads what this one-off run writes
+        subprocess.run(
+            [sys.executable, '-c', "from utils.warm_start import warm_start; warm_start.discovery(); warm_start.save(force=True)"],
+            cwd=backend_dir, env=env, check=True, capture_output=True
+        )
+
+        for name, (setup, build) in _BENCHMARK_SCENARIOS.items():
+            script = _BENCHMARK_SCRIPT.format(setup=setup, build=build)
+            timings = []
+            for _ in range(runs):
+                completed = subprocess.run([sys.executable, '-c', script], cwd=backend_dir, env=env,
+                                           check=True, capture_output=True, text=True)
+                # Config prints its settings on import; the timings are the last line
+                timings.append([float(value) for value in completed.stdout.split()[-3:]])
+
+            import_ms, first_ms, next_ms = (round(_median(column), 1) for column in zip(*timings))
+            results[name] = {"import_ms": import_ms, "first_build_ms": first_ms, "next_build_ms": next_ms}
+    return results
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold-start cost of building a Drive service")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'import ms':>10}  {'first build ms':>15}  {'next build ms':>14}  scenario")
+    for name, result in cold_start_benchmark(args.runs).items():
+        print(f"{result['import_ms']:>10.1f}  {result['first_build_ms']:>15.1f}  {result['next_build_ms']:>14.1f}  {name}")
+    return 0
+
+
+# Global warm-start state
+warm_start = WarmStart(Config.WARM_START_PATH, Config.WARM_START_SAVE_INTERVAL, Config.WARM_START_ENABLED)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { driveAPI } from '../services/api';
 import { 
   Folder, 
@@ -14,6 +14,11 @@ import {
   FolderOpen
 } from 'lucide-react';
 
+const JOB_POLL_INTERVAL_MS = 2000;
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000;
+
+const wait = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
 const Summary = ({ whatsappNumber }) => {
   const [files, setFiles] = useState([]);
   const [folders, setFolders] = useState([]);
@@ -24,9 +29,16 @@ const Summary = ({ whatsappNumber }) => {
   const [summaryLoading, setSummaryLoading] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [summaryType, setSummaryType] = useState(''); // 'file' or 'folder'
+  const [jobStatus, setJobStatus] = useState('');
+  // Cleared on unmount so a pending poll loop stops instead of running forever
+  const mounted = useRef(true);
 
   useEffect(() => {
+    mounted.current = true;
     loadItems();
+    return () => {
+      mounted.current = false;
+    };
   }, []);
 
   const loadItems = async () => {
@@ -117,25 +129,56 @@ const Summary = ({ whatsappNumber }) => {
     setError(null);
 
     try {
-      let response;
-      const itemPath = `/${item.name}`;
+      // Structured job: the path goes to the backend as is, spaces and case included
+      const job = { type: type === 'file' ? 'file_summary' : 'folder_summary', path: `/${item.name}` };
 
-      if (type === 'file') {
-        response = await driveAPI.getFileSummary(itemPath);
-      } else {
-        response = await driveAPI.getFolderSummary(itemPath);
+      const created = await driveAPI.createJob(job, whatsappNumber);
+      if (!created.success) {
+        setError(created.error || `Failed to get ${type} summary`);
+        return;
       }
 
-      if (response.success) {
-        setSummary(response.response);
+      const finished = await pollJob(created.job_id);
+      if (!finished) {
+        return; // unmounted while waiting
+      }
+      if (finished.status === 'done') {
+        setSummary(finished.result);
       } else {
-        setError(response.error || `Failed to get ${type} summary`);
+        setError(finished.error || `Failed to get ${type} summary`);
       }
     } catch (err) {
-      setError(`Failed to get ${type} summary`);
+      if (mounted.current) {
+        setError(err.message || `Failed to get ${type} summary`);
+      }
     } finally {
-      setSummaryLoading(false);
+      if (mounted.current) {
+        setJobStatus('');
+        setSummaryLoading(false);
+      }
+    }
+  };
+
+  // Summaries run on the backend job queue; poll until the job is done or has failed,
+  // for at most JOB_MAX_WAIT_MS. Returns null if the page was left while waiting.
+  const pollJob = async (jobId) => {
+    const deadline = Date.now() + JOB_MAX_WAIT_MS;
+    while (mounted.current) {
+      const response = await driveAPI.getJob(jobId);
+      const job = response.job;
+      if (!mounted.current) {
+        break;
+      }
+      setJobStatus(job.status);
+      if (job.status === 'done' || job.status === 'failed') {
+        return job;
+      }
+      if (Date.now() >= deadline) {
+        throw new Error('The summary is taking too long; check back later');
+      }
+      await wait(JOB_POLL_INTERVAL_MS);
     }
+    return null;
   };
 
   const filteredFiles = files.filter(file =>
@@ -284,7 +327,9 @@ const Summary = ({ whatsappNumber }) => {
                 {summaryLoading ? (
                   <div className="flex items-center justify-center py-8">
                     <RefreshCw className="w-6 h-6 animate-spin text-primary-500" />
-                    <span className="ml-2 text-gray-600">Generating summary...</span>
+                    <span className="ml-2 text-gray-600">
+                      {jobStatus === 'queued' ? 'Waiting in queue...' : 'Generating summary...'}
+                    </span>
                   </div>
                 ) : summary ? (
                   <div className="bg-white rounded-lg p-4 border">
@@ -9,7 +9,14 @@ const api = axios.create({
   },
 });
 
-
+// Every request acts for the signed-in WhatsApp user; the backend opens a session per request from this header
+api.interceptors.request.use((config) => {
+  const whatsappNumber = sessionStorage.getItem('whatsappNumber');
+  if (whatsappNumber) {
+    config.headers['X-WhatsApp-Number'] = whatsappNumber;
+  }
+  return config;
+});
 
 
 export const driveAPI = {
@@ -85,6 +92,16 @@ export const driveAPI = {
     }
   },
 
+  // Run many operations in one request, e.g. [{ op: 'move', source_path, destination_path }, { op: 'delete', path }]
+  batch: async (operations) => {
+    try {
+      const response = await api.post('/api/batch', { operations });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   // Get folder summary
   getFolderSummary: async (folderPath) => {
     try {
@@ -109,6 +126,41 @@ export const driveAPI = {
     }
   },
 
+  // Queue a long-running job, e.g. { type: 'file_summary', path: '/My Report.pdf' }; returns { job_id }
+  createJob: async (job, whatsappNumber) => {
+    try {
+      const response = await api.post('/api/jobs', {
+        ...job,
+        whatsapp_number: whatsappNumber
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Get the status and result of a queued job
+  getJob: async (jobId) => {
+    try {
+      const response = await api.get(`/api/jobs/${jobId}`);
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // List recent jobs of a user
+  listJobs: async (whatsappNumber) => {
+    try {
+      const response = await api.get('/api/jobs', {
+        params: { whatsapp_number: whatsappNumber }
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   // Get help
   getHelp: async () => {
     try {